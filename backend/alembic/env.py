@@ -37,6 +37,17 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata # <--- MANTENHA ESTA LINHA
 
 
+# Objetos de busca full-text criados por SQL na migração (fora dos modelos):
+# o autogenerate não deve propor removê-los
+FULL_TEXT_SEARCH_OBJECTS = ("generated_contents_fts", "search_vector")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None and name and name.startswith(FULL_TEXT_SEARCH_OBJECTS):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired a la:
 # my_important_option = config.get_main_option("my_important_option")
@@ -59,6 +70,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -86,6 +98,7 @@ def run_migrations_online() -> None:
             connection=connection,
             target_metadata=target_metadata,
             render_as_batch=True, # Adicione esta linha para SQLite (opcional, mas evita alguns problemas)
+            include_object=include_object,
             # Adicionado para evitar erro com múltiplos modelos em SQLite
             # https://alembic.sqlalchemy.org/en/latest/batch.html#batch-migrations-for-sqlite-and-other-dbs-that-dont-support-ddl-in-transactions
         )
@@ -0,0 +1,45 @@
+"""add generation_cache table
+
+Revision ID: 3f7a2c9d1e54
+Revises: 491b90fe430d
+Create Date: 2026-10-18 09:12:40.218311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a2c9d1e54'
+down_revision: Union[str, None] = '491b90fe430d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('provider', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('generated_text', sa.Text(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generation_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_generation_cache_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_cache_cache_key'), ['cache_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generation_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generation_cache_cache_key'))
+        batch_op.drop_index(batch_op.f('ix_generation_cache_id'))
+
+    op.drop_table('generation_cache')
@@ -0,0 +1,34 @@
+"""add group_id and channel to generated_contents
+
+Revision ID: 7d3a9e5b21f8
+Revises: e2b7f14c9a63
+Create Date: 2026-10-18 13:48:20.671935
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3a9e5b21f8'
+down_revision: Union[str, None] = 'e2b7f14c9a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('generated_contents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('group_id', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('channel', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_generated_contents_group_id'), ['group_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generated_contents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generated_contents_group_id'))
+        batch_op.drop_column('channel')
+        batch_op.drop_column('group_id')
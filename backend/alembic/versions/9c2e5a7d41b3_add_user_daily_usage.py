@@ -0,0 +1,58 @@
+"""add user_daily_usage
+
+Revision ID: 9c2e5a7d41b3
+Revises: f3a8c61d0e42
+Create Date: 2026-10-18 15:12:08.530417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2e5a7d41b3'
+down_revision: Union[str, None] = 'f3a8c61d0e42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Preenche o rollup com o histórico existente; daqui em diante o crud o mantém incrementalmente.
+# Dia em UTC (mesma regra de crud._content_day_expression); um grupo multicanal conta como uma geração.
+BACKFILL = """
+INSERT INTO user_daily_usage (user_id, day, generations, contents, favorites)
+SELECT
+    owner_id,
+    {day},
+    COUNT(DISTINCT group_id) + SUM(CASE WHEN group_id IS NULL THEN 1 ELSE 0 END),
+    COUNT(*),
+    SUM(CASE WHEN is_favorite THEN 1 ELSE 0 END)
+FROM generated_contents
+WHERE owner_id IS NOT NULL
+GROUP BY owner_id, {day}
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_daily_usage',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('generations', sa.Integer(), nullable=False),
+    sa.Column('contents', sa.Integer(), nullable=False),
+    sa.Column('favorites', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        day = "CAST(timezone('UTC', created_at) AS DATE)"
+    else:
+        day = "date(created_at)"
+    op.execute(BACKFILL.format(day=day))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_usage')
@@ -0,0 +1,67 @@
+"""add generation_batches and generation_batch_items
+
+Revision ID: a84d61f0b2c7
+Revises: 3f7a2c9d1e54
+Create Date: 2026-10-18 10:02:17.554093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a84d61f0b2c7'
+down_revision: Union[str, None] = '3f7a2c9d1e54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_batches',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total_items', sa.Integer(), nullable=False),
+    sa.Column('succeeded_items', sa.Integer(), nullable=False),
+    sa.Column('failed_items', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generation_batches', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_generation_batches_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_batches_owner_id'), ['owner_id'], unique=False)
+
+    op.create_table('generation_batch_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('batch_id', sa.String(length=32), nullable=False),
+    sa.Column('item_index', sa.Integer(), nullable=False),
+    sa.Column('property_details', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('generated_content_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['batch_id'], ['generation_batches.id'], ),
+    sa.ForeignKeyConstraint(['generated_content_id'], ['generated_contents.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generation_batch_items', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_generation_batch_items_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_batch_items_batch_id'), ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generation_batch_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generation_batch_items_batch_id'))
+        batch_op.drop_index(batch_op.f('ix_generation_batch_items_id'))
+
+    op.drop_table('generation_batch_items')
+    with op.batch_alter_table('generation_batches', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generation_batches_owner_id'))
+        batch_op.drop_index(batch_op.f('ix_generation_batches_id'))
+
+    op.drop_table('generation_batches')
@@ -0,0 +1,114 @@
+"""add full-text search to generated_contents
+
+SQLite: tabela virtual FTS5 (external content) + triggers de insert/update/delete.
+PostgreSQL: configuração portuguese_unaccent, coluna gerada search_vector e índice GIN.
+
+Atenção (SQLite): operações de batch_alter_table que recriam generated_contents
+("move and copy") descartam os triggers do FTS; recrie-os numa migração seguinte.
+
+Revision ID: b19c4f7e8d20
+Revises: 7d3a9e5b21f8
+Create Date: 2026-10-18 14:20:05.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b19c4f7e8d20'
+down_revision: Union[str, None] = '7d3a9e5b21f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE generated_contents_fts USING fts5(
+        generated_text,
+        prompt_used,
+        content='generated_contents',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER generated_contents_fts_ai AFTER INSERT ON generated_contents BEGIN
+        INSERT INTO generated_contents_fts(rowid, generated_text, prompt_used)
+        VALUES (new.id, new.generated_text, new.prompt_used);
+    END
+    """,
+    """
+    CREATE TRIGGER generated_contents_fts_ad AFTER DELETE ON generated_contents BEGIN
+        INSERT INTO generated_contents_fts(generated_contents_fts, rowid, generated_text, prompt_used)
+        VALUES ('delete', old.id, old.generated_text, old.prompt_used);
+    END
+    """,
+    # Só reindexa quando o texto muda (ex.: marcar favorito não mexe no índice)
+    """
+    CREATE TRIGGER generated_contents_fts_au AFTER UPDATE OF generated_text, prompt_used ON generated_contents BEGIN
+        INSERT INTO generated_contents_fts(generated_contents_fts, rowid, generated_text, prompt_used)
+        VALUES ('delete', old.id, old.generated_text, old.prompt_used);
+        INSERT INTO generated_contents_fts(rowid, generated_text, prompt_used)
+        VALUES (new.id, new.generated_text, new.prompt_used);
+    END
+    """,
+    # Indexa o histórico existente
+    "INSERT INTO generated_contents_fts(generated_contents_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS generated_contents_fts_au",
+    "DROP TRIGGER IF EXISTS generated_contents_fts_ad",
+    "DROP TRIGGER IF EXISTS generated_contents_fts_ai",
+    "DROP TABLE IF EXISTS generated_contents_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TEXT SEARCH CONFIGURATION portuguese_unaccent (COPY = portuguese)",
+    """
+    ALTER TEXT SEARCH CONFIGURATION portuguese_unaccent
+        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem
+    """,
+    # Coluna gerada: o Postgres a mantém atualizada em todo INSERT/UPDATE
+    """
+    ALTER TABLE generated_contents ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('portuguese_unaccent'::regconfig, coalesce(generated_text, '')), 'A') ||
+            setweight(to_tsvector('portuguese_unaccent'::regconfig, coalesce(prompt_used, '')), 'B')
+        ) STORED
+    """,
+    "CREATE INDEX ix_generated_contents_search_vector ON generated_contents USING GIN (search_vector)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_generated_contents_search_vector",
+    "ALTER TABLE generated_contents DROP COLUMN IF EXISTS search_vector",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS portuguese_unaccent",
+]
+
+
+def _run(statements) -> None:
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_UPGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_UPGRADE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_DOWNGRADE)
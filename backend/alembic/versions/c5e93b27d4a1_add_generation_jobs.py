@@ -0,0 +1,55 @@
+"""add generation_jobs
+
+Revision ID: c5e93b27d4a1
+Revises: a84d61f0b2c7
+Create Date: 2026-10-18 12:41:08.310527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e93b27d4a1'
+down_revision: Union[str, None] = 'a84d61f0b2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('property_details', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.String(), nullable=True),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('generated_content_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['generated_content_id'], ['generated_contents.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generation_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_generation_jobs_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_jobs_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_jobs_owner_id'), ['owner_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_jobs_status'), ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generation_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generation_jobs_status'))
+        batch_op.drop_index(batch_op.f('ix_generation_jobs_owner_id'))
+        batch_op.drop_index(batch_op.f('ix_generation_jobs_id'))
+        batch_op.drop_index(batch_op.f('ix_generation_jobs_created_at'))
+
+    op.drop_table('generation_jobs')
@@ -0,0 +1,44 @@
+"""add generated_contents_archive
+
+Revision ID: d71f3b9a6c25
+Revises: 9c2e5a7d41b3
+Create Date: 2026-10-18 16:40:51.207734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd71f3b9a6c25'
+down_revision: Union[str, None] = '9c2e5a7d41b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generated_contents_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('group_id', sa.String(length=32), nullable=True),
+    sa.Column('channel', sa.String(), nullable=True),
+    sa.Column('prompt_used_zlib', sa.LargeBinary(), nullable=False),
+    sa.Column('generated_text_zlib', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generated_contents_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_generated_contents_archive_owner_created', ['owner_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generated_contents_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_generated_contents_archive_owner_created')
+
+    op.drop_table('generated_contents_archive')
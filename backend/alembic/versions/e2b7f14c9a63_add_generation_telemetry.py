@@ -0,0 +1,59 @@
+"""add generation_telemetry
+
+Revision ID: e2b7f14c9a63
+Revises: c5e93b27d4a1
+Create Date: 2026-10-18 13:05:42.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7f14c9a63'
+down_revision: Union[str, None] = 'c5e93b27d4a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_telemetry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('generated_content_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('plan_name', sa.String(), nullable=True),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('provider', sa.String(), nullable=True),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('template_id', sa.Integer(), nullable=True),
+    sa.Column('prompt_chars', sa.Integer(), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('latency_ms', sa.Float(), nullable=True),
+    sa.Column('cache_hit', sa.Boolean(), nullable=False),
+    sa.Column('hedged', sa.Boolean(), nullable=False),
+    sa.Column('error_class', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['generated_content_id'], ['generated_contents.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('generation_telemetry', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_generation_telemetry_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_telemetry_generated_content_id'), ['generated_content_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_telemetry_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_generation_telemetry_user_id'), ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generation_telemetry', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generation_telemetry_user_id'))
+        batch_op.drop_index(batch_op.f('ix_generation_telemetry_id'))
+        batch_op.drop_index(batch_op.f('ix_generation_telemetry_generated_content_id'))
+        batch_op.drop_index(batch_op.f('ix_generation_telemetry_created_at'))
+
+    op.drop_table('generation_telemetry')
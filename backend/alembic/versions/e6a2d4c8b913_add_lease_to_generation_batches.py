@@ -0,0 +1,34 @@
+"""add lease to generation_batches
+
+Revision ID: e6a2d4c8b913
+Revises: c5d19a7e3f80
+Create Date: 2026-10-18 21:14:06.527310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a2d4c8b913'
+down_revision: Union[str, None] = 'c5d19a7e3f80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('generation_batches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('worker_id', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index(batch_op.f('ix_generation_batches_status'), ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generation_batches', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generation_batches_status'))
+        batch_op.drop_column('locked_until')
+        batch_op.drop_column('worker_id')
@@ -0,0 +1,32 @@
+"""add history indexes to generated_contents
+
+Revision ID: f3a8c61d0e42
+Revises: b19c4f7e8d20
+Create Date: 2026-10-18 15:02:37.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c61d0e42'
+down_revision: Union[str, None] = 'b19c4f7e8d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('generated_contents', schema=None) as batch_op:
+        batch_op.create_index('ix_generated_contents_owner_created', ['owner_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+        batch_op.create_index('ix_generated_contents_owner_favorite_created', ['owner_id', 'is_favorite', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generated_contents', schema=None) as batch_op:
+        batch_op.drop_index('ix_generated_contents_owner_favorite_created')
+        batch_op.drop_index('ix_generated_contents_owner_created')
@@ -1,5 +1,6 @@
 # backend/app/api/deps.py
 
+from app.core.database import get_async_db # Reexportado direto: um wrapper com `async for` não repassaria as exceções do endpoint ao gerador
 from app.core.database import get_db as get_sync_db_session
 from sqlalchemy.orm import Session
 
@@ -0,0 +1,75 @@
+# backend/app/api/endpoints/admin.py
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app import crud, schemas, models
+from app.api.deps import get_db
+from app.core.database import async_engine, engine, pool_status
+from app.core.security import get_current_admin_user
+
+router = APIRouter()
+
+
+@router.get("/generation-metrics", response_model=schemas.GenerationMetrics)
+def get_generation_metrics(
+    days: int = Query(30, ge=1, le=366, description="Janela em dias, contada a partir de agora (ignorada se 'since' for informado)"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    admin_user: models.User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Uso, tokens e latência das gerações por dia, plano e provedor.
+    Linhas com provider nulo são cache hits ou gerações em que todos os provedores falharam.
+    """
+    since = since or datetime.utcnow() - timedelta(days=days)
+    totals, percentiles = crud.get_generation_metrics(db, since=since, until=until)
+
+    latency_by_key = {(row.day, row.plan_name, row.provider): row for row in percentiles}
+    rows = []
+    overall = schemas.GenerationMetricsTotals()
+    for row in totals:
+        latency = latency_by_key.get((row.day, row.plan_name, row.provider))
+        rows.append(
+            schemas.GenerationMetricsRow(
+                day=row.day,
+                plan_name=row.plan_name,
+                provider=row.provider,
+                generations=row.generations,
+                errors=row.errors,
+                cache_hits=row.cache_hits,
+                prompt_tokens=row.prompt_tokens,
+                completion_tokens=row.completion_tokens,
+                avg_prompt_tokens=row.avg_prompt_tokens,
+                avg_prompt_chars=row.avg_prompt_chars,
+                p50_latency_ms=latency.p50_latency_ms if latency else None,
+                p95_latency_ms=latency.p95_latency_ms if latency else None,
+                p99_latency_ms=latency.p99_latency_ms if latency else None,
+            )
+        )
+        overall.generations += row.generations
+        overall.errors += row.errors
+        overall.cache_hits += row.cache_hits
+        overall.prompt_tokens += row.prompt_tokens
+        overall.completion_tokens += row.completion_tokens
+
+    return schemas.GenerationMetrics(since=since, until=until, totals=overall, rows=rows)
+
+
+@router.get("/db-pool", response_model=schemas.DatabasePoolStats)
+def get_database_pool_stats(admin_user: models.User = Depends(get_current_admin_user)):
+    """
+    Ocupação dos pools de conexão deste processo (cada worker do uvicorn tem os seus)
+    e o tempo de espera por uma conexão livre. Timeouts indicam pool pequeno demais.
+    """
+    return schemas.DatabasePoolStats(
+        dialect=engine.dialect.name,
+        pools=[
+            schemas.DatabasePoolStatus(engine="sync", **pool_status(engine)),
+            schemas.DatabasePoolStatus(engine="async", **pool_status(async_engine.sync_engine)),
+        ],
+    )
@@ -6,21 +6,21 @@ from typing import Any
 from app.services.email_service import send_registration_email_resend
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app import crud, schemas, models # Certifique-se que 'models' está importado
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import async_crud, schemas, models # Certifique-se que 'models' está importado
 # <<< MANTENHA ESTA LINHA COM verify_password:
-from app.core.security import create_access_token, get_current_user, verify_password 
+from app.core.security import access_token_data, create_access_token, get_current_user_async, verify_and_update_password_async 
 from app.core.config import settings
-from app.api.deps import get_db
+from app.api.deps import get_async_db
 
 router = APIRouter()
 
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token( # 'def' para síncrono
+async def login_for_access_token( # 'async def': o bcrypt roda no pool de senhas, fora do event loop
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = crud.get_user_by_email(db, email=form_data.username)
+    user = await async_crud.get_user_by_email(db, email=form_data.username)
     if not user: # Verifique a existência do usuário antes de acessar user.hashed_password
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,31 +28,35 @@ def login_for_access_token( # 'def' para síncrono
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # <<< MANTENHA ESTA CHAMADA DIRETA A verify_password:
-    if not verify_password(form_data.password, user.hashed_password):
+    # <<< MANTENHA ESTA CHAMADA DIRETA À verificação de senha:
+    valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Hash gravado com outro custo (PASSWORD_BCRYPT_ROUNDS mudou): regrava com o custo atual
+        await async_crud.update_user_password_hash(db, user.id, new_hash)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=access_token_data(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=schemas.UserPublic, status_code=status.HTTP_201_CREATED, summary="Registra um novo usuário") # 'UserPublic' é um schema comum para retorno público
 async def register_user( # MUDADO PARA 'async def'
     user_create: schemas.UserCreate, # Renomeado para user_create para clareza
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Registra um novo usuário no sistema.
     Verifica se o e-mail já está em uso e cria o usuário no banco de dados.
     Envia um e-mail de boas-vindas após o registro bem-sucedido.
     """
-    db_user = crud.get_user_by_email(db, email=user_create.email)
+    db_user = await async_crud.get_user_by_email(db, email=user_create.email)
     if db_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
@@ -65,7 +69,7 @@ async def register_user( # MUDADO PARA 'async def'
     # db.refresh(user_in_db)
     
     # Assumindo que crud.create_user já faz o hash da senha e persiste o usuário
-    new_user = crud.create_user(db=db, user=user_create) # Use user_create aqui
+    new_user = await async_crud.create_user(db=db, user=user_create) # Use user_create aqui
 
     # NOVO: Enviar e-mail de boas-vindas em segundo plano
     # Usa asyncio.create_task para não bloquear a resposta da API
@@ -77,5 +81,5 @@ async def register_user( # MUDADO PARA 'async def'
     return new_user # Retorna o objeto do usuário recém-criado
 
 @router.get("/me", response_model=schemas.UserPublic)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
+async def read_users_me(current_user: models.User = Depends(get_current_user_async)):
     return current_user
\ No newline at end of file
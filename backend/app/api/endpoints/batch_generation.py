@@ -0,0 +1,167 @@
+# backend/app/api/endpoints/batch_generation.py
+
+import csv
+import io
+import json
+import uuid
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import async_crud, crud, schemas, models
+from app.api.deps import get_async_db, get_db
+from app.core.config import settings
+from app.core.security import get_current_user, get_current_user_async
+from app.api.endpoints.content_generator import reject_channels, resolve_prompt_template
+from app.services.batch_generation_service import start_generation_batch
+
+router = APIRouter()
+
+
+def _parse_csv_records(raw: str) -> List[dict]:
+    reader = csv.DictReader(io.StringIO(raw))
+    # Células vazias no CSV equivalem a campos ausentes
+    return [
+        {key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+        for row in reader
+    ]
+
+
+async def _read_batch_records(request: Request) -> List[dict]:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "read"):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Envie o CSV no campo 'file'.")
+        return _parse_csv_records((await upload.read()).decode("utf-8-sig"))
+
+    raw = (await request.body()).decode("utf-8-sig")
+    if content_type.startswith("text/csv"):
+        return _parse_csv_records(raw)
+
+    try:
+        records = json.loads(raw)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Corpo JSON inválido.")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Envie um array JSON de imóveis.")
+    return records
+
+
+def _batch_status(db_batch: models.GenerationBatch) -> schemas.GenerationBatchStatus:
+    return schemas.GenerationBatchStatus(
+        job_id=db_batch.id,
+        status=db_batch.status,
+        total_items=db_batch.total_items,
+        succeeded_items=db_batch.succeeded_items,
+        failed_items=db_batch.failed_items,
+        processed_items=db_batch.succeeded_items + db_batch.failed_items,
+        created_at=db_batch.created_at,
+        finished_at=db_batch.finished_at,
+    )
+
+
+@router.post(
+    "/generate-content/batch",
+    response_model=schemas.GenerationBatchStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Gera conteúdo para vários imóveis em segundo plano",
+)
+async def create_generation_batch(
+    request: Request,
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Aceita um array JSON de PropertyDetailsBase, um corpo text/csv ou um upload
+    multipart (campo `file`) com um imóvel por linha. Retorna o job id imediatamente;
+    o processamento acontece com concorrência limitada por BATCH_GENERATION_CONCURRENCY.
+    """
+    records = await _read_batch_records(request)
+    if not records:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nenhum imóvel enviado.")
+    if len(records) > settings.BATCH_GENERATION_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"O lote excede o máximo de {settings.BATCH_GENERATION_MAX_ITEMS} imóveis.",
+        )
+
+    items = []
+    errors = []
+    for index, record in enumerate(records):
+        try:
+            items.append(schemas.PropertyDetailsBase.model_validate(record))
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.errors(include_url=False, include_context=False)})
+    if errors:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors)
+    for item in items:
+        reject_channels(item)
+
+    # Valida uma única vez cada template referenciado no lote (existência e acesso pelo plano)
+    for template_id in {item.template_id for item in items if item.template_id is not None}:
+        await db.run_sync(resolve_prompt_template, template_id, current_user)
+
+    # Reserva a cota do lote inteiro na mesma transação; cada item que falhar é estornado ao ser registrado
+    db_batch = await async_crud.create_generation_batch(db, batch_id=uuid.uuid4().hex, user_id=current_user.id, items=items)
+    if db_batch is None:
+        user_plan = current_user.subscription_plan
+        remaining = user_plan.max_generations - current_user.content_generations_count if user_plan else 0
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"O lote tem {len(items)} imóveis, mas restam {max(remaining, 0)} gerações no seu plano ({user_plan.name if user_plan else 'Free'}).",
+        )
+
+    start_generation_batch(db_batch.id, current_user.id)
+    return _batch_status(db_batch)
+
+
+@router.get("/generate-content/batch/{job_id}", response_model=schemas.GenerationBatchStatus)
+def get_generation_batch_status(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Retorna o progresso de um lote.
+    """
+    db_batch = crud.get_generation_batch(db, batch_id=job_id, user_id=current_user.id)
+    if not db_batch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lote não encontrado.")
+    return _batch_status(db_batch)
+
+
+@router.get("/generate-content/batch/{job_id}/results", response_model=schemas.GenerationBatchResults)
+def get_generation_batch_results(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    item_status: Optional[str] = Query(None, alias="status", description="Filtra por pending, succeeded ou failed"),
+):
+    """
+    Retorna os resultados (parciais enquanto o lote estiver em andamento) de um lote.
+    """
+    db_batch = crud.get_generation_batch(db, batch_id=job_id, user_id=current_user.id)
+    if not db_batch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lote não encontrado.")
+
+    db_items = crud.get_generation_batch_items(db, batch_id=job_id, skip=skip, limit=limit, status=item_status)
+    return schemas.GenerationBatchResults(
+        job_id=db_batch.id,
+        status=db_batch.status,
+        items=[
+            schemas.GenerationBatchItemResult(
+                item_index=item.item_index,
+                status=item.status,
+                error=item.error,
+                content=item.generated_content,
+            )
+            for item in db_items
+        ],
+    )
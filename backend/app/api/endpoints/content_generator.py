@@ -1,95 +1,286 @@
 # backend/app/api/endpoints/content_generator.py
 
+import json
+import logging
+import time
+import uuid
+
+import anyio
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
     status,
 )  # Não precisa de Body se não for usar para debug
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session  # Tipo de sessão síncrona
-from app import crud, schemas, models
-from app.core.security import get_current_user
-# from app.services.gemini_service import generate_content_for_real_estate
-from app.services.deepseekService import generate_content_for_real_estate
-from app.api.deps import get_db  # get_db síncrono
+from app import async_crud, schemas, models
+from app.core.config import settings
+from app.core.security import get_current_user_async
+from app.services import generation_cache, llm_router
+from app.services.llm_router import GENERATION_ERROR_MESSAGE
+from app.services.generation_service import GenerationResult, generate_property_content
+from app.services.generation_telemetry import record_generation_async
+from typing import Optional, Union
+from app.services.prompt_builder import (
+    CompiledPromptTemplate,
+    PromptTemplateError,
+    build_property_prompt,
+    get_compiled_template,
+)
+from app.api.deps import get_async_db
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/generate-content", response_model=schemas.GeneratedContent)
-async def create_content(
-    property_details: schemas.PropertyDetailsBase, 
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    # --- Verificação de limite do plano ---
-    user_plan = crud.get_subscription_plan_by_name(db, current_user.subscription_plan_id)
-    if user_plan and user_plan.max_generations is not None and user_plan.max_generations > 0:
-     if current_user.content_generations_count >= user_plan.max_generations:
+# Planos com acesso aos templates premium (mesma regra de crud.get_active_prompt_templates)
+PREMIUM_TEMPLATE_PLANS = ["Premium", "Unlimited"]
+
+
+def resolve_prompt_template(
+    db: Session, template_id: Optional[int], current_user: models.User
+) -> Optional[CompiledPromptTemplate]:
+    """
+    Carrega (do cache de compilação) o template pedido, validando existência e acesso pelo plano.
+    """
+    if template_id is None:
+        return None
+    try:
+        template = get_compiled_template(db, template_id)
+    except PromptTemplateError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if template is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template não encontrado.")
+    plan_name = current_user.subscription_plan.name if current_user.subscription_plan else "Free"
+    if template.is_premium and plan_name not in PREMIUM_TEMPLATE_PLANS:
         raise HTTPException(
-            status_code=403,
-            detail=f"Você atingiu o limite de {user_plan.max_generations} gerações do seu plano ({user_plan.name})."
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Este template está disponível apenas nos planos Premium e Unlimited.",
         )
+    return template
+
+
+def _generation_cache_key(
+    property_details: schemas.PropertyDetailsBase, template: Optional[CompiledPromptTemplate] = None
+) -> str:
+    return generation_cache.build_request_cache_key(
+        property_details, template_version=template.version if template else None
+    )
+
 
-    prompt_string = f"Gere conteúdo para redes sociais sobre um imóvel. Tipo de imóvel: {property_details.property_type}."
-    if property_details.bedrooms is not None:
-        prompt_string += f" Quartos: {property_details.bedrooms}."
-    if property_details.bathrooms is not None:
-        prompt_string += f" Banheiros: {property_details.bathrooms}."
-    if property_details.location:
-        prompt_string += f" Localização: {property_details.location}."
-    if property_details.special_features:
-        prompt_string += f" Características especiais: {property_details.special_features}."
-    if property_details.purpose:
-        prompt_string += f" Finalidade: {property_details.purpose}."
-    if property_details.target_audience:
-        prompt_string += f" Público-alvo: {property_details.target_audience}."
-    if property_details.tone:
-        prompt_string += f" Tom: {property_details.tone}."
-    if property_details.length:
-        prompt_string += f" Comprimento: {property_details.length}."
-    if property_details.language:
-        prompt_string += f" Idioma: {property_details.language}."
-    if property_details.property_value is not None:
-        prompt_string += f" Valor do imóvel: R$ {property_details.property_value}."
-    if property_details.condo_fee is not None:
-        prompt_string += f" Condomínio: R$ {property_details.condo_fee}."
-    if property_details.iptu_value is not None:
-        prompt_string += f" IPTU: R$ {property_details.iptu_value}."
-    if property_details.additional_details:
-        prompt_string += f" Outros detalhes: {property_details.additional_details}."
-
-    if property_details.optimize_for_seo_gmb:
-        seo_gmb_details = []
-        if property_details.seo_keywords:
-            seo_gmb_details.append(f"Palavras-chave SEO: {property_details.seo_keywords}")
-        if property_details.contact_phone:
-            seo_gmb_details.append(f"Telefone: {property_details.contact_phone}")
-        if property_details.contact_email:
-            seo_gmb_details.append(f"Email: {property_details.contact_email}")
-        if property_details.contact_website:
-            seo_gmb_details.append(f"Website: {property_details.contact_website}")
-        if property_details.property_address:
-            seo_gmb_details.append(f"Endereço: {property_details.property_address}")
-
-        if seo_gmb_details:
-            prompt_string += f" Detalhes de SEO/GMB: {'; '.join(seo_gmb_details)}."
-
-    prompt_string += " Use emojis relevantes. Inclua uma chamada para ação (CTA). Inclua hashtags relevantes. O objetivo é atrair compradores e despertar interesse."
-
-    # Geração do conteúdo
-    generated_text = await generate_content_for_real_estate(prompt=prompt_string)
-
-    db_generated_content = crud.create_user_generated_content(
-        db=db,
-        user_id=current_user.id,
-        content=schemas.GeneratedContentCreate(  
-            prompt_used=prompt_string, generated_text=generated_text
-        ),
+def _lookup_cached_generation(db: Session, property_details: schemas.PropertyDetailsBase, cache_key: str):
+    if property_details.force_fresh:
+        return None
+    return generation_cache.get_cached_generation(db, cache_key)
+
+
+def quota_exceeded_error(current_user: models.User) -> HTTPException:
+    """
+    Erro 403 para quando reserve_generation_quota não consegue reservar a cota do plano.
+    """
+    user_plan = current_user.subscription_plan
+    max_generations = user_plan.max_generations if user_plan else settings.FREE_PLAN_MAX_GENERATIONS
+    plan_name = user_plan.name if user_plan else "Free"
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Você atingiu o limite de {max_generations} gerações do seu plano ({plan_name}).",
     )
 
-    # Atualiza contador do usuário
-    current_user.content_generations_count += 1
-    db.add(current_user)
-    db.commit()
 
+def reject_channels(property_details: schemas.PropertyDetailsBase) -> None:
+    """
+    A saída multicanal só existe no /generate-content síncrono.
+    """
+    if property_details.channels:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A opção 'channels' só é suportada em /generate-content.",
+        )
+
+
+@router.post("/generate-content", response_model=Union[schemas.GeneratedContent, schemas.GeneratedContentGroup])
+async def create_content(
+    property_details: schemas.PropertyDetailsBase,
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user_id = current_user.id
+    template = await db.run_sync(resolve_prompt_template, property_details.template_id, current_user)
+
+    # --- Reserva atômica da cota do plano (antes de chamar o provedor) ---
+    if not await async_crud.reserve_generation_quota(db, user_id):
+        raise quota_exceeded_error(current_user)
+
+    # Geração do conteúdo (respostas idênticas vêm do cache, sem chamar o provedor)
+    try:
+        result = await generate_property_content(db, property_details, template)
+    except llm_router.LLMProviderError as e:
+        logger.error(f"Erro ao gerar conteúdo: {e}")
+        await _release_reserved_quota(db, user_id)
+        await record_generation_async(
+            db, source="sync", user_id=user_id, template_id=property_details.template_id, error=e
+        )
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=GENERATION_ERROR_MESSAGE)
+    except Exception:
+        await _release_reserved_quota(db, user_id)
+        raise
+
+    if result.channel_texts is not None:
+        # Um GeneratedContent por canal, ligados pelo group_id; uma unidade de cota pela chamada
+        try:
+            db_contents = await async_crud.create_user_generated_content_group(
+                db,
+                user_id=user_id,
+                group_id=uuid.uuid4().hex,
+                prompt_used=result.prompt_used,
+                channel_texts=result.channel_texts,
+                increment_count=False,
+            )
+        except Exception:
+            await _release_reserved_quota(db, user_id)
+            raise
+        await record_generation_async(
+            db, source="sync", user_id=user_id, template_id=property_details.template_id,
+            result=result, generated_content_id=db_contents[0].id,
+        )
+        return schemas.GeneratedContentGroup(
+            group_id=db_contents[0].group_id,
+            contents=[schemas.GeneratedContent.model_validate(db_content) for db_content in db_contents],
+        )
+
+    # A cota já foi reservada: um único INSERT + COMMIT (se falhar, a reserva é estornada)
+    try:
+        db_generated_content = await async_crud.create_user_generated_content(
+            db=db,
+            user_id=user_id,
+            content=schemas.GeneratedContentCreate(
+                prompt_used=result.prompt_used, generated_text=result.generated_text
+            ),
+            increment_count=False,
+        )
+    except Exception:
+        await _release_reserved_quota(db, user_id)
+        raise
+    await record_generation_async(
+        db, source="sync", user_id=user_id, template_id=property_details.template_id,
+        result=result, generated_content_id=db_generated_content.id,
+    )
     return schemas.GeneratedContent.model_validate(db_generated_content)
+
+
+async def _release_reserved_quota(db: AsyncSession, user_id: int) -> None:
+    """
+    Estorna a cota reservada quando a geração não chega a ser salva.
+    """
+    await db.rollback()
+    await async_crud.adjust_user_generation_count(db, user_id, -1)
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Formata um evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/generate-content/stream")
+async def create_content_stream(
+    property_details: schemas.PropertyDetailsBase,
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Variante em streaming (SSE) de /generate-content.
+    Envia eventos `token` à medida que o provedor gera o texto e um evento `done`
+    com o conteúdo salvo. A cota é reservada antes de abrir o stream e estornada
+    se o stream falhar, vier vazio ou o cliente desconectar antes do fim.
+    """
+    user_id = current_user.id
+    reject_channels(property_details)
+    template = await db.run_sync(resolve_prompt_template, property_details.template_id, current_user)
+    prompt_string = build_property_prompt(property_details, template)
+    cache_key = _generation_cache_key(property_details, template)
+    cached_text = await db.run_sync(_lookup_cached_generation, property_details, cache_key)
+
+    # --- Reserva atômica da cota (antes de abrir o stream) ---
+    # O commit da reserva também devolve a conexão ao pool enquanto o stream estiver aberto
+    if not await async_crud.reserve_generation_quota(db, user_id):
+        raise quota_exceeded_error(current_user)
+
+    async def event_stream():
+        persisted = False
+        try:
+            chunks = []
+            provider = None
+            usage: dict = {}
+            started = time.monotonic()
+            try:
+                if cached_text is not None:
+                    chunks.append(cached_text)
+                    yield _sse_event("token", {"text": cached_text})
+                else:
+                    async for provider, delta in llm_router.stream(prompt_string, usage=usage):
+                        chunks.append(delta)
+                        yield _sse_event("token", {"text": delta})
+            except Exception as e:
+                logger.exception(f"Erro durante o stream de geração: {e}")
+                await record_generation_async(
+                    db, source="stream", user_id=user_id, template_id=property_details.template_id,
+                    error=e, prompt_chars=len(prompt_string), latency_ms=(time.monotonic() - started) * 1000,
+                )
+                yield _sse_event("error", {"detail": GENERATION_ERROR_MESSAGE})
+                return
+
+            generated_text = "".join(chunks).strip()
+            if not generated_text:
+                yield _sse_event("error", {"detail": GENERATION_ERROR_MESSAGE})
+                return
+            if cached_text is None:
+                await db.run_sync(
+                    generation_cache.store_generation, cache_key, provider, llm_router.provider_model(provider), generated_text
+                )
+
+            # Persistência apenas com o stream completo (a cota já foi reservada)
+            db_generated_content = await async_crud.create_user_generated_content(
+                db=db,
+                user_id=user_id,
+                content=schemas.GeneratedContentCreate(
+                    prompt_used=prompt_string, generated_text=generated_text
+                ),
+                increment_count=False,
+            )
+            persisted = True
+            content = schemas.GeneratedContent.model_validate(db_generated_content)
+            completion = None
+            if cached_text is None:
+                completion = llm_router.LLMCompletion(
+                    text=generated_text,
+                    provider=provider,
+                    model=llm_router.provider_model(provider),
+                    latency_ms=usage.get("latency_ms", (time.monotonic() - started) * 1000),
+                    prompt_tokens=usage.get("prompt_tokens"),
+                    completion_tokens=usage.get("completion_tokens"),
+                )
+            await record_generation_async(
+                db, source="stream", user_id=user_id, template_id=property_details.template_id,
+                result=GenerationResult(
+                    prompt_used=prompt_string,
+                    generated_text=generated_text,
+                    cache_hit=cached_text is not None,
+                    latency_ms=(time.monotonic() - started) * 1000,
+                    completion=completion,
+                ),
+                generated_content_id=content.id,
+            )
+            yield _sse_event("done", content.model_dump(mode="json"))
+        finally:
+            if not persisted:
+                # Erro, texto vazio ou desconexão do cliente: estorna mesmo durante o cancelamento
+                with anyio.CancelScope(shield=True):
+                    await _release_reserved_quota(db, user_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,119 @@
+# backend/app/api/endpoints/generation_jobs.py
+
+import asyncio
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import async_crud, crud, schemas, models
+from app.api.deps import get_async_db, get_db
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.security import get_current_user, get_current_user_async
+from app.api.endpoints.content_generator import (
+    _sse_event,
+    quota_exceeded_error,
+    reject_channels,
+    resolve_prompt_template,
+)
+
+router = APIRouter()
+
+FINAL_JOB_STATUSES = ("succeeded", "failed")
+
+
+def _job_status(db_job: models.GenerationJob) -> schemas.GenerationJobStatus:
+    return schemas.GenerationJobStatus(
+        job_id=db_job.id,
+        status=db_job.status,
+        attempts=db_job.attempts,
+        error=db_job.error if db_job.status == "failed" else None,
+        content=db_job.generated_content,
+        created_at=db_job.created_at,
+        started_at=db_job.started_at,
+        finished_at=db_job.finished_at,
+    )
+
+
+@router.post(
+    "/generate-content/jobs",
+    response_model=schemas.GenerationJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Enfileira a geração de conteúdo para um imóvel",
+)
+def create_generation_job(
+    property_details: schemas.PropertyDetailsBase,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Versão assíncrona de /generate-content: grava o pedido na fila e retorna o job id
+    na hora. O conteúdo é gerado pelos workers (`python -m app.jobs.generation_worker`);
+    acompanhe por GET /generate-content/jobs/{job_id} ou pelo stream SSE em /events.
+    """
+    reject_channels(property_details)
+    resolve_prompt_template(db, property_details.template_id, current_user)
+
+    # A cota é reservada no enfileiramento e estornada se o job falhar em definitivo
+    db_job = crud.create_generation_job(db, job_id=uuid.uuid4().hex, user_id=current_user.id, property_details=property_details)
+    if db_job is None:
+        raise quota_exceeded_error(current_user)
+    return _job_status(db_job)
+
+
+@router.get("/generate-content/jobs/{job_id}", response_model=schemas.GenerationJobStatus)
+def get_generation_job_status(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Retorna o status do job e, quando concluído, o conteúdo gerado.
+    """
+    db_job = crud.get_generation_job(db, job_id=job_id, user_id=current_user.id)
+    if not db_job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job não encontrado.")
+    return _job_status(db_job)
+
+
+@router.get("/generate-content/jobs/{job_id}/events")
+async def stream_generation_job_events(
+    job_id: str,
+    request: Request,
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Stream SSE do job: um evento `status` a cada mudança e um evento final
+    `done` (succeeded) ou `error` (failed) com o status completo.
+    """
+    user_id = current_user.id
+    if not await async_crud.get_generation_job(db, job_id=job_id, user_id=user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job não encontrado.")
+    # Libera a conexão da requisição; o stream abre uma sessão curta a cada consulta
+    await db.close()
+
+    async def load_status():
+        async with AsyncSessionLocal() as poll_db:
+            return _job_status(await async_crud.get_generation_job(poll_db, job_id=job_id, user_id=user_id))
+
+    async def event_stream():
+        last_status = None
+        while not await request.is_disconnected():
+            job = await load_status()
+            if job.status in FINAL_JOB_STATUSES:
+                yield _sse_event("done" if job.status == "succeeded" else "error", job.model_dump(mode="json"))
+                return
+            if job.status != last_status:
+                last_status = job.status
+                yield _sse_event("status", {"job_id": job.job_id, "status": job.status, "attempts": job.attempts})
+            await asyncio.sleep(settings.GENERATION_JOB_POLL_INTERVAL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,19 +1,29 @@
 # backend/app/api/endpoints/history.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query # Import Query
+import base64
+import binascii
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query # Import Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional # Import Optional
+from typing import List, Literal, Optional # Import Optional
 from app import schemas, crud, models
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.security import decode_access_token
+from app.services import history_export
+from app.core.security import TokenPrincipal, check_token_version, decode_access_token, get_token_principal, resolve_principal
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime # Import datetime
 
 router = APIRouter()
 
+# Header com o cursor da próxima página (ausente na última página)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     payload = decode_access_token(token)
     if payload is None:
         raise HTTPException(
@@ -28,11 +38,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             detail="Token de autenticação inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = crud.get_user_by_email(db, email=email)
+    user = resolve_principal(db, email)
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
+    check_token_version(payload, user)
     return user
 
+def _encode_cursor(db_content: models.GeneratedContent) -> str:
+    raw = json.dumps({"created_at": db_content.created_at.isoformat(), "id": db_content.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["created_at"]), int(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+
 @router.post("/contents/", response_model=schemas.GeneratedContentBase)
 def create_content_history(
     content: schemas.GeneratedContentCreate,
@@ -41,31 +65,136 @@ def create_content_history(
 ):
     return crud.create_user_generated_content(db=db, content=content, user_id=current_user.id)
 
-@router.get("/contents/", response_model=List[schemas.GeneratedContentBase])
+@router.get("/contents/", response_model=List[schemas.GeneratedContentHistoryItem])
 def get_user_contents_history(
-    current_user: models.User = Depends(get_current_user),
+    response: Response,
+    current_user: TokenPrincipal = Depends(get_token_principal),
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description=f"Cursor da próxima página (header {NEXT_CURSOR_HEADER} da resposta anterior)"),
     is_favorite: Optional[bool] = Query(None, description="Filter by favorite status"), #
     search_query: Optional[str] = Query(None, description="Search by prompt or generated text"), #
     start_date: Optional[datetime] = Query(None, description="Filter by start date (YYYY-MM-DDTHH:MM:SS)"), #
-    end_date: Optional[datetime] = Query(None, description="Filter by end date (YYYY-MM-DDTHH:MM:SS)") #
+    end_date: Optional[datetime] = Query(None, description="Filter by end date (YYYY-MM-DDTHH:MM:SS)"), #
+    sort: Literal["date", "relevance"] = Query("date", description="'relevance' ordena pela relevância da busca (requer search_query)"),
 ):
     """
     Retorna o histórico de conteúdos gerados pelo usuário logado, com opções de filtragem.
+
+    Paginação: com sort="date", quando há mais itens a resposta traz o header
+    X-Next-Cursor; envie-o em `cursor` para buscar a página seguinte (mesmos filtros).
+    O cursor continua do último item visto, então o custo não cresce com a profundidade
+    e inserções novas não duplicam nem pulam itens. `skip` continua aceito (paginação antiga).
+
+    Conteúdos antigos e não favoritados ficam na camada fria (HISTORY_ARCHIVE_AFTER_DAYS) e
+    só aparecem quando start_date/end_date alcançam esse período (fora da busca textual).
     """
-    # Passa os parâmetros de filtro para a função CRUD
-    return crud.get_user_generated_contents(
+    after = None
+    if cursor:
+        if skip:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use `cursor` ou `skip`, não os dois.")
+        if sort == "relevance" and search_query:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Paginação por cursor não suporta sort=relevance.")
+        after = _decode_cursor(cursor)
+
+    keyset = not (sort == "relevance" and search_query)
+    # Um item a mais indica se existe próxima página
+    contents = crud.get_user_generated_contents(
         db=db,
-        user_id=current_user.id,
+        user_id=current_user.user_id,
         skip=skip,
-        limit=limit,
+        limit=limit + 1 if keyset else limit,
+        is_favorite=is_favorite,
+        search_query=search_query,
+        start_date=start_date,
+        end_date=end_date,
+        sort=sort,
+        after=after,
+    )
+    if keyset and len(contents) > limit:
+        contents = contents[:limit]
+        if contents:
+            response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(contents[-1])
+    return contents
+
+@router.get("/export")
+def export_user_contents_history(
+    request: Request,
+    current_user: TokenPrincipal = Depends(get_token_principal),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Formato do arquivo: ndjson (um JSON por linha) ou csv"),
+    is_favorite: Optional[bool] = Query(None, description="Filter by favorite status"),
+    search_query: Optional[str] = Query(None, description="Search by prompt or generated text"),
+    start_date: Optional[datetime] = Query(None, description="Filter by start date (YYYY-MM-DDTHH:MM:SS)"),
+    end_date: Optional[datetime] = Query(None, description="Filter by end date (YYYY-MM-DDTHH:MM:SS)"),
+):
+    """
+    Exporta todo o histórico do usuário (mesmos filtros de /contents/), do mais recente
+    para o mais antigo, em streaming: as linhas saem do cursor do banco em blocos, sem
+    montar a lista inteira em memória. Com `Accept-Encoding: gzip` a resposta vem comprimida.
+    """
+    gzip_enabled = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "Content-Disposition": f'attachment; filename="historico.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip_enabled:
+        headers["Content-Encoding"] = "gzip"
+
+    body = history_export.export_user_history(
+        format,
+        current_user.user_id,
+        batch_size=settings.HISTORY_EXPORT_BATCH_SIZE,
+        gzip_level=settings.HISTORY_EXPORT_GZIP_LEVEL if gzip_enabled else None,
         is_favorite=is_favorite,
         search_query=search_query,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+    )
+    return StreamingResponse(body, media_type=history_export.MEDIA_TYPES[format], headers=headers)
+
+def _bulk_selection_args(selection: schemas.HistoryBulkSelection) -> dict:
+    if (selection.ids is None) == (selection.filter is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Informe `ids` ou `filter` (apenas um dos dois).")
+    if selection.ids is not None:
+        if len(selection.ids) > settings.HISTORY_BULK_MAX_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Máximo de {settings.HISTORY_BULK_MAX_IDS} ids por requisição; use `filter` para seleções maiores.",
+            )
+        return {"ids": selection.ids}
+    return {"filters": selection.filter.model_dump()}
+
+
+@router.post("/contents/bulk/favorite", response_model=schemas.HistoryBulkResult)
+def bulk_update_favorite_status(
+    payload: schemas.HistoryBulkFavoriteUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Favorita ou desfavorita vários conteúdos de uma vez, selecionados por `ids` ou por
+    `filter` (mesmos filtros de /contents/). Executa um único UPDATE restrito ao usuário.
+    """
+    affected = crud.bulk_update_generated_content_favorite_status(
+        db, user_id=current_user.id, is_favorite=payload.is_favorite, **_bulk_selection_args(payload)
     )
+    return schemas.HistoryBulkResult(affected=affected)
+
+
+@router.post("/contents/bulk/delete", response_model=schemas.HistoryBulkResult)
+def bulk_delete_contents(
+    selection: schemas.HistoryBulkSelection,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Exclui vários conteúdos de uma vez (por `ids` ou `filter`) em um único DELETE restrito ao usuário.
+    Um `filter` vazio seleciona todo o histórico.
+    """
+    affected = crud.bulk_delete_generated_contents(db, user_id=current_user.id, **_bulk_selection_args(selection))
+    return schemas.HistoryBulkResult(affected=affected)
+
 
 @router.patch("/contents/{content_id}/favorite", response_model=schemas.GeneratedContentCreate)
 def toggle_favorite_status(
@@ -88,4 +217,21 @@ def toggle_favorite_status(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conteúdo não encontrado ou não pertence a este usuário."
         )
-    return updated_content
\ No newline at end of file
+    return updated_content
+
+
+@router.delete("/contents/{content_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_content_history(
+    content_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Exclui um conteúdo do histórico (os rollups de /users/me/analytics são atualizados junto).
+    """
+    if not crud.delete_generated_content(db=db, content_id=content_id, user_id=current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conteúdo não encontrado ou não pertence a este usuário."
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
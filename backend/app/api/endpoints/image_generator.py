@@ -3,7 +3,7 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
 from fastapi.responses import StreamingResponse # Para retornar a imagem
 from typing import Literal
-from app.api.endpoints.history import get_current_user # Reutiliza a dependência de autenticação
+from app.core.security import get_current_user_async # Reutiliza a dependência de autenticação
 from app.services.image_generator_service import generate_image_with_text_overlay, TEMPLATES # Importe o serviço e templates
 import io # Para BytesIO
 from app import models
@@ -15,7 +15,7 @@ async def generate_image_post(
     image: UploadFile = File(...), # O arquivo de imagem enviado
     text: str = Form(...),        # O texto a ser sobreposto
     template: Literal[tuple(TEMPLATES.keys())] = Form("padrao"), # O template escolhido
-    current_user: models.User = Depends(get_current_user) # Protege o endpoint
+    current_user: models.User = Depends(get_current_user_async) # Protege o endpoint
 ):
     """
     Gera uma imagem com texto sobreposto, usando uma imagem de upload e um template.
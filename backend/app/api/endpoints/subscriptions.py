@@ -1,19 +1,18 @@
 # backend/app/api/endpoints/subscriptions.py
 import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
 from fastapi.responses import JSONResponse # Importar JSONResponse se usado no webhook
-from sqlalchemy.orm import Session
-from app import crud, schemas, models # Certifique-se que crud, schemas, models estão importados
-from app.core.config import settings
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import async_crud, schemas, models # Certifique-se que crud, schemas, models estão importados
 from app.services.email_service import send_cancellation_email_resend, send_plan_subscribed_email_resend
-from app.services import stripe_service
+from app.services import plan_catalog, principal_cache, stripe_service
 
 from datetime import datetime
 import logging
 
-from app.core.database import get_db # <--- MANTENHA ESTA IMPORTAÇÃO
-from app.api.endpoints.history import get_current_user # <--- MANTENHA ESTA IMPORTAÇÃO (se não estiver lá)
+from app.api.deps import get_async_db # <--- MANTENHA ESTA IMPORTAÇÃO
+from app.core.security import get_current_user_async # <--- MANTENHA ESTA IMPORTAÇÃO (se não estiver lá)
 
 import stripe
 
@@ -29,168 +28,45 @@ logger = logging.getLogger(__name__) # Inicialize o logger para este módulo
 #     logger.addHandler(handler)
 
 
-# --- ATUALIZAÇÃO CRÍTICA AQUI: Mapeamento de Gerações por Plano E Intervalo ---
-# Use um dicionário aninhado ou chaves compostas para mapear gerações por nome E intervalo
-MAX_GENERATIONS_MAP = {
-    "Basic": {"month": 20, "year": 240},  # 20 * 12
-    "Premium": {"month": 50, "year": 600}, # 50 * 12
-    "Unlimited": {"month": 0, "year": 0},  # Ilimitado (0) para ambos
-}
-# -----------------------------------------------------------------------------
-
 @router.get("/plans", response_model=List[schemas.SubscriptionPlan])
-async def get_subscription_plans(db: Session = Depends(get_db)):
-    logger.info("--- INICIANDO get_subscription_plans ---")
-    try:
-        stripe_products_and_prices = await stripe_service.get_all_stripe_products_and_prices()
-        logger.info(f"Dados Stripe: {stripe_products_and_prices}")
-
-        for sp_data in stripe_products_and_prices:
-            plan_name = sp_data["name"]
-            stripe_price_id = sp_data["price_id_stripe"]
-            plan_interval = sp_data["interval"] # Pega o intervalo do Stripe
-
-            logger.debug(f"Processando plano Stripe: {plan_name} com price_id: {stripe_price_id}, intervalo: {plan_interval}")
-
-            # Obtenha o max_generations com base no nome E no intervalo
-            current_max_generations = MAX_GENERATIONS_MAP.get(plan_name, {}).get(plan_interval, 0)
-            if plan_name == "Free":
-                current_max_generations = settings.FREE_PLAN_MAX_GENERATIONS # O Free plan tem um limite único
-
-            # Use o `interval` na busca do plano existente
-            existing_plan = crud.get_subscription_plan_by_stripe_price_id(db, stripe_price_id)
-
-            if existing_plan:
-                # Verifique se o plano no DB precisa ser atualizado (nome, descrição, gerações etc.)
-                needs_update = False
-                if existing_plan.name != plan_name: needs_update = True
-                if existing_plan.description != sp_data["description"]: needs_update = True
-                if existing_plan.unit_amount != sp_data["unit_amount"]: needs_update = True
-                if existing_plan.currency != sp_data["currency"]: needs_update = True
-                if existing_plan.interval != sp_data["interval"]: needs_update = True
-                if existing_plan.interval_count != sp_data["interval_count"]: needs_update = True
-                if existing_plan.type != sp_data["type"]: needs_update = True
-                if existing_plan.max_generations != current_max_generations: needs_update = True
-                if existing_plan.is_active != True: needs_update = True # Garantir que planos Stripe ativos estejam ativos no DB
-
-                if needs_update:
-                    crud.update_subscription_plan(
-                        db,
-                        db_obj=existing_plan,
-                        obj_in=schemas.SubscriptionPlanUpdate(
-                            name=plan_name,
-                            description=sp_data["description"],
-                            unit_amount=sp_data["unit_amount"],
-                            currency=sp_data["currency"],
-                            interval=sp_data["interval"],
-                            interval_count=sp_data["interval_count"],
-                            type=sp_data["type"],
-                            price_id_stripe=stripe_price_id,
-                            max_generations=current_max_generations,
-                            is_active=True # Garantir que o plano esteja ativo
-                        )
-                    )
-                    logger.debug(f"Plano existente atualizado (por price_id): {existing_plan.name} - {existing_plan.interval}")
-                else:
-                    logger.debug(f"Plano existente inalterado: {existing_plan.name} - {existing_plan.interval}")
-            else:
-                crud.create_subscription_plan(
-                    db=db,
-                    plan=schemas.SubscriptionPlanCreate(
-                        name=plan_name,
-                        description=sp_data["description"],
-                        price_id_stripe=stripe_price_id,
-                        unit_amount=sp_data["unit_amount"],
-                        currency=sp_data["currency"],
-                        interval=sp_data["interval"],
-                        interval_count=sp_data["interval_count"],
-                        type=sp_data["type"],
-                        max_generations=current_max_generations,
-                        is_active=True # Criar como ativo
-                    )
-                )
-                logger.debug(f"Novo plano Stripe criado no DB: {plan_name} - {sp_data['interval']} (price_id: {stripe_price_id})")
-
-        # Garanta que o plano "Free" exista e esteja com as configurações corretas
-        free_plan_db = crud.get_subscription_plan_by_name(db, "Free", interval="month") # Especifica o intervalo para o plano Free
-        if not free_plan_db:
-            free_plan_db = crud.create_subscription_plan(
-                db=db,
-                plan=schemas.SubscriptionPlanCreate(
-                    name="Free",
-                    description="Plano gratuito com funcionalidades básicas.",
-                    price_id_stripe=settings.STRIPE_FREE_PLAN_PRICE_ID,
-                    unit_amount=0,
-                    currency="BRL",
-                    interval="month",
-                    interval_count=1,
-                    type="recurring",
-                    max_generations=settings.FREE_PLAN_MAX_GENERATIONS,
-                    is_active=True
-                )
-            )
-            if not free_plan_db:
-                raise HTTPException(status_code=500, detail="Could not create Free plan.")
-            logger.info("Plano 'Free' criado no banco de dados.")
-        else:
-            # Atualiza o plano "Free" caso os valores configurados no .env tenham mudado
-            if (free_plan_db.price_id_stripe != settings.STRIPE_FREE_PLAN_PRICE_ID or
-                free_plan_db.max_generations != settings.FREE_PLAN_MAX_GENERATIONS or
-                free_plan_db.unit_amount != 0 or
-                free_plan_db.currency != "BRL" or # Garante que currency, interval, etc. estão corretos
-                free_plan_db.interval != "month" or
-                free_plan_db.interval_count != 1 or
-                free_plan_db.type != "recurring" or
-                free_plan_db.is_active != True): # Garante que o Free plan está ativo
-                
-                crud.update_subscription_plan(
-                    db,
-                    db_obj=free_plan_db,
-                    obj_in=schemas.SubscriptionPlanUpdate(
-                        name="Free",
-                        description="Plano gratuito com funcionalidades básicas.",
-                        price_id_stripe=settings.STRIPE_FREE_PLAN_PRICE_ID,
-                        unit_amount=0,
-                        currency="BRL",
-                        interval="month",
-                        interval_count=1,
-                        type="recurring",
-                        max_generations=settings.FREE_PLAN_MAX_GENERATIONS,
-                        is_active=True
-                    )
-                )
-                logger.info("Plano 'Free' atualizado no banco de dados.")
-
-            if not any(p.get('price_id_stripe') == settings.STRIPE_FREE_PLAN_PRICE_ID for p in stripe_products_and_prices):
-                logger.warning(f"Preço Stripe ID {settings.STRIPE_FREE_PLAN_PRICE_ID} para o plano 'Free' não encontrado no Stripe (esperado).")
-
-        db_plans = crud.get_all_subscription_plans(db)
-
-        logger.info(f"Planos recuperados do DB antes da serialização: {[p.name for p in db_plans]}")
-        for p in db_plans:
-            logger.debug(f"Detalhes do plano DB: ID={p.id}, Nome={p.name}, Preço={p.unit_amount}, MaxGenerations={p.max_generations}, PriceIDStripe={p.price_id_stripe}, Tipo={p.type}, Interval={p.interval}, IntervalCount={p.interval_count}, IsActive={getattr(p, 'is_active', None)}")
-
-        return db_plans
+async def get_subscription_plans(request: Request):
+    """
+    Planos de assinatura, servidos da cópia em memória do catálogo (plan_catalog): não chama o
+    Stripe nem escreve no banco. A sincronização com o Stripe roda em segundo plano e nos webhooks
+    de produto/preço. Com If-None-Match igual ao ETag atual, responde 304 sem corpo.
+    """
+    catalog = plan_catalog.get_catalog()
+    if catalog is None:
+        # Só antes do primeiro carregamento (ex.: app sem lifespan): uma leitura do banco
+        try:
+            catalog = await plan_catalog.load()
+        except Exception as e:
+            logger.exception("Erro inesperado em get_subscription_plans:")
+            raise HTTPException(status_code=500, detail=f"Erro interno do servidor ao buscar planos: {e}")
 
-    except Exception as e:
-        logger.exception("Erro inesperado em get_subscription_plans:")
-        raise HTTPException(status_code=500, detail=f"Erro interno do servidor ao buscar planos: {e}")
+    headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"} # no-cache: o cliente revalida com o ETag
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if catalog.etag in tags or "*" in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
 
 
 # --- Endpoint para criar uma sessão de checkout do Stripe ---
 @router.post("/create-checkout-session/{price_id}", response_model=schemas.CheckoutSessionResponse) # Use CheckoutSessionResponse (schema a ser definido)
 async def create_checkout_session(
     price_id: str,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
 ):
     logger.info(f"###### DEBUG (Endpoint - create_checkout_session): Função iniciada para price_id: {price_id} e user_id: {current_user.id} ######")
     
     if not current_user.stripe_customer_id:
         logger.info(f"###### DEBUG: Cliente Stripe não encontrado para {current_user.email}. Criando novo... ######")
         customer_id = await stripe_service.create_stripe_customer(current_user.email, current_user.id)
-        crud.update_user_stripe_customer_id(db, current_user.id, customer_id)
-        db.refresh(current_user)
+        await async_crud.update_user_stripe_customer_id(db, current_user.id, customer_id)
+        await db.refresh(current_user)
         logger.info(f"###### DEBUG: Cliente Stripe criado com ID: {customer_id} ######")
     else:
         customer_id = current_user.stripe_customer_id
@@ -206,7 +82,7 @@ async def create_checkout_session(
 
 # --- Endpoint de Webhook do Stripe ---
 @router.post("/webhook")
-async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
     payload = await request.body()
     sig_header = request.headers.get('stripe-signature')
 
@@ -263,7 +139,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             )
 
         # 4. Busca de usuário
-        user = crud.get_user(db, user_id)
+        user = await async_crud.get_user(db, user_id)
         if not user:
             logger.error(f"Usuário não encontrado: ID {user_id}")
             return JSONResponse(
@@ -272,7 +148,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             )
         
         # 5. Busca de plano
-        target_plan = crud.get_subscription_plan_by_stripe_price_id(db, price_id_from_metadata)
+        target_plan = await async_crud.get_subscription_plan_by_stripe_price_id(db, price_id_from_metadata)
         if not target_plan:
             logger.error(f"Plano não encontrado: Price ID {price_id_from_metadata}")
             return JSONResponse(
@@ -284,15 +160,17 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
         try:
             user.stripe_subscription_id = subscription_id
             user.subscription_plan_id = target_plan.id
+            user.token_version = (user.token_version or 0) + 1  # Invalida tokens com as claims do plano anterior
             user.content_generations_count = 0
             
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            principal_cache.invalidate_user(user.id)
+            await db.refresh(user)
             logger.info(f"Usuário {user.email} atualizado para o plano {target_plan.name}.")
         except Exception as e:
             logger.exception(f"Erro ao atualizar usuário: {e}")
-            db.rollback()
+            await db.rollback()
             return JSONResponse(
                 content={"error": "Erro ao atualizar informações do usuário"},
                 status_code=500
@@ -330,7 +208,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             current_price_id = None
             logger.warning("Não foi possível obter o price_id da assinatura atualizada")
 
-        user = crud.get_user_by_stripe_customer_id(db, customer_id)
+        user = await async_crud.get_user_by_stripe_customer_id(db, customer_id)
         if not user:
             logger.warning(f"Usuário com Stripe Customer ID {customer_id} não encontrado")
             return JSONResponse(content={"warning": "Usuário não encontrado"}, status_code=200)
@@ -340,31 +218,35 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
         try:
             # Atualização de plano
             if new_status == 'active' and current_price_id:
-                target_plan = crud.get_subscription_plan_by_stripe_price_id(db, current_price_id)
+                target_plan = await async_crud.get_subscription_plan_by_stripe_price_id(db, current_price_id)
                 if target_plan:
                     user.subscription_plan_id = target_plan.id
+                    user.token_version = (user.token_version or 0) + 1  # Invalida tokens com as claims do plano anterior
                     user.content_generations_count = 0
                     db.add(user)
-                    db.commit()
+                    await db.commit()
+                    principal_cache.invalidate_user(user.id)
                     logger.info(f"Plano do usuário {user.email} atualizado para {target_plan.name}")
                 else:
                     logger.warning(f"Plano com price_id {current_price_id} não encontrado")
             
             # Cancelamento ou não pagamento
             elif new_status in ['canceled', 'unpaid']:
-                free_plan = crud.get_subscription_plan_by_name(db, "Free")
+                free_plan = await async_crud.get_subscription_plan_by_name(db, "Free")
                 if free_plan:
                     user.stripe_subscription_id = None
                     user.subscription_plan_id = free_plan.id
+                    user.token_version = (user.token_version or 0) + 1  # Invalida tokens com as claims do plano anterior
                     user.content_generations_count = 0
                     db.add(user)
-                    db.commit()
+                    await db.commit()
+                    principal_cache.invalidate_user(user.id)
                     logger.info(f"Usuário {user.email} revertido para plano Free")
                 else:
                     logger.error("Plano Free não encontrado no banco de dados")
         except Exception as e:
             logger.exception(f"Erro ao processar atualização de assinatura: {e}")
-            db.rollback()
+            await db.rollback()
 
     # Processar evento customer.subscription.deleted
     elif event['type'] == 'customer.subscription.deleted':
@@ -372,7 +254,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
         customer_id = subscription.get('customer')
         subscription_id = subscription.get('id')
         
-        user = crud.get_user_by_stripe_customer_id(db, customer_id)
+        user = await async_crud.get_user_by_stripe_customer_id(db, customer_id)
         if not user:
             logger.warning(f"Usuário com Stripe Customer ID {customer_id} não encontrado")
             return JSONResponse(content={"warning": "Usuário não encontrado"}, status_code=200)
@@ -380,19 +262,25 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
         logger.info(f"Assinatura excluída: Customer {customer_id}, Subscription {subscription_id}")
         
         try:
-            free_plan = crud.get_subscription_plan_by_name(db, "Free")
+            free_plan = await async_crud.get_subscription_plan_by_name(db, "Free")
             if free_plan:
                 user.stripe_subscription_id = None
                 user.subscription_plan_id = free_plan.id
+                user.token_version = (user.token_version or 0) + 1  # Invalida tokens com as claims do plano anterior
                 user.content_generations_count = 0
                 db.add(user)
-                db.commit()
+                await db.commit()
+                principal_cache.invalidate_user(user.id)
                 logger.info(f"Usuário {user.email} atribuído ao plano Free")
             else:
                 logger.error("Plano Free não encontrado no banco de dados")
         except Exception as e:
             logger.exception(f"Erro ao processar exclusão de assinatura: {e}")
-            db.rollback()
+            await db.rollback()
+
+    # Produtos/preços alterados no Stripe: atualiza subscription_plans e o catálogo em segundo plano
+    elif event['type'].startswith(('product.', 'price.')):
+        plan_catalog.request_sync()
 
     # Responder para todos os tipos de evento
     return JSONResponse(content={"received": True}, status_code=200)
@@ -400,8 +288,8 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
 # CANCELAR ASSINATURA
 @router.post("/cancel-subscription", status_code=status.HTTP_200_OK, summary="Cancela a assinatura de um usuário")
 async def cancel_user_subscription(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
 ):
     """
     Cancela a assinatura Stripe de um usuário.
@@ -420,8 +308,8 @@ async def cancel_user_subscription(
         # Opcional: Atualizar o status da assinatura no seu banco de dados, se necessário
         # Exemplo: current_user.subscription_status = "canceled_at_period_end"
         # db.add(current_user)
-        # db.commit()
-        # db.refresh(current_user)
+        # await db.commit()
+        # await db.refresh(current_user)
 
         # Enviar e-mail de confirmação de cancelamento em segundo plano
         # Converte o timestamp do Stripe para uma string de data formatada
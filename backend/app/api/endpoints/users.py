@@ -1,13 +1,15 @@
 # backend/app/api/endpoints/users.py
 
 import asyncio
-from typing import List, Optional
+from typing import List, Literal, Optional
+from app.services import user_analytics
 from app.services.email_service import send_password_changed_email_resend
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session # Correctamente importado Session
-from app import crud, schemas, models # Certifique-se que 'models' está importado
-from app.core.security import get_current_user, get_password_hash, verify_password 
-from app.api.deps import get_db
+from app import async_crud, crud, schemas, models # Certifique-se que 'models' está importado
+from app.core.security import get_current_user, get_current_user_async, get_password_hash_async, verify_password_async 
+from app.api.deps import get_async_db, get_db
 from app.core.security import get_current_active_user # Correctamente importado get_db
 from app.models import User
 # Remova esta importação se você a colocou temporariamente para debug:
@@ -19,27 +21,32 @@ router = APIRouter()
 @router.put("/me/password", status_code=status.HTTP_204_NO_CONTENT) # <<< MUDADO PARA 204 NO CONTENT
 async def change_my_password(
     password_change: schemas.PasswordChange,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db), # Necessita de DB para commit
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db), # Necessita de DB para commit
 ):
     """
     Permite que o usuário logado altere sua própria senha.
     Requer a senha atual para verificação. Retorna 204 No Content em sucesso.
     """
-    if not verify_password(
-        password_change.current_password, current_user.hashed_password
+    # current_user pode vir do principal_cache: a senha atual é conferida com o hash do banco
+    current_hash = await async_crud.get_user_password_hash(db, current_user.id)
+    # Hash e verificação rodam no pool de senhas, fora do event loop
+    if current_hash is None or not await verify_password_async(
+        password_change.current_password, current_hash
     ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Senha atual incorreta."
         )
 
-    hashed_new_password = get_password_hash(password_change.new_password)
+    hashed_new_password = await get_password_hash_async(password_change.new_password)
 
-    # Atualiza a senha no objeto do usuário e persiste no DB
-    current_user.hashed_password = hashed_new_password
-    db.add(current_user)
-    db.commit()
-    # Não precisa de db.refresh(current_user) se o retorno for 204 No Content.
+    # UPDATE condicional: token_version + 1 calculado no banco (tokens emitidos com a senha antiga
+    # exigem novo login) e nada é gravado se a senha mudou desde a verificação
+    if not await async_crud.change_user_password(db, current_user.id, current_hash, hashed_new_password):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A senha foi alterada em outra sessão. Tente novamente.",
+        )
 
     asyncio.create_task(send_password_changed_email_resend(
         to_email=current_user.email,
@@ -74,16 +81,16 @@ def read_users_me(
 @router.get("/me/analytics", response_model=schemas.UserAnalytics)
 def get_user_analytics(
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db), # <<< ADICIONADO: db é necessário para crud.get_total_generated_content_count
+    db: Session = Depends(get_db),
+    granularity: Literal["day", "week"] = Query("day", description="Agrupamento da série: por dia ou por semana"),
+    days: int = Query(30, ge=1, le=366, description="Quantidade de dias cobertos pela série"),
 ):
     """
-    Retorna estatísticas de uso para o usuário logado.
+    Retorna estatísticas de uso para o usuário logado: totais, razão de favoritos,
+    gerações por dia/semana e burn-down da cota do plano no período atual.
+    Lido dos rollups diários (user_daily_usage), sem varrer o histórico.
     """
-    # crud.get_total_generated_content_count deve ser síncrono
-    total_generated = crud.get_total_generated_content_count(db, user_id=current_user.id)
-    return schemas.UserAnalytics(
-        total_generated_content=total_generated
-    )
+    return user_analytics.build_user_analytics(db, current_user, days=days, granularity=granularity)
 
 @router.post("/me/update-info")
 def update_user_info(
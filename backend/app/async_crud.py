@@ -0,0 +1,226 @@
+# backend/app/async_crud.py
+#
+# Variantes assíncronas (AsyncSession) das funções de crud.py, usadas pelos endpoints `async def`,
+# pelas tasks que rodam no event loop da API (lotes de geração) e pelo worker da fila de jobs.
+# Consultas simples são reescritas com select(); as funções com lógica de escrita reutilizam
+# crud.py via AsyncSession.run_sync, que executa o código síncrono sobre a conexão assíncrona
+# (o I/O continua não bloqueante, sem duplicar a regra de negócio).
+# Scheduler e scripts continuam usando crud.py com a sessão síncrona.
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app import crud, models, schemas
+from app.core.security import get_password_hash_async
+
+
+# --- Usuários ---
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(
+        select(models.User)
+        .options(joinedload(models.User.subscription_plan))
+        .filter(models.User.email == email)
+    )
+    return result.scalars().first()
+
+
+async def get_user_plan_name(db: AsyncSession, email: str) -> Optional[str]:
+    """Só o nome do plano do usuário (None sem usuário ou sem plano); usado pelo rate limiting."""
+    result = await db.execute(
+        select(models.SubscriptionPlan.name)
+        .join(models.User, models.User.subscription_plan_id == models.SubscriptionPlan.id)
+        .filter(models.User.email == email)
+    )
+    return result.scalar()
+
+
+async def get_user(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.User).filter(models.User.id == user_id))
+    return result.scalars().first()
+
+
+async def get_user_by_stripe_customer_id(db: AsyncSession, stripe_customer_id: str):
+    result = await db.execute(select(models.User).filter(models.User.stripe_customer_id == stripe_customer_id))
+    return result.scalars().first()
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    # O hash (bcrypt) roda no pool de senhas antes do run_sync, fora do event loop
+    hashed_password = await get_password_hash_async(user.password)
+
+    def _create_user(session):
+        db_user = crud.create_user(session, user, hashed_password)
+        if db_user:
+            db_user.subscription_plan  # Carrega o plano aqui: fora do run_sync não há lazy load
+        return db_user
+
+    return await db.run_sync(_create_user)
+
+
+async def update_user_password_hash(db: AsyncSession, user_id: int, hashed_password: str):
+    await db.run_sync(crud.update_user_password_hash, user_id, hashed_password)
+
+
+async def get_user_password_hash(db: AsyncSession, user_id: int) -> Optional[str]:
+    """Hash atual lido do banco (o usuário autenticado pode vir do principal_cache, com hash antigo)."""
+    result = await db.execute(select(models.User.hashed_password).filter(models.User.id == user_id))
+    return result.scalar()
+
+
+async def change_user_password(db: AsyncSession, user_id: int, current_hash: str, new_hash: str) -> bool:
+    return await db.run_sync(crud.change_user_password, user_id, current_hash, new_hash)
+
+
+async def update_user_stripe_customer_id(db: AsyncSession, user_id: int, stripe_customer_id: str):
+    return await db.run_sync(crud.update_user_stripe_customer_id, user_id, stripe_customer_id)
+
+
+async def adjust_user_generation_count(db: AsyncSession, user_id: int, delta: int):
+    await db.run_sync(crud.adjust_user_generation_count, user_id, delta)
+
+
+async def reserve_generation_quota(db: AsyncSession, user_id: int, amount: int = 1) -> bool:
+    return await db.run_sync(crud.reserve_generation_quota, user_id, amount)
+
+
+# --- Planos ---
+
+async def get_subscription_plan_by_stripe_price_id(db: AsyncSession, stripe_price_id: str):
+    result = await db.execute(
+        select(models.SubscriptionPlan).filter(models.SubscriptionPlan.price_id_stripe == stripe_price_id)
+    )
+    return result.scalars().first()
+
+
+async def get_subscription_plan_by_name(db: AsyncSession, name: str, interval: Optional[str] = None):
+    query = select(models.SubscriptionPlan).filter(models.SubscriptionPlan.name == name)
+    if interval:
+        query = query.filter(models.SubscriptionPlan.interval == interval)
+    result = await db.execute(query)
+    return result.scalars().first()
+
+
+async def get_all_subscription_plans(db: AsyncSession):
+    result = await db.execute(select(models.SubscriptionPlan))
+    return result.scalars().all()
+
+
+async def create_subscription_plan(db: AsyncSession, plan: schemas.SubscriptionPlanCreate):
+    return await db.run_sync(crud.create_subscription_plan, plan)
+
+
+async def update_subscription_plan(
+    db: AsyncSession, db_obj: models.SubscriptionPlan, obj_in: schemas.SubscriptionPlanUpdate
+):
+    return await db.run_sync(crud.update_subscription_plan, db_obj, obj_in)
+
+
+# --- Conteúdo gerado ---
+
+async def create_user_generated_content(
+    db: AsyncSession, content: schemas.GeneratedContentCreate, user_id: int, increment_count: bool = True
+):
+    return await db.run_sync(crud.create_user_generated_content, content, user_id, increment_count)
+
+
+async def create_user_generated_content_group(
+    db: AsyncSession, user_id: int, group_id: str, prompt_used: str, channel_texts: dict[str, str],
+    increment_count: bool = True,
+):
+    return await db.run_sync(
+        crud.create_user_generated_content_group, user_id, group_id, prompt_used, channel_texts, increment_count
+    )
+
+
+# --- Lotes e jobs de geração ---
+
+async def create_generation_batch(db: AsyncSession, batch_id: str, user_id: int, items: list[schemas.PropertyDetailsBase]):
+    return await db.run_sync(crud.create_generation_batch, batch_id, user_id, items)
+
+
+async def get_pending_generation_batch_items(db: AsyncSession, batch_id: str):
+    result = await db.execute(
+        select(models.GenerationBatchItem)
+        .filter(
+            models.GenerationBatchItem.batch_id == batch_id,
+            models.GenerationBatchItem.status == "pending",
+        )
+        .order_by(models.GenerationBatchItem.item_index)
+    )
+    return result.scalars().all()
+
+
+async def claim_generation_batch(db: AsyncSession, batch_id: str, worker_id: str, lease_seconds: int) -> bool:
+    return await db.run_sync(crud.claim_generation_batch, batch_id, worker_id, lease_seconds)
+
+
+async def claim_stale_generation_batches(
+    db: AsyncSession, worker_id: str, limit: int, lease_seconds: int
+) -> list[tuple[str, int]]:
+    return await db.run_sync(crud.claim_stale_generation_batches, worker_id, limit, lease_seconds)
+
+
+async def renew_generation_batch_lease(db: AsyncSession, batch_id: str, worker_id: str, lease_seconds: int) -> bool:
+    return await db.run_sync(crud.renew_generation_batch_lease, batch_id, worker_id, lease_seconds)
+
+
+async def release_generation_batch(db: AsyncSession, batch_id: str, worker_id: str) -> None:
+    await db.run_sync(crud.release_generation_batch, batch_id, worker_id)
+
+
+async def finish_generation_batch(db: AsyncSession, batch_id: str, worker_id: str) -> bool:
+    return await db.run_sync(crud.finish_generation_batch, batch_id, worker_id)
+
+
+async def complete_generation_batch_item(
+    db: AsyncSession,
+    item_id: int,
+    batch_id: str,
+    user_id: int,
+    content: schemas.GeneratedContentCreate | None = None,
+    error: str | None = None,
+):
+    return await db.run_sync(crud.complete_generation_batch_item, item_id, batch_id, user_id, content, error)
+
+
+async def claim_generation_jobs(
+    db: AsyncSession, worker_id: str, limit: int, lease_seconds: int, max_attempts: int
+):
+    return await db.run_sync(crud.claim_generation_jobs, worker_id, limit, lease_seconds, max_attempts)
+
+
+async def renew_generation_job_lease(db: AsyncSession, job_id: str, worker_id: str, lease_seconds: int) -> bool:
+    return await db.run_sync(crud.renew_generation_job_lease, job_id, worker_id, lease_seconds)
+
+
+async def complete_generation_job(
+    db: AsyncSession,
+    job_id: str,
+    worker_id: str,
+    user_id: int,
+    content: schemas.GeneratedContentCreate | None = None,
+    error: str | None = None,
+    retry: bool = False,
+) -> bool:
+    return await db.run_sync(crud.complete_generation_job, job_id, worker_id, user_id, content, error, retry)
+
+
+async def get_generation_job(db: AsyncSession, job_id: str, user_id: int):
+    result = await db.execute(
+        select(models.GenerationJob)
+        .options(joinedload(models.GenerationJob.generated_content))
+        .filter(models.GenerationJob.id == job_id, models.GenerationJob.owner_id == user_id)
+    )
+    return result.scalars().first()
+
+
+# --- Rate limiting ---
+
+async def take_rate_limit_token(
+    db: AsyncSession, key: str, capacity: int, refill_per_second: float, now: float
+) -> tuple[bool, float]:
+    return await db.run_sync(crud.take_rate_limit_token, key, capacity, refill_per_second, now)
@@ -2,6 +2,7 @@
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
+from typing import Optional
 import os
 
 class Settings(BaseSettings):
@@ -9,12 +10,125 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     DATABASE_URL: str = Field("sqlite:///D:/TEMPLATES/seu-saas-corretor/backend/sql_app.db", env="DATABASE_URL")
+    # URL do engine assíncrono (endpoints async). Vazio = derivada de DATABASE_URL
+    # trocando o driver por aiosqlite (SQLite) ou asyncpg (PostgreSQL)
+    ASYNC_DATABASE_URL: Optional[str] = Field(None, env="ASYNC_DATABASE_URL")
+    # Pool de conexões (valem para os engines síncrono e assíncrono, cada um com o seu pool)
+    DB_POOL_SIZE: int = Field(5, env="DB_POOL_SIZE") # Conexões mantidas abertas
+    DB_MAX_OVERFLOW: int = Field(10, env="DB_MAX_OVERFLOW") # Conexões extras em picos, fechadas ao devolver
+    DB_POOL_TIMEOUT_SECONDS: float = Field(30.0, env="DB_POOL_TIMEOUT_SECONDS") # Espera máxima por uma conexão livre
+    DB_POOL_RECYCLE_SECONDS: int = Field(1800, env="DB_POOL_RECYCLE_SECONDS") # Recria conexões mais velhas que isso (-1 = nunca)
+    DB_POOL_PRE_PING: bool = Field(True, env="DB_POOL_PRE_PING") # Testa a conexão antes de usar (descarta as derrubadas pelo servidor)
+    # PRAGMAs aplicados a cada conexão SQLite
+    SQLITE_JOURNAL_MODE: str = Field("WAL", env="SQLITE_JOURNAL_MODE") # WAL: leitores não bloqueiam o escritor
+    SQLITE_SYNCHRONOUS: str = Field("NORMAL", env="SQLITE_SYNCHRONOUS") # NORMAL é seguro com WAL e evita fsync a cada commit
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(5000, env="SQLITE_BUSY_TIMEOUT_MS") # Espera pelo lock em vez de falhar com "database is locked"
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
     ALGORITHM: str = Field("HS256", env="ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    # Embute id do usuário, plano, limite e versão no token; endpoints de leitura autorizam sem buscar o usuário
+    JWT_CLAIMS_ENABLED: bool = Field(False, env="JWT_CLAIMS_ENABLED")
+    # Custo do bcrypt (2^rounds iterações). Hashes com outro custo são refeitos no próximo login
+    PASSWORD_BCRYPT_ROUNDS: int = Field(12, env="PASSWORD_BCRYPT_ROUNDS")
+    PASSWORD_HASH_WORKERS: int = Field(4, env="PASSWORD_HASH_WORKERS") # Threads dedicadas a hash/verificação de senha
+    # E-mails com acesso às rotas administrativas, separados por vírgula
+    ADMIN_EMAILS: str = Field("admin@example.com", env="ADMIN_EMAILS")
     GOOGLE_API_KEY: str = Field(..., env="GOOGLE_API_KEY")
     DEEP_SEEK_API_KEY: str = Field(..., env="DEEP_SEEK_API_KEY")
 
+    # Roteador de provedores: ordem de preferência separada por vírgula ("deepseek,gemini")
+    LLM_PROVIDERS: str = Field("deepseek,gemini", env="LLM_PROVIDERS")
+    # Requisição "hedged": dispara o segundo provedor quando o primeiro passa do seu p95
+    LLM_HEDGE_ENABLED: bool = Field(False, env="LLM_HEDGE_ENABLED")
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = Field(6.0, env="LLM_HEDGE_DEFAULT_DELAY_SECONDS") # Usado até haver amostras suficientes
+    LLM_STATS_WINDOW: int = Field(200, env="LLM_STATS_WINDOW") # Nº de chamadas recentes consideradas por provedor
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = Field(5, env="LLM_CIRCUIT_FAILURE_THRESHOLD") # Falhas consecutivas para abrir o circuito
+    LLM_CIRCUIT_ERROR_RATE: float = Field(0.5, env="LLM_CIRCUIT_ERROR_RATE") # Taxa de erro (janela) para abrir o circuito
+    LLM_CIRCUIT_RESET_SECONDS: float = Field(30.0, env="LLM_CIRCUIT_RESET_SECONDS") # Tempo aberto antes de testar novamente
+
+    # Provedor fake para testes de carga (LLM_PROVIDERS="fake"); nunca chama a rede
+    FAKE_LLM_LATENCY_MODE: str = Field("fixed", env="FAKE_LLM_LATENCY_MODE") # fixed, lognormal ou replay
+    FAKE_LLM_LATENCY_MS: float = Field(800.0, env="FAKE_LLM_LATENCY_MS") # Valor fixo ou mediana da lognormal
+    FAKE_LLM_LATENCY_SIGMA: float = Field(0.5, env="FAKE_LLM_LATENCY_SIGMA") # Desvio (em log) da lognormal
+    FAKE_LLM_LATENCY_FILE: Optional[str] = Field(None, env="FAKE_LLM_LATENCY_FILE") # Uma latência (ms) por linha, repetidas em ciclo
+    FAKE_LLM_ERROR_RATE: float = Field(0.0, env="FAKE_LLM_ERROR_RATE")
+    FAKE_LLM_STREAM_CHUNK_INTERVAL_MS: float = Field(40.0, env="FAKE_LLM_STREAM_CHUNK_INTERVAL_MS")
+    FAKE_LLM_STREAM_CHUNK_WORDS: int = Field(3, env="FAKE_LLM_STREAM_CHUNK_WORDS")
+    FAKE_LLM_SEED: Optional[int] = Field(None, env="FAKE_LLM_SEED") # Semente do sorteio de latência/erros
+
+    # Clientes HTTP dos provedores de IA (criados no lifespan da aplicação)
+    LLM_HTTP_MAX_CONNECTIONS: int = Field(100, env="LLM_HTTP_MAX_CONNECTIONS")
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(20, env="LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = Field(60.0, env="LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS")
+    LLM_HTTP2: bool = Field(False, env="LLM_HTTP2") # Requer o pacote 'h2'
+    LLM_CONNECT_TIMEOUT_SECONDS: float = Field(5.0, env="LLM_CONNECT_TIMEOUT_SECONDS")
+    LLM_REQUEST_TIMEOUT_SECONDS: float = Field(30.0, env="LLM_REQUEST_TIMEOUT_SECONDS")
+    LLM_MAX_RETRIES: int = Field(1, env="LLM_MAX_RETRIES")
+    LLM_WARMUP_ENABLED: bool = Field(True, env="LLM_WARMUP_ENABLED")
+
+    # Modelos e parâmetros de geração de conteúdo (também compõem a chave do cache de gerações)
+    DEEPSEEK_MODEL: str = Field("deepseek-chat", env="DEEPSEEK_MODEL")
+    GEMINI_MODEL: str = Field("gemini-2.0-flash", env="GEMINI_MODEL")
+    LLM_TEMPERATURE: float = Field(0.7, env="LLM_TEMPERATURE")
+    LLM_MAX_TOKENS: int = Field(500, env="LLM_MAX_TOKENS")
+
+    # Cache de gerações idênticas (memória + tabela generation_cache)
+    GENERATION_CACHE_ENABLED: bool = Field(True, env="GENERATION_CACHE_ENABLED")
+    GENERATION_CACHE_TTL_SECONDS: int = Field(7 * 24 * 3600, env="GENERATION_CACHE_TTL_SECONDS")
+    GENERATION_CACHE_MAX_ENTRIES: int = Field(1024, env="GENERATION_CACHE_MAX_ENTRIES")
+
+    # Cache dos templates de prompt compilados (app/services/prompt_builder.py), por processo
+    PROMPT_TEMPLATE_CACHE_TTL_SECONDS: int = Field(600, env="PROMPT_TEMPLATE_CACHE_TTL_SECONDS")
+
+    # Geração em lote (/generate-content/batch)
+    BATCH_GENERATION_MAX_ITEMS: int = Field(2000, env="BATCH_GENERATION_MAX_ITEMS")
+    BATCH_GENERATION_CONCURRENCY: int = Field(5, env="BATCH_GENERATION_CONCURRENCY")
+    BATCH_GENERATION_LEASE_SECONDS: int = Field(120, env="BATCH_GENERATION_LEASE_SECONDS") # Renovado enquanto o lote roda; vencido, outro processo retoma
+    BATCH_GENERATION_RECOVERY_INTERVAL_SECONDS: float = Field(60.0, env="BATCH_GENERATION_RECOVERY_INTERVAL_SECONDS") # Busca de lotes abandonados
+    # Limite de requisições por minuto enviadas a cada provedor pelos lotes (0 = sem limite)
+    DEEPSEEK_REQUESTS_PER_MINUTE: int = Field(60, env="DEEPSEEK_REQUESTS_PER_MINUTE")
+    GEMINI_REQUESTS_PER_MINUTE: int = Field(60, env="GEMINI_REQUESTS_PER_MINUTE")
+    FAKE_LLM_REQUESTS_PER_MINUTE: int = Field(0, env="FAKE_LLM_REQUESTS_PER_MINUTE") # O fake não tem cota a proteger
+    LLM_DEFAULT_REQUESTS_PER_MINUTE: int = Field(60, env="LLM_DEFAULT_REQUESTS_PER_MINUTE") # Demais provedores
+
+    # Fila de jobs de geração (/generate-content/jobs + python -m app.jobs.generation_worker)
+    GENERATION_JOB_CONCURRENCY: int = Field(4, env="GENERATION_JOB_CONCURRENCY") # Jobs simultâneos por processo worker
+    GENERATION_JOB_POLL_INTERVAL_SECONDS: float = Field(1.0, env="GENERATION_JOB_POLL_INTERVAL_SECONDS")
+    GENERATION_JOB_LEASE_SECONDS: int = Field(180, env="GENERATION_JOB_LEASE_SECONDS") # Job "running" com lease vencido volta a ser reservável
+    GENERATION_JOB_MAX_ATTEMPTS: int = Field(3, env="GENERATION_JOB_MAX_ATTEMPTS")
+
+    # Exportação do histórico (/history/export)
+    HISTORY_EXPORT_BATCH_SIZE: int = Field(1000, env="HISTORY_EXPORT_BATCH_SIZE") # Linhas lidas do cursor e gravadas por bloco
+    HISTORY_EXPORT_GZIP_LEVEL: int = Field(6, env="HISTORY_EXPORT_GZIP_LEVEL")
+    HISTORY_BULK_MAX_IDS: int = Field(1000, env="HISTORY_BULK_MAX_IDS") # Ids aceitos por chamada de /history/contents/bulk/*
+
+    # Cache do usuário autenticado (app/services/principal_cache.py), por processo
+    PRINCIPAL_CACHE_ENABLED: bool = Field(True, env="PRINCIPAL_CACHE_ENABLED")
+    PRINCIPAL_CACHE_TTL_SECONDS: int = Field(30, env="PRINCIPAL_CACHE_TTL_SECONDS")
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = Field(10000, env="PRINCIPAL_CACHE_MAX_ENTRIES")
+
+    # Rate limiting (app/services/rate_limiter.py): token bucket por usuário (ou IP) e classe de rota.
+    # Limites em requisições/minuto no formato "gerais/gerações" (POST /generate-content*); 0 = sem limite
+    RATE_LIMIT_ENABLED: bool = Field(True, env="RATE_LIMIT_ENABLED")
+    RATE_LIMIT_BACKEND: str = Field("memory", env="RATE_LIMIT_BACKEND") # memory (por processo) ou database (compartilhado entre workers)
+    RATE_LIMIT_PLANS: str = Field("Free=60/6,Basic=120/20,Premium=300/60,Unlimited=600/120", env="RATE_LIMIT_PLANS") # Por nome do plano
+    RATE_LIMIT_DEFAULT_PLAN: str = Field("Free", env="RATE_LIMIT_DEFAULT_PLAN") # Limites para planos fora da lista ou não identificados
+    RATE_LIMIT_PLAN_CACHE_SECONDS: int = Field(300, env="RATE_LIMIT_PLAN_CACHE_SECONDS") # Plano lido do banco quando o token não traz a claim
+    RATE_LIMIT_ANONYMOUS: str = Field("30/6", env="RATE_LIMIT_ANONYMOUS") # Requisições sem token, por IP
+    RATE_LIMIT_EXEMPT_PATHS: str = Field("/api/v1/subscriptions/webhook", env="RATE_LIMIT_EXEMPT_PATHS") # Separados por vírgula
+    RATE_LIMIT_MAX_KEYS: int = Field(100000, env="RATE_LIMIT_MAX_KEYS") # Buckets mantidos em memória
+
+    # Arquivamento do histórico (generated_contents -> generated_contents_archive, textos comprimidos)
+    HISTORY_ARCHIVE_ENABLED: bool = Field(True, env="HISTORY_ARCHIVE_ENABLED")
+    HISTORY_ARCHIVE_AFTER_DAYS: int = Field(365, env="HISTORY_ARCHIVE_AFTER_DAYS") # Idade mínima para arquivar (favoritos nunca são arquivados)
+    HISTORY_ARCHIVE_BATCH_SIZE: int = Field(500, env="HISTORY_ARCHIVE_BATCH_SIZE") # Linhas movidas por transação
+    HISTORY_ARCHIVE_COMPRESSION_LEVEL: int = Field(6, env="HISTORY_ARCHIVE_COMPRESSION_LEVEL")
+
+
+    # Catálogo de planos em memória (app/services/plan_catalog.py) servido por GET /subscriptions/plans
+    PLAN_CATALOG_REFRESH_ENABLED: bool = Field(True, env="PLAN_CATALOG_REFRESH_ENABLED") # Task de atualização no lifespan
+    PLAN_CATALOG_STRIPE_SYNC_SECONDS: int = Field(3600, env="PLAN_CATALOG_STRIPE_SYNC_SECONDS") # Intervalo da sincronização com o Stripe
+    PLAN_CATALOG_RELOAD_SECONDS: int = Field(60, env="PLAN_CATALOG_RELOAD_SECONDS") # Releitura do banco (pega syncs feitas por outros workers)
 
     STRIPE_SECRET_KEY: str = Field(..., env="STRIPE_SECRET_KEY")
     STRIPE_WEBHOOK_SECRET: str = Field(..., env="STRIPE_WEBHOOK_SECRET")
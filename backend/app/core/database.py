@@ -1,12 +1,138 @@
 # backend/app/core/database.py
 
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
 
+
+# --- Estatísticas do pool de conexões (expostas em /admin/db-pool) ---
+class PoolStats:
+    """Contadores de checkout acumulados desde o início do processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+class _InstrumentedPoolMixin:
+    # Atributo de classe: sobrevive ao pool.recreate() feito por engine.dispose()
+    stats: PoolStats
+
+    def _do_get(self):
+        # Tempo até obter a conexão: espera por uma livre + abertura de uma nova (overflow)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    stats = PoolStats()
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+
+def _is_sqlite_memory(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def _pool_options(url: URL, poolclass) -> dict:
+    # SQLite em memória usa um pool próprio (conexão única); os parâmetros de fila não se aplicam
+    if _is_sqlite_memory(url):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+_SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SQLITE_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def _sqlite_pragmas() -> list[str]:
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in _SQLITE_JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE inválido: {settings.SQLITE_JOURNAL_MODE}")
+    if synchronous not in _SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS inválido: {settings.SQLITE_SYNCHRONOUS}")
+    return [
+        f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA journal_mode = {journal_mode}",
+        f"PRAGMA synchronous = {synchronous}",
+    ]
+
+
+def _install_sqlite_pragmas(sync_engine: Engine) -> None:
+    """
+    Aplica os PRAGMAs a cada nova conexão SQLite (WAL, busy_timeout, synchronous):
+    escritores concorrentes (geração, favoritos, reset mensal) esperam o lock em vez
+    de falhar com "database is locked".
+    """
+    if sync_engine.dialect.name != "sqlite":
+        return
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+_database_url = make_url(settings.DATABASE_URL)
+
 # Cria o motor do banco de dados usando a URL do DATABASE_URL das configurações
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {})
+engine = create_engine(
+    _database_url,
+    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    **_pool_options(_database_url, InstrumentedQueuePool),
+)
+_install_sqlite_pragmas(engine)
 
 # Cria uma SessionLocal que será usada para instanciar sessões de banco de dados
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,4 +147,63 @@ def get_db():
         yield db
     finally:
         db.close()
-        
\ No newline at end of file
+
+
+# --- Camada assíncrona (endpoints `async def`) ---
+# O caminho síncrono acima continua valendo para o scheduler, workers e scripts.
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def build_async_database_url(database_url: str) -> str:
+    """
+    Converte a URL síncrona para o driver assíncrono equivalente
+    (ex.: sqlite:///app.db -> sqlite+aiosqlite:///app.db).
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"Sem driver assíncrono conhecido para '{url.drivername}'; defina ASYNC_DATABASE_URL.")
+    return url.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+_async_database_url = make_url(settings.ASYNC_DATABASE_URL or build_async_database_url(settings.DATABASE_URL))
+async_engine = create_async_engine(
+    _async_database_url,
+    **_pool_options(_async_database_url, InstrumentedAsyncQueuePool),
+)
+_install_sqlite_pragmas(async_engine.sync_engine)
+
+# expire_on_commit=False: objetos continuam utilizáveis após o commit sem novo SELECT
+# (um lazy load implícito não funciona fora de um contexto await)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_status(sync_engine: Engine) -> dict:
+    """
+    Ocupação atual do pool do engine + contadores acumulados de checkout.
+    """
+    pool = sync_engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # overflow() fica negativo enquanto o pool ainda não abriu `size` conexões
+            overflow=max(pool.overflow(), 0),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            timeout_seconds=pool.timeout(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
@@ -1,5 +1,8 @@
 # backend/app/core/security.py
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from datetime import datetime, timedelta, timezone
@@ -8,15 +11,27 @@ from jose import JWTError, jwt
 from app.core.config import settings
 from fastapi import Depends, HTTPException, status # Certifique-se de importar Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from app.api.deps import get_db # <<< ADICIONE ESTA LINHA
+from app.api.deps import get_async_db, get_db # <<< ADICIONE ESTA LINHA
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session 
 from app.models import User 
+from app.services import principal_cache
 
 # O OAuth2PasswordBearer é usado para obter o token do cabeçalho Authorization
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
-# Para hash de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Para hash de senhas. Com bcrypt__rounds, hashes gerados com outro custo "precisam de update"
+# e verify_and_update devolve o hash novo (rehash transparente no login)
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
+
+# O bcrypt leva centenas de ms por chamada: em código async ele roda neste pool próprio e limitado,
+# para não travar o event loop nem ocupar o threadpool dos endpoints síncronos.
+# O bcrypt libera o GIL, então as threads calculam em paralelo.
+_password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -29,6 +44,35 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verifica a senha e, se o hash usa um custo diferente de PASSWORD_BCRYPT_ROUNDS,
+    devolve também o novo hash a ser gravado (senão None).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def _run_in_password_executor(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_hash_executor, func, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_password_executor(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_password_executor(get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await _run_in_password_executor(verify_and_update_password, plain_password, hashed_password)
+
+
+def shutdown_password_hashing() -> None:
+    _password_hash_executor.shutdown(wait=False, cancel_futures=True)
+
+
 # Para JWT
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Cria um token de acesso JWT."""
@@ -47,6 +91,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def access_token_data(user: User) -> dict:
+    """
+    Payload do token de login. Com JWT_CLAIMS_ENABLED, além do e-mail leva id do usuário,
+    plano, limite de gerações e a versão de token (users.token_version) do momento do login.
+    """
+    data = {"sub": user.email}
+    if settings.JWT_CLAIMS_ENABLED:
+        plan = user.subscription_plan
+        data.update(
+            uid=user.id,
+            plan_id=plan.id if plan else None,
+            plan=plan.name if plan else None,
+            plan_limit=plan.max_generations if plan else None,
+            ver=user.token_version or 0,
+        )
+    return data
+
+
 def decode_access_token(token: str):
     """Decodifica e valida um token de acesso JWT."""
     try:
@@ -60,41 +122,160 @@ def decode_access_token(token: str):
     except JWTError:
         return None  # Token inválido ou expirado
 
-# A função get_current_user precisa usar a sessão síncrona
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db) # <<< TIPO CORRIGIDO PARA Session (síncrona)
-):
-    from app import crud, models # Importe crud e models aqui para evitar circular import
-
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _session_expired_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Sessão expirada: faça login novamente.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _payload_from_token(token: str) -> dict:
     payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    email: str = payload.get("sub")
-    if email is None:
-        raise credentials_exception
-    
-    # crud.get_user_by_email pode precisar ser síncrono também
-    # Se crud.get_user_by_email() for um await, ele precisa ser síncrono.
-    # Se crud.get_user_by_email é uma função assíncrona, você precisa executá-la
-    # dentro de um run_in_threadpool para ambientes síncronos.
-    # Vamos assumir que suas funções crud.py serão síncronas agora.
-    user = crud.get_user_by_email(db, email=email) # Removido 'await' se crud for síncrono
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+
+def check_token_version(payload: dict, user: User) -> None:
+    """Tokens com claims emitidos antes de uma troca de plano ou de senha não valem mais."""
+    if "ver" in payload and payload["ver"] != (user.token_version or 0):
+        raise _session_expired_exception()
+
 
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """Identidade e plano do usuário autenticado, lidos das claims do token (sem carregar o User)."""
+    user_id: int
+    email: str
+    plan_id: Optional[int]
+    plan_name: Optional[str]
+    plan_limit: Optional[int]
+
+    @classmethod
+    def from_user(cls, user: User) -> "TokenPrincipal":
+        plan = user.subscription_plan
+        return cls(
+            user_id=user.id,
+            email=user.email,
+            plan_id=plan.id if plan else None,
+            plan_name=plan.name if plan else None,
+            plan_limit=plan.max_generations if plan else None,
+        )
+
+
+def resolve_principal(db: Session, email: str) -> Optional[User]:
+    """
+    Usuário do token (com o plano carregado), anexado à sessão `db`.
+    Vem do principal_cache quando possível; só vai ao banco em cache miss.
+    """
+    from app import crud # Importe crud aqui para evitar circular import
+
+    cached = principal_cache.get(email)
+    if cached is not None:
+        return db.merge(cached, load=False)
+    user = crud.get_user_by_email(db, email=email)
+    if user is None or not settings.PRINCIPAL_CACHE_ENABLED:
+        return user
+    principal_cache.put(db, user)
+    return db.merge(user, load=False)
+
+
+async def resolve_principal_async(db: AsyncSession, email: str) -> Optional[User]:
+    from app import async_crud # Importe async_crud aqui para evitar circular import
+
+    cached = principal_cache.get(email)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+    user = await async_crud.get_user_by_email(db, email=email)
+    if user is None or not settings.PRINCIPAL_CACHE_ENABLED:
+        return user
+    principal_cache.put(db.sync_session, user)
+    return await db.merge(user, load=False)
+
+
+# Versão síncrona, para endpoints `def`: o FastAPI a executa no threadpool,
+# então a consulta ao banco não bloqueia o event loop
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db) # <<< TIPO CORRIGIDO PARA Session (síncrona)
+):
+    payload = _payload_from_token(token)
+    user = resolve_principal(db, payload["sub"])
     if user is None:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    check_token_version(payload, user)
     return user
 
 
+# Versão para endpoints `async def`: o usuário vem da mesma AsyncSession do endpoint
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+):
+    payload = _payload_from_token(token)
+    user = await resolve_principal_async(db, payload["sub"])
+    if user is None:
+        raise _credentials_exception()
+    check_token_version(payload, user)
+    return user
+
+
+# Para endpoints só de leitura que precisam apenas do id e do plano do usuário.
+# Com um token com claims (JWT_CLAIMS_ENABLED) não carrega o usuário: só confere a versão do
+# token, que vem do principal_cache (em cache miss, uma consulta de uma coluna pela PK).
+# Tokens sem claims seguem o caminho normal (resolve_principal).
+def get_token_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> TokenPrincipal:
+    from app import crud # Importe crud aqui para evitar circular import
+
+    payload = _payload_from_token(token)
+    if "uid" not in payload or "ver" not in payload:
+        user = resolve_principal(db, payload["sub"])
+        if user is None:
+            raise _credentials_exception()
+        return TokenPrincipal.from_user(user)
+
+    user_id = payload["uid"]
+    version = principal_cache.get_token_version(user_id)
+    if version is None:
+        version = crud.get_user_token_version(db, user_id)
+        if version is None:
+            raise _credentials_exception()
+        principal_cache.put_token_version(user_id, version)
+    if version != payload["ver"]:
+        raise _session_expired_exception()
+    return TokenPrincipal(
+        user_id=user_id,
+        email=payload["sub"],
+        plan_id=payload.get("plan_id"),
+        plan_name=payload.get("plan"),
+        plan_limit=payload.get("plan_limit"),
+    )
+
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Usuário inativo")
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def get_current_admin_user(
+    current_user: User = Depends(get_current_user),
+):
+    admin_emails = {email.strip().lower() for email in settings.ADMIN_EMAILS.split(",") if email.strip()}
+    if current_user.email.lower() not in admin_emails:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito a administradores.")
+    return current_user
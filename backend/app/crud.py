@@ -6,8 +6,12 @@ from sqlalchemy.orm import Session, joinedload
 from app import models, schemas
 from app.core.security import get_password_hash
 from app.core.config import settings
-from sqlalchemy import desc, func
-from datetime import datetime
+from app.services import history_search, principal_cache
+from sqlalchemy import Date, String, and_, bindparam, case, cast, delete, desc, func, literal, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import date, datetime, timedelta, timezone
+import heapq
+import zlib
 
 
 def get_user_by_email(db: Session, email: str):
@@ -20,14 +24,23 @@ def get_user_by_email(db: Session, email: str):
 
     return user
 
-def create_user(db: Session, user: schemas.UserCreate):
+def get_user_token_version(db: Session, user_id: int) -> Optional[int]:
+    """Só a versão de token do usuário (None se ele não existe); usada na validação de tokens com claims."""
+    return db.query(models.User.token_version).filter(models.User.id == user_id).scalar()
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    """
+    Cria o usuário com o plano Free. Chamadores async passam `hashed_password` já calculado
+    (security.get_password_hash_async), para o bcrypt não rodar dentro do run_sync.
+    """
     db_user = get_user_by_email(
         db, email=user.email
     )  # Verificação já feita no endpoint, mas reforce
     if db_user:
         return None  # Usuário já existe
 
-    hashed_password = get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
 
     # --- CORREÇÃO AQUI: Atribuir plano "Free" ao usuário ao registrar ---
     free_plan = (
@@ -70,24 +83,202 @@ def create_user(db: Session, user: schemas.UserCreate):
 
 
 def create_user_generated_content(
-    db: Session, content: schemas.GeneratedContentCreate, user_id: int
+    db: Session, content: schemas.GeneratedContentCreate, user_id: int, increment_count: bool = True
 ):
     """
     Cria e salva um novo registro de conteúdo gerado no banco de dados.
+    Com increment_count=False a cota não é tocada (a geração já reservou a cota com
+    reserve_generation_quota; lotes reservam a cota de uma vez).
     """
     db_content = models.GeneratedContent(**content.model_dump(), owner_id=user_id)
     db.add(db_content)
+    if increment_count:
+        adjust_user_generation_count(db, user_id, 1, commit=False)
+    # id e created_at voltam no próprio INSERT (RETURNING); sem refresh extra
+    db.flush()
+    _record_new_contents_usage(db, user_id, [db_content])
+    db.commit()
+    if increment_count:
+        principal_cache.invalidate_user(user_id)
+    return db_content
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user:
-        user.content_generations_count += 1
-        db.add(user)
 
+def create_user_generated_content_group(
+    db: Session, user_id: int, group_id: str, prompt_used: str, channel_texts: dict[str, str],
+    increment_count: bool = True,
+):
+    """
+    Salva os textos de uma geração multicanal (um GeneratedContent por canal, mesmo group_id).
+    Conta como uma única geração na cota do usuário (increment_count=False se já reservada).
+    """
+    db_contents = [
+        models.GeneratedContent(
+            owner_id=user_id,
+            prompt_used=prompt_used,
+            generated_text=text,
+            group_id=group_id,
+            channel=channel,
+        )
+        for channel, text in channel_texts.items()
+    ]
+    db.add_all(db_contents)
+    if increment_count:
+        adjust_user_generation_count(db, user_id, 1, commit=False)
+    db.flush()
+    _record_new_contents_usage(db, user_id, db_contents)
     db.commit()
-    db.refresh(db_content)
-    if user:
-        db.refresh(user)
-    return db_content
+    if increment_count:
+        principal_cache.invalidate_user(user_id)
+    return db_contents
+
+
+def _sqlite_datetime_text(value: datetime) -> str:
+    """created_at no formato em que o SQLite o grava via server_default (microssegundos só se houver)."""
+    stored = value.strftime("%Y-%m-%d %H:%M:%S")
+    if value.microsecond:
+        stored += f".{value.microsecond:06d}"
+    return stored
+
+
+def _keyset_datetime(db: Session, value: datetime):
+    """
+    Valor de created_at para comparar com a coluna no cursor.
+    No SQLite a coluna é texto: o server_default (CURRENT_TIMESTAMP) grava "AAAA-MM-DD HH:MM:SS",
+    mas o SQLAlchemy envia parâmetros sempre com microssegundos, o que quebraria a igualdade
+    entre itens do mesmo segundo. Por isso o valor vai no mesmo formato do que está gravado
+    (a camada fria copia o mesmo texto, ver archive_generated_contents_chunk).
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return value
+    return literal(_sqlite_datetime_text(value), String)
+
+
+def _filter_user_generated_contents(
+    db: Session,
+    query,
+    user_id: int,
+    is_favorite: bool | None,
+    search_query: str | None,
+    start_date: datetime | None,
+    end_date: datetime | None,
+):
+    # Filtros comuns à listagem paginada e à exportação; devolve (query, rank, snippet) da busca
+    query = query.filter(models.GeneratedContent.owner_id == user_id)
+
+    if is_favorite is not None:
+        query = query.filter(models.GeneratedContent.is_favorite == is_favorite)
+
+    rank = snippet = None
+    if search_query:
+        query, rank, snippet = history_search.apply_search(db, query, search_query)
+
+    if start_date:
+        query = query.filter(models.GeneratedContent.created_at >= start_date)
+    if end_date:
+        query = query.filter(models.GeneratedContent.created_at <= end_date)
+    return query, rank, snippet
+
+
+# --- Camada fria (generated_contents_archive) ---
+
+def history_archive_cutoff() -> datetime:
+    """Conteúdos criados antes deste instante (UTC) podem estar arquivados."""
+    return datetime.utcnow() - timedelta(days=settings.HISTORY_ARCHIVE_AFTER_DAYS)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _reaches_archive(
+    is_favorite: bool | None, search_query: str | None, start_date: datetime | None, end_date: datetime | None
+) -> bool:
+    # O arquivo só entra quando um filtro de data alcança conteúdos antigos o bastante para ter sido
+    # arquivados. Favoritos nunca são arquivados; a busca textual só cobre a camada quente
+    # (os textos arquivados estão comprimidos, fora do índice full-text).
+    if is_favorite or search_query:
+        return False
+    cutoff = history_archive_cutoff()
+    return any(value is not None and _naive_utc(value) < cutoff for value in (start_date, end_date))
+
+
+def _filter_archived_contents(
+    query, user_id: int, start_date: datetime | None, end_date: datetime | None
+):
+    archive = models.ArchivedGeneratedContent
+    query = query.filter(archive.owner_id == user_id)
+    if start_date:
+        query = query.filter(archive.created_at >= start_date)
+    if end_date:
+        query = query.filter(archive.created_at <= end_date)
+    return query
+
+
+def _history_order_key(item) -> tuple:
+    # Mesma ordem das consultas: created_at desc, id desc
+    return (item.created_at, item.id)
+
+
+def archive_generated_contents_chunk(db: Session, cutoff: datetime, batch_size: int, compression_level: int = 6) -> int:
+    """
+    Move até batch_size conteúdos não favoritados criados antes de cutoff para
+    generated_contents_archive (textos comprimidos com zlib), em uma transação.
+    Os rollups diários não mudam: o conteúdo continua existindo. Retorna quantos foram movidos.
+    """
+    content = models.GeneratedContent
+    rows = (
+        db.query(
+            content.id,
+            content.owner_id,
+            content.created_at,
+            content.group_id,
+            content.channel,
+            content.prompt_used,
+            content.generated_text,
+        )
+        .filter(
+            content.created_at < cutoff,
+            or_(content.is_favorite.is_(False), content.is_favorite.is_(None)),
+        )
+        .order_by(content.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not rows:
+        return 0
+
+    archived_rows = [
+        {
+            "id": row.id,
+            "owner_id": row.owner_id,
+            "created_at": row.created_at,
+            "group_id": row.group_id,
+            "channel": row.channel,
+            "prompt_used_zlib": zlib.compress(row.prompt_used.encode("utf-8"), compression_level),
+            "generated_text_zlib": zlib.compress(row.generated_text.encode("utf-8"), compression_level),
+        }
+        for row in rows
+    ]
+    if db.get_bind().dialect.name == "sqlite":
+        # Grava created_at com o mesmo texto de generated_contents (o tipo DateTime sempre acrescentaria
+        # ".000000"): assim _keyset_datetime vale para as duas camadas no cursor do histórico
+        for archived_row in archived_rows:
+            archived_row["created_at_text"] = _sqlite_datetime_text(archived_row.pop("created_at"))
+        db.execute(
+            sqlite.insert(models.ArchivedGeneratedContent).values(
+                created_at=bindparam("created_at_text", type_=String)
+            ),
+            archived_rows,
+        )
+    else:
+        db.bulk_insert_mappings(models.ArchivedGeneratedContent, archived_rows)
+    content_ids = [row.id for row in rows]
+    _release_content_references(db, content_ids)
+    db.query(content).filter(content.id.in_(content_ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(rows)
 
 
 def get_user_generated_contents(
@@ -99,34 +290,105 @@ def get_user_generated_contents(
     search_query: str | None = None,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
+    sort: str = "date",
+    after: tuple[datetime, int] | None = None,
 ):
     """
     Retorna o histórico de conteúdo gerado por um usuário, com opções de filtragem.
+    A busca textual usa o índice full-text do banco (ver services/history_search.py);
+    nesse caso cada item traz `snippet` com os termos destacados e, com sort="relevance",
+    a ordem é pela relevância.
+    `after` = (created_at, id) do último item da página anterior (paginação por cursor,
+    só para sort="date"): a consulta continua do ponto exato, sem OFFSET.
+    Quando start_date/end_date alcançam a camada fria, os conteúdos arquivados entram
+    no resultado (intercalados pela mesma ordem).
     """
-    query = db.query(models.GeneratedContent).filter(
-        models.GeneratedContent.owner_id == user_id
+    include_archive = _reaches_archive(is_favorite, search_query, start_date, end_date)
+    query = db.query(models.GeneratedContent)
+    query, rank, snippet = _filter_user_generated_contents(
+        db, query, user_id, is_favorite, search_query, start_date, end_date
     )
 
-    if is_favorite is not None:
-        query = query.filter(models.GeneratedContent.is_favorite == is_favorite)
-
-    if search_query:
+    if after is not None:
+        after_created_at, after_id = after
         query = query.filter(
-            (models.GeneratedContent.prompt_used.ilike(f"%{search_query}%"))
-            | (models.GeneratedContent.generated_text.ilike(f"%{search_query}%"))
+            tuple_(models.GeneratedContent.created_at, models.GeneratedContent.id)
+            < tuple_(_keyset_datetime(db, after_created_at), after_id)
         )
 
-    if start_date:
-        query = query.filter(models.GeneratedContent.created_at >= start_date)
-    if end_date:
-        query = query.filter(models.GeneratedContent.created_at <= end_date)
+    # id desempata itens criados no mesmo instante (ordem total, necessária para o cursor)
+    if sort == "relevance" and rank is not None:
+        query = query.order_by(rank, desc(models.GeneratedContent.created_at), desc(models.GeneratedContent.id))
+    else:
+        query = query.order_by(desc(models.GeneratedContent.created_at), desc(models.GeneratedContent.id))
 
-    return (
-        query.order_by(desc(models.GeneratedContent.created_at))
-        .offset(skip)
-        .limit(limit)
-        .all()
+    if include_archive:
+        # Cada camada entrega até skip + limit itens; a página sai da intercalação das duas
+        contents = query.limit(skip + limit).all()
+        archive = models.ArchivedGeneratedContent
+        archived = _filter_archived_contents(db.query(archive), user_id, start_date, end_date)
+        if after is not None:
+            archived = archived.filter(
+                tuple_(archive.created_at, archive.id) < tuple_(_keyset_datetime(db, after_created_at), after_id)
+            )
+        archived = archived.order_by(desc(archive.created_at), desc(archive.id)).limit(skip + limit).all()
+        merged = heapq.merge(contents, archived, key=_history_order_key, reverse=True)
+        return list(merged)[skip:skip + limit]
+
+    if skip:
+        query = query.offset(skip)
+    query = query.limit(limit)
+
+    if snippet is None:
+        return query.all()
+    return history_search.attach_snippets(query.add_columns(snippet).all())
+
+
+# Colunas exportadas por /history/export (na ordem das colunas do CSV)
+HISTORY_EXPORT_COLUMNS = ("id", "created_at", "is_favorite", "channel", "group_id", "prompt_used", "generated_text")
+
+
+def iter_user_generated_contents_for_export(
+    db: Session,
+    user_id: int,
+    is_favorite: bool | None = None,
+    search_query: str | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    batch_size: int = 1000,
+):
+    """
+    Percorre todo o histórico filtrado (mesmos filtros de get_user_generated_contents, inclusive
+    a camada fria), do mais recente para o mais antigo, como tuplas simples (sem objetos ORM).
+    yield_per lê do cursor do servidor em blocos de batch_size: a memória fica constante
+    qualquer que seja o tamanho do histórico.
+    """
+    query = db.query(*(getattr(models.GeneratedContent, column) for column in HISTORY_EXPORT_COLUMNS))
+    query, _, _ = _filter_user_generated_contents(
+        db, query, user_id, is_favorite, search_query, start_date, end_date
+    )
+    query = query.order_by(desc(models.GeneratedContent.created_at), desc(models.GeneratedContent.id))
+    rows = query.yield_per(batch_size)
+    if not _reaches_archive(is_favorite, search_query, start_date, end_date):
+        return rows
+
+    archive = models.ArchivedGeneratedContent
+    archived = _filter_archived_contents(
+        db.query(
+            archive.id, archive.created_at, archive.channel, archive.group_id,
+            archive.prompt_used_zlib, archive.generated_text_zlib,
+        ),
+        user_id, start_date, end_date,
+    ).order_by(desc(archive.created_at), desc(archive.id))
+    archived_rows = (
+        (
+            content_id, created_at, False, channel, group_id,
+            zlib.decompress(prompt_zlib).decode("utf-8"), zlib.decompress(text_zlib).decode("utf-8"),
+        )
+        for content_id, created_at, channel, group_id, prompt_zlib, text_zlib in archived.yield_per(batch_size)
     )
+    # As duas camadas já vêm ordenadas: a intercalação mantém a memória constante
+    return heapq.merge(rows, archived_rows, key=lambda row: (row[1], row[0]), reverse=True)
 
 
 def create_prompt_template(db: Session, template: schemas.PromptTemplateBase):
@@ -145,6 +407,29 @@ def get_prompt_template(db: Session, template_id: int):
     )
 
 
+def get_prompt_template_by_name(db: Session, name: str):
+    return (
+        db.query(models.PromptTemplate)
+        .filter(models.PromptTemplate.name == name)
+        .first()
+    )
+
+
+def get_prompt_template_source(db: Session, template_id: int):
+    """
+    Lê apenas id, template_text e is_premium do template, para compilar (ou validar o cache de compilação).
+    """
+    return (
+        db.query(
+            models.PromptTemplate.id,
+            models.PromptTemplate.template_text,
+            models.PromptTemplate.is_premium,
+        )
+        .filter(models.PromptTemplate.id == template_id)
+        .first()
+    )
+
+
 def get_all_prompt_templates(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.PromptTemplate).offset(skip).limit(limit).all()
 
@@ -184,6 +469,7 @@ def create_subscription_plan(db: Session, plan: schemas.SubscriptionPlanCreate):
     db_plan = models.SubscriptionPlan(**plan.model_dump())
     db.add(db_plan)
     db.commit()
+    principal_cache.clear()  # Usuários em cache carregam o plano junto
     db.refresh(db_plan)
 
     return db_plan
@@ -197,6 +483,7 @@ def update_subscription_plan(
         setattr(db_obj, field, value)
     db.add(db_obj)
     db.commit()
+    principal_cache.clear()  # Usuários em cache carregam o plano junto
     db.refresh(db_obj)
     return db_obj
 
@@ -209,6 +496,34 @@ def get_subscription_plan_by_name(db: Session, name: str, interval: Optional[str
         query = query.filter(models.SubscriptionPlan.interval == interval)
     return query.first()
 
+def update_user_password_hash(db: Session, user_id: int, hashed_password: str):
+    """Regrava o hash da mesma senha com o custo atual (rehash no login); não invalida tokens."""
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {models.User.hashed_password: hashed_password}, synchronize_session=False
+    )
+    db.commit()
+    principal_cache.invalidate_user(user_id)
+
+def change_user_password(db: Session, user_id: int, current_hash: str, new_hash: str) -> bool:
+    """
+    Troca a senha e incrementa token_version no banco (tokens antigos exigem novo login).
+    Só grava se o hash ainda for `current_hash`, o que foi verificado: False se a senha mudou no meio.
+    """
+    updated = (
+        db.query(models.User)
+        .filter(models.User.id == user_id, models.User.hashed_password == current_hash)
+        .update(
+            {
+                models.User.hashed_password: new_hash,
+                models.User.token_version: func.coalesce(models.User.token_version, 0) + 1,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    principal_cache.invalidate_user(user_id)
+    return bool(updated)
+
 # Adicione esta nova função para atualizar o customer_id do Stripe do usuário
 def update_user_stripe_customer_id(db: Session, user_id: int, stripe_customer_id: str):
     user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -216,6 +531,7 @@ def update_user_stripe_customer_id(db: Session, user_id: int, stripe_customer_id
         user.stripe_customer_id = stripe_customer_id
         db.add(user)
         db.commit()
+        principal_cache.invalidate_user(user_id)
         db.refresh(user)
         return user
     return None
@@ -229,15 +545,143 @@ def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
 
-def get_total_generated_content_count(db: Session, user_id: int) -> int:
+# --- Rollups diários de uso (user_daily_usage) ---
+
+def _usage_day(created_at: datetime | None) -> date:
+    # Dia do rollup = data de created_at em UTC (a mesma regra de _content_day_expression)
+    if created_at is None:
+        return datetime.utcnow().date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def _content_day_expression(db: Session, model=models.GeneratedContent):
+    created_at = model.created_at
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.timezone("UTC", created_at), Date)
+    return func.date(created_at)
+
+
+def _rollup_row_day(value) -> date:
+    # Resultado de _content_day_expression: no SQLite, date() devolve texto
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _bump_daily_usage(
+    db: Session, user_id: int, day: date, generations: int = 0, contents: int = 0, favorites: int = 0
+) -> None:
     """
-    Retorna a contagem total de conteúdos gerados por um usuário.
+    Soma os deltas na linha (user_id, day) do rollup, criando-a se não existir (upsert).
+    Não faz commit: roda na transação da escrita que originou a mudança.
     """
-    return (
-        db.query(func.count(models.GeneratedContent.id))
-        .filter(models.GeneratedContent.owner_id == user_id)
-        .scalar() # Usa .scalar() para obter o resultado de contagem diretamente
+    usage = models.UserDailyUsage
+    deltas = {"generations": generations, "contents": contents, "favorites": favorites}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = insert(usage).values(user_id=user_id, day=day, **deltas)
+        statement = statement.on_conflict_do_update(
+            index_elements=[usage.user_id, usage.day],
+            set_={name: getattr(usage, name) + getattr(statement.excluded, name) for name in deltas},
+        )
+        db.execute(statement)
+        return
+
+    updated = (
+        db.query(usage)
+        .filter(usage.user_id == user_id, usage.day == day)
+        .update({getattr(usage, name): getattr(usage, name) + delta for name, delta in deltas.items()}, synchronize_session=False)
+    )
+    if not updated:
+        db.add(usage(user_id=user_id, day=day, **deltas))
+        db.flush()
+
+
+def _record_new_contents_usage(db: Session, user_id: int, db_contents: list[models.GeneratedContent]) -> None:
+    # Conteúdos recém-inseridos (já com created_at após o flush); um grupo multicanal é uma geração
+    by_day: dict[date, list] = {}
+    for db_content in db_contents:
+        by_day.setdefault(_usage_day(db_content.created_at), []).append(db_content)
+    for index, (day, day_contents) in enumerate(by_day.items()):
+        _bump_daily_usage(
+            db,
+            user_id,
+            day,
+            generations=1 if index == 0 else 0,
+            contents=len(day_contents),
+            favorites=sum(1 for db_content in day_contents if db_content.is_favorite),
+        )
+
+
+def _release_content_references(db: Session, content_ids) -> None:
+    # Jobs e itens de lote apontam para generated_contents sem ON DELETE; soltamos a referência
+    for model in (models.GenerationJob, models.GenerationBatchItem):
+        db.query(model).filter(model.generated_content_id.in_(content_ids)).update(
+            {model.generated_content_id: None}, synchronize_session=False
+        )
+
+
+def _delete_generated_contents(db: Session, user_id: int, content_filter, model=models.GeneratedContent) -> int:
+    """
+    Exclui os conteúdos do usuário que casam com content_filter (em generated_contents ou,
+    com model=ArchivedGeneratedContent, na camada fria), descontando dos rollups
+    (agrupado por dia) e soltando as referências de jobs e lotes. Não faz commit.
+    """
+    content = model
+    owner_filter = and_(content.owner_id == user_id, content_filter)
+    day = _content_day_expression(db, model)
+    favorite_count = (
+        func.coalesce(func.sum(case((content.is_favorite.is_(True), 1), else_=0)), 0)
+        if model is models.GeneratedContent
+        else literal(0)
+    )
+    per_day = (
+        db.query(day.label("day"), func.count(content.id), favorite_count)
+        .filter(owner_filter)
+        .group_by(day)
+        .all()
     )
+    if not per_day:
+        return 0
+
+    if model is models.GeneratedContent:
+        _release_content_references(db, select(content.id).where(owner_filter))
+    deleted = db.query(content).filter(owner_filter).delete(synchronize_session=False)
+
+    for content_day, count, favorites in per_day:
+        _bump_daily_usage(db, user_id, _rollup_row_day(content_day), contents=-count, favorites=-favorites)
+    return deleted
+
+
+def get_user_daily_usage(db: Session, user_id: int, start_day: date | None = None):
+    """
+    Linhas do rollup do usuário (a partir de start_day), em ordem de dia.
+    """
+    query = db.query(models.UserDailyUsage).filter(models.UserDailyUsage.user_id == user_id)
+    if start_day is not None:
+        query = query.filter(models.UserDailyUsage.day >= start_day)
+    return query.order_by(models.UserDailyUsage.day).all()
+
+
+def get_user_usage_totals(db: Session, user_id: int) -> tuple[int, int]:
+    """
+    (conteúdos, favoritos) do usuário, somados a partir dos rollups diários.
+    """
+    usage = models.UserDailyUsage
+    contents, favorites = (
+        db.query(func.coalesce(func.sum(usage.contents), 0), func.coalesce(func.sum(usage.favorites), 0))
+        .filter(usage.user_id == user_id)
+        .one()
+    )
+    return int(contents), int(favorites)
+
+
+def get_total_generated_content_count(db: Session, user_id: int) -> int:
+    """
+    Retorna a contagem total de conteúdos gerados por um usuário (lida dos rollups diários).
+    """
+    return get_user_usage_totals(db, user_id)[0]
 
 def update_generated_content_favorite_status(
     db: Session, content_id: int, user_id: int, is_favorite: bool
@@ -255,12 +699,92 @@ def update_generated_content_favorite_status(
     )
 
     if db_content:
+        if bool(db_content.is_favorite) != is_favorite:
+            _bump_daily_usage(
+                db, user_id, _usage_day(db_content.created_at), favorites=1 if is_favorite else -1
+            )
         db_content.is_favorite = is_favorite
         db.add(db_content)
         db.commit()
         db.refresh(db_content)
     return db_content
 
+
+def _history_selection_filter(db: Session, user_id: int, ids: list[int] | None, filters: dict | None):
+    # Condição da seleção em massa: lista de ids ou os filtros do histórico (busca via subconsulta de ids)
+    content = models.GeneratedContent
+    if ids is not None:
+        return and_(content.owner_id == user_id, content.id.in_(ids))
+    query, _, _ = _filter_user_generated_contents(db, db.query(content.id), user_id, **filters)
+    return and_(content.owner_id == user_id, content.id.in_(query.statement.correlate(None)))
+
+
+def bulk_update_generated_content_favorite_status(
+    db: Session, user_id: int, is_favorite: bool, ids: list[int] | None = None, filters: dict | None = None
+) -> int:
+    """
+    Favorita/desfavorita em um único UPDATE todos os conteúdos do usuário selecionados
+    por `ids` ou pelos filtros do histórico. Só as linhas cujo valor muda são tocadas
+    (e descontadas/somadas nos rollups diários). Retorna quantas linhas mudaram.
+    """
+    content = models.GeneratedContent
+    changing = and_(
+        _history_selection_filter(db, user_id, ids, filters),
+        func.coalesce(content.is_favorite, False) != is_favorite,
+    )
+    day = _content_day_expression(db)
+    per_day = db.query(day, func.count(content.id)).filter(changing).group_by(day).all()
+    if not per_day:
+        return 0
+
+    updated = db.query(content).filter(changing).update(
+        {content.is_favorite: is_favorite}, synchronize_session=False
+    )
+    for content_day, count in per_day:
+        _bump_daily_usage(db, user_id, _rollup_row_day(content_day), favorites=count if is_favorite else -count)
+    db.commit()
+    return updated
+
+
+def bulk_delete_generated_contents(
+    db: Session, user_id: int, ids: list[int] | None = None, filters: dict | None = None
+) -> int:
+    """
+    Exclui em um único DELETE os conteúdos do usuário selecionados por `ids` ou pelos
+    filtros do histórico (rollups atualizados na mesma transação). Conteúdos arquivados
+    alcançados pela seleção saem em um segundo DELETE. Retorna quantos foram excluídos.
+    """
+    deleted = _delete_generated_contents(db, user_id, _history_selection_filter(db, user_id, ids, filters))
+    archive = models.ArchivedGeneratedContent
+    if ids is not None:
+        deleted += _delete_generated_contents(db, user_id, archive.id.in_(ids), model=archive)
+    elif _reaches_archive(**filters):
+        archived_ids = _filter_archived_contents(
+            db.query(archive.id), user_id, filters["start_date"], filters["end_date"]
+        )
+        deleted += _delete_generated_contents(
+            db, user_id, archive.id.in_(archived_ids.statement.correlate(None)), model=archive
+        )
+    db.commit()
+    return deleted
+
+
+def delete_generated_content(db: Session, content_id: int, user_id: int) -> bool:
+    """
+    Exclui um conteúdo do usuário, descontando-o dos rollups diários na mesma transação.
+    Retorna False se o conteúdo não existe ou não pertence ao usuário.
+    """
+    content_filter = and_(
+        models.GeneratedContent.id == content_id,
+        models.GeneratedContent.owner_id == user_id,
+    )
+    deleted = _delete_generated_contents(db, user_id, content_filter)
+    if not deleted:
+        archive = models.ArchivedGeneratedContent
+        deleted = _delete_generated_contents(db, user_id, archive.id == content_id, model=archive)
+    db.commit()
+    return deleted > 0
+
 def get_all_users(db: Session):
     return db.query(models.User).options(joinedload(models.User.subscription_plan)).all()
 
@@ -274,5 +798,711 @@ def update_user_info(db: Session, user_id: int, payload: schemas.UserUpdate):
     user.creci = payload["creci"]
 
     db.commit()
+    principal_cache.invalidate_user(user_id)
     db.refresh(user)
     return user
+
+
+def get_generation_cache_entry(db: Session, cache_key: str):
+    """
+    Retorna a entrada persistida do cache de gerações, se existir e não estiver expirada.
+    """
+    return (
+        db.query(models.GenerationCacheEntry)
+        .filter(
+            models.GenerationCacheEntry.cache_key == cache_key,
+            models.GenerationCacheEntry.expires_at > datetime.utcnow(),
+        )
+        .first()
+    )
+
+
+def upsert_generation_cache_entry(
+    db: Session, cache_key: str, provider: str, model: str, generated_text: str, expires_at: datetime
+):
+    """
+    Cria ou atualiza uma entrada do cache de gerações.
+    """
+    db_entry = (
+        db.query(models.GenerationCacheEntry)
+        .filter(models.GenerationCacheEntry.cache_key == cache_key)
+        .first()
+    )
+    if db_entry:
+        db_entry.provider = provider
+        db_entry.model = model
+        db_entry.generated_text = generated_text
+        db_entry.expires_at = expires_at
+    else:
+        db_entry = models.GenerationCacheEntry(
+            cache_key=cache_key,
+            provider=provider,
+            model=model,
+            generated_text=generated_text,
+            hit_count=0,
+            expires_at=expires_at,
+        )
+        db.add(db_entry)
+    db.commit()
+    return db_entry
+
+
+def increment_generation_cache_hits(db: Session, cache_key: str):
+    db.query(models.GenerationCacheEntry).filter(
+        models.GenerationCacheEntry.cache_key == cache_key
+    ).update(
+        {models.GenerationCacheEntry.hit_count: models.GenerationCacheEntry.hit_count + 1},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+
+def adjust_user_generation_count(db: Session, user_id: int, delta: int, commit: bool = True):
+    """
+    Soma delta ao contador de gerações do usuário em um único UPDATE (estorno de cota, quando negativo).
+    """
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {models.User.content_generations_count: models.User.content_generations_count + delta},
+        synchronize_session=False,
+    )
+    if commit:
+        db.commit()
+        principal_cache.invalidate_user(user_id)
+
+
+def _reserve_generation_quota(db: Session, user_id: int, amount: int) -> bool:
+    # Limite do plano lido na mesma instrução; sem plano ou max_generations <= 0 = ilimitado
+    plan_limit = (
+        select(models.SubscriptionPlan.max_generations)
+        .where(models.SubscriptionPlan.id == models.User.subscription_plan_id)
+        .scalar_subquery()
+    )
+    updated = (
+        db.query(models.User)
+        .filter(
+            models.User.id == user_id,
+            or_(
+                func.coalesce(plan_limit, 0) <= 0,
+                models.User.content_generations_count + amount <= plan_limit,
+            ),
+        )
+        .update(
+            {models.User.content_generations_count: models.User.content_generations_count + amount},
+            synchronize_session=False,
+        )
+    )
+    return updated == 1
+
+
+def reserve_generation_quota(db: Session, user_id: int, amount: int = 1) -> bool:
+    """
+    Reserva `amount` gerações da cota em um UPDATE condicional, antes de chamar o provedor:
+    UPDATE users SET count = count + amount WHERE id = ? AND (limite <= 0 OR count + amount <= limite).
+    Requisições concorrentes não conseguem ultrapassar o limite do plano. Retorna False se não houver cota.
+    Estorne com adjust_user_generation_count(db, user_id, -amount) se a geração falhar.
+    """
+    reserved = _reserve_generation_quota(db, user_id, amount)
+    db.commit()
+    if reserved:
+        principal_cache.invalidate_user(user_id)
+    return reserved
+
+
+def create_generation_batch(db: Session, batch_id: str, user_id: int, items: list[schemas.PropertyDetailsBase]):
+    """
+    Cria o lote e seus itens pendentes em uma única transação, reservando a cota
+    do lote inteiro (len(items)). Retorna None (nada é gravado) se a cota não bastar.
+    """
+    if not _reserve_generation_quota(db, user_id, len(items)):
+        db.commit()  # Encerra a transação (o UPDATE condicional não alterou nada)
+        return None
+    db_batch = models.GenerationBatch(
+        id=batch_id,
+        owner_id=user_id,
+        status="queued",
+        total_items=len(items),
+        succeeded_items=0,
+        failed_items=0,
+    )
+    db.add(db_batch)
+    db.add_all(
+        [
+            models.GenerationBatchItem(
+                batch_id=batch_id,
+                item_index=index,
+                property_details=item.model_dump_json(),
+                status="pending",
+            )
+            for index, item in enumerate(items)
+        ]
+    )
+    db.commit()
+    principal_cache.invalidate_user(user_id)
+    db.refresh(db_batch)
+    return db_batch
+
+
+def get_generation_batch(db: Session, batch_id: str, user_id: int):
+    return (
+        db.query(models.GenerationBatch)
+        .filter(models.GenerationBatch.id == batch_id, models.GenerationBatch.owner_id == user_id)
+        .first()
+    )
+
+
+def get_pending_generation_batch_items(db: Session, batch_id: str):
+    return (
+        db.query(models.GenerationBatchItem)
+        .filter(
+            models.GenerationBatchItem.batch_id == batch_id,
+            models.GenerationBatchItem.status == "pending",
+        )
+        .order_by(models.GenerationBatchItem.item_index)
+        .all()
+    )
+
+
+def get_generation_batch_items(db: Session, batch_id: str, skip: int = 0, limit: int = 100, status: str | None = None):
+    query = (
+        db.query(models.GenerationBatchItem)
+        .options(joinedload(models.GenerationBatchItem.generated_content))
+        .filter(models.GenerationBatchItem.batch_id == batch_id)
+    )
+    if status:
+        query = query.filter(models.GenerationBatchItem.status == status)
+    return query.order_by(models.GenerationBatchItem.item_index).offset(skip).limit(limit).all()
+
+
+def update_generation_batch_status(db: Session, batch_id: str, status: str, finished: bool = False):
+    values = {models.GenerationBatch.status: status}
+    if finished:
+        values[models.GenerationBatch.finished_at] = func.now()
+    db.query(models.GenerationBatch).filter(models.GenerationBatch.id == batch_id).update(
+        values, synchronize_session=False
+    )
+    db.commit()
+
+
+def _claim_generation_batch(db: Session, batch_id: str, worker_id: str, lease_seconds: int, claimable) -> bool:
+    now = datetime.utcnow()
+    return bool(
+        db.query(models.GenerationBatch)
+        .filter(models.GenerationBatch.id == batch_id, claimable)
+        .update(
+            {
+                models.GenerationBatch.status: "running",
+                models.GenerationBatch.worker_id: worker_id,
+                models.GenerationBatch.locked_until: now + timedelta(seconds=lease_seconds),
+            },
+            synchronize_session=False,
+        )
+    )
+
+
+def claim_generation_batch(db: Session, batch_id: str, worker_id: str, lease_seconds: int) -> bool:
+    """
+    Reserva um lote recém-criado (queued) para o processo `worker_id`, com lease de `lease_seconds`.
+    """
+    claimed = _claim_generation_batch(
+        db, batch_id, worker_id, lease_seconds, models.GenerationBatch.status == "queued"
+    )
+    db.commit()
+    return claimed
+
+
+def claim_stale_generation_batches(db: Session, worker_id: str, limit: int, lease_seconds: int) -> list[tuple[str, int]]:
+    """
+    Reserva até `limit` lotes abandonados: "running" com lease vencido (o processo da API caiu ou
+    foi reiniciado) ou "queued" há mais de um lease (caiu antes de começar). Cada reserva é um
+    UPDATE condicional, então dois processos nunca retomam o mesmo lote. Retorna (id, dono).
+    """
+    now = datetime.utcnow()
+    stale = or_(
+        and_(
+            models.GenerationBatch.status == "running",
+            or_(models.GenerationBatch.locked_until.is_(None), models.GenerationBatch.locked_until < now),
+        ),
+        and_(
+            models.GenerationBatch.status == "queued",
+            models.GenerationBatch.created_at < now - timedelta(seconds=lease_seconds),
+        ),
+    )
+    candidates = (
+        db.query(models.GenerationBatch.id, models.GenerationBatch.owner_id)
+        .filter(stale)
+        .order_by(models.GenerationBatch.created_at)
+        .limit(limit)
+        .all()
+    )
+    claimed = [
+        (batch_id, owner_id)
+        for batch_id, owner_id in candidates
+        if _claim_generation_batch(db, batch_id, worker_id, lease_seconds, stale)
+    ]
+    db.commit()
+    return claimed
+
+
+def renew_generation_batch_lease(db: Session, batch_id: str, worker_id: str, lease_seconds: int) -> bool:
+    """Estende o lease do lote. False se outro processo assumiu o lote."""
+    renewed = (
+        db.query(models.GenerationBatch)
+        .filter(
+            models.GenerationBatch.id == batch_id,
+            models.GenerationBatch.status == "running",
+            models.GenerationBatch.worker_id == worker_id,
+        )
+        .update(
+            {models.GenerationBatch.locked_until: datetime.utcnow() + timedelta(seconds=lease_seconds)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return bool(renewed)
+
+
+def release_generation_batch(db: Session, batch_id: str, worker_id: str) -> None:
+    """Libera o lote ainda em andamento (ex.: shutdown) para ser retomado na próxima recuperação."""
+    db.query(models.GenerationBatch).filter(
+        models.GenerationBatch.id == batch_id,
+        models.GenerationBatch.status == "running",
+        models.GenerationBatch.worker_id == worker_id,
+    ).update(
+        {models.GenerationBatch.worker_id: None, models.GenerationBatch.locked_until: None},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def finish_generation_batch(db: Session, batch_id: str, worker_id: str) -> bool:
+    """
+    Encerra o lote (failed se todos os itens falharam, senão completed), desde que `worker_id`
+    ainda tenha o lease e não reste item pendente. Retorna False se o lote não foi encerrado.
+    """
+    batch = models.GenerationBatch
+    pending = (
+        select(models.GenerationBatchItem.id)
+        .where(models.GenerationBatchItem.batch_id == batch_id, models.GenerationBatchItem.status == "pending")
+        .exists()
+    )
+    finished = (
+        db.query(batch)
+        .filter(batch.id == batch_id, batch.status == "running", batch.worker_id == worker_id, ~pending)
+        .update(
+            {
+                batch.status: case((batch.failed_items == batch.total_items, "failed"), else_="completed"),
+                batch.finished_at: func.now(),
+                batch.worker_id: None,
+                batch.locked_until: None,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return bool(finished)
+
+
+def complete_generation_batch_item(
+    db: Session,
+    item_id: int,
+    batch_id: str,
+    user_id: int,
+    content: schemas.GeneratedContentCreate | None = None,
+    error: str | None = None,
+):
+    """
+    Registra o resultado de um item pendente do lote (conteúdo gerado ou erro) e atualiza
+    os contadores do lote na mesma transação; um item com erro estorna a sua unidade de cota.
+    Retorna o id do GeneratedContent criado (None com erro ou se o item já tinha resultado).
+    """
+    item_values = {}
+    db_content = None
+    if content is not None:
+        db_content = models.GeneratedContent(**content.model_dump(), owner_id=user_id)
+        db.add(db_content)
+        db.flush()
+        _record_new_contents_usage(db, user_id, [db_content])
+        item_values = {
+            models.GenerationBatchItem.status: "succeeded",
+            models.GenerationBatchItem.generated_content_id: db_content.id,
+        }
+        counter = models.GenerationBatch.succeeded_items
+    else:
+        item_values = {
+            models.GenerationBatchItem.status: "failed",
+            models.GenerationBatchItem.error: error,
+        }
+        counter = models.GenerationBatch.failed_items
+
+    updated = (
+        db.query(models.GenerationBatchItem)
+        .filter(models.GenerationBatchItem.id == item_id, models.GenerationBatchItem.status == "pending")
+        .update(item_values, synchronize_session=False)
+    )
+    if not updated:
+        # Outro processo retomou o lote e já registrou este item
+        db.rollback()
+        return None
+    db.query(models.GenerationBatch).filter(models.GenerationBatch.id == batch_id).update(
+        {counter: counter + 1}, synchronize_session=False
+    )
+    if db_content is None:
+        db.query(models.User).filter(models.User.id == user_id).update(
+            {models.User.content_generations_count: models.User.content_generations_count - 1},
+            synchronize_session=False,
+        )
+    db.commit()
+    if db_content is None:
+        principal_cache.invalidate_user(user_id)
+        return None
+    return db_content.id
+
+
+def create_generation_job(db: Session, job_id: str, user_id: int, property_details: schemas.PropertyDetailsBase):
+    """
+    Enfileira um job de geração. A cota do usuário é reservada (+1) na mesma transação.
+    Retorna None (nada é gravado) se o usuário não tiver cota.
+    """
+    if not _reserve_generation_quota(db, user_id, 1):
+        db.commit()  # Encerra a transação (o UPDATE condicional não alterou nada)
+        return None
+    db_job = models.GenerationJob(
+        id=job_id,
+        owner_id=user_id,
+        property_details=property_details.model_dump_json(),
+        status="queued",
+        attempts=0,
+    )
+    db.add(db_job)
+    db.commit()
+    principal_cache.invalidate_user(user_id)
+    db.refresh(db_job)
+    return db_job
+
+
+def get_generation_job(db: Session, job_id: str, user_id: int):
+    return (
+        db.query(models.GenerationJob)
+        .options(joinedload(models.GenerationJob.generated_content))
+        .filter(models.GenerationJob.id == job_id, models.GenerationJob.owner_id == user_id)
+        .first()
+    )
+
+
+def _fail_exhausted_generation_jobs(db: Session, max_attempts: int, now: datetime) -> list[int]:
+    """
+    Marca como failed os jobs com lease vencido que já gastaram `max_attempts` tentativas
+    (o worker caiu ou travou em todas) e estorna a cota reservada. Não faz commit;
+    retorna os donos com cota estornada.
+    """
+    exhausted = and_(
+        models.GenerationJob.status == "running",
+        models.GenerationJob.locked_until < now,
+        models.GenerationJob.attempts >= max_attempts,
+    )
+    refunds: dict[int, int] = {}
+    for job_id, owner_id in db.query(models.GenerationJob.id, models.GenerationJob.owner_id).filter(exhausted):
+        updated = (
+            db.query(models.GenerationJob)
+            .filter(models.GenerationJob.id == job_id, exhausted)
+            .update(
+                {
+                    models.GenerationJob.status: "failed",
+                    models.GenerationJob.error: "O job excedeu o número máximo de tentativas.",
+                    models.GenerationJob.finished_at: now,
+                    models.GenerationJob.worker_id: None,
+                    models.GenerationJob.locked_until: None,
+                },
+                synchronize_session=False,
+            )
+        )
+        if updated:
+            refunds[owner_id] = refunds.get(owner_id, 0) + 1
+    for owner_id, count in refunds.items():
+        db.query(models.User).filter(models.User.id == owner_id).update(
+            {models.User.content_generations_count: models.User.content_generations_count - count},
+            synchronize_session=False,
+        )
+    return list(refunds)
+
+
+def claim_generation_jobs(db: Session, worker_id: str, limit: int, lease_seconds: int, max_attempts: int):
+    """
+    Reserva até `limit` jobs para o worker. Cada reserva é um UPDATE condicional
+    (só vale se o job ainda estiver livre), então dois workers nunca ficam com o mesmo job.
+    Jobs "running" com lease vencido (worker que caiu) voltam a ser reserváveis enquanto
+    tiverem menos de `max_attempts` tentativas; os que esgotaram viram failed, com estorno da cota.
+    """
+    now = datetime.utcnow()
+    refunded_users = _fail_exhausted_generation_jobs(db, max_attempts, now)
+    claimable = or_(
+        models.GenerationJob.status == "queued",
+        and_(
+            models.GenerationJob.status == "running",
+            models.GenerationJob.locked_until < now,
+            models.GenerationJob.attempts < max_attempts,
+        ),
+    )
+    candidate_ids = [
+        row.id
+        for row in db.query(models.GenerationJob.id)
+        .filter(claimable)
+        .order_by(models.GenerationJob.created_at)
+        .limit(limit)
+    ]
+
+    claimed_ids = []
+    for job_id in candidate_ids:
+        updated = (
+            db.query(models.GenerationJob)
+            .filter(models.GenerationJob.id == job_id, claimable)
+            .update(
+                {
+                    models.GenerationJob.status: "running",
+                    models.GenerationJob.worker_id: worker_id,
+                    models.GenerationJob.locked_until: now + timedelta(seconds=lease_seconds),
+                    models.GenerationJob.attempts: models.GenerationJob.attempts + 1,
+                    models.GenerationJob.started_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        if updated:
+            claimed_ids.append(job_id)
+    db.commit()
+    for user_id in refunded_users:
+        principal_cache.invalidate_user(user_id)
+
+    if not claimed_ids:
+        return []
+    return (
+        db.query(models.GenerationJob)
+        .filter(models.GenerationJob.id.in_(claimed_ids))
+        .order_by(models.GenerationJob.created_at)
+        .all()
+    )
+
+
+def renew_generation_job_lease(db: Session, job_id: str, worker_id: str, lease_seconds: int) -> bool:
+    """Estende o lease do job. False se outro worker assumiu o job ou ele já terminou."""
+    renewed = (
+        db.query(models.GenerationJob)
+        .filter(
+            models.GenerationJob.id == job_id,
+            models.GenerationJob.status == "running",
+            models.GenerationJob.worker_id == worker_id,
+        )
+        .update(
+            {models.GenerationJob.locked_until: datetime.utcnow() + timedelta(seconds=lease_seconds)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return bool(renewed)
+
+
+def complete_generation_job(
+    db: Session,
+    job_id: str,
+    worker_id: str,
+    user_id: int,
+    content: schemas.GeneratedContentCreate | None = None,
+    error: str | None = None,
+    retry: bool = False,
+) -> bool:
+    """
+    Registra o resultado de um job reservado por `worker_id`:
+    - com `content`, salva o GeneratedContent e marca o job como succeeded;
+    - com `error` e `retry`, devolve o job para a fila;
+    - com `error` sem `retry`, marca como failed e estorna a cota reservada.
+    Retorna False se o worker perdeu o lease (outro worker assumiu o job); nada é gravado.
+    """
+    now = datetime.utcnow()
+    if content is not None:
+        db_content = models.GeneratedContent(**content.model_dump(), owner_id=user_id)
+        db.add(db_content)
+        db.flush()
+        _record_new_contents_usage(db, user_id, [db_content])
+        job_values = {
+            models.GenerationJob.status: "succeeded",
+            models.GenerationJob.generated_content_id: db_content.id,
+            models.GenerationJob.error: None,
+            models.GenerationJob.finished_at: now,
+        }
+    elif retry:
+        job_values = {
+            models.GenerationJob.status: "queued",
+            models.GenerationJob.error: error,
+        }
+    else:
+        job_values = {
+            models.GenerationJob.status: "failed",
+            models.GenerationJob.error: error,
+            models.GenerationJob.finished_at: now,
+        }
+    job_values.update({models.GenerationJob.worker_id: None, models.GenerationJob.locked_until: None})
+
+    updated = (
+        db.query(models.GenerationJob)
+        .filter(
+            models.GenerationJob.id == job_id,
+            models.GenerationJob.status == "running",
+            models.GenerationJob.worker_id == worker_id,
+        )
+        .update(job_values, synchronize_session=False)
+    )
+    if not updated:
+        db.rollback()
+        return False
+
+    if content is None and not retry:
+        db.query(models.User).filter(models.User.id == user_id).update(
+            {models.User.content_generations_count: models.User.content_generations_count - 1},
+            synchronize_session=False,
+        )
+    db.commit()
+    if content is None and not retry:
+        principal_cache.invalidate_user(user_id)
+    return True
+
+
+def create_generation_telemetry(db: Session, user_id: int | None = None, **values):
+    """
+    Grava a telemetria de uma geração, guardando o nome do plano do usuário no momento da geração.
+    """
+    plan_name = None
+    if user_id is not None:
+        plan_name = (
+            db.query(models.SubscriptionPlan.name)
+            .join(models.User, models.User.subscription_plan_id == models.SubscriptionPlan.id)
+            .filter(models.User.id == user_id)
+            .scalar()
+        )
+    db_telemetry = models.GenerationTelemetry(user_id=user_id, plan_name=plan_name, **values)
+    db.add(db_telemetry)
+    db.commit()
+    return db_telemetry
+
+
+def get_generation_metrics(db: Session, since: datetime, until: datetime | None = None):
+    """
+    Agrega generation_telemetry por dia, plano e provedor.
+    Totais com GROUP BY; percentis de latência (p50/p95/p99, nearest-rank) com
+    ROW_NUMBER/COUNT em janela, que funcionam tanto no SQLite quanto no PostgreSQL.
+    Percentis consideram apenas chamadas bem-sucedidas a provedores (sem cache hits).
+    """
+    telemetry = models.GenerationTelemetry
+    day = func.date(telemetry.created_at)
+    filters = [telemetry.created_at >= since]
+    if until is not None:
+        filters.append(telemetry.created_at < until)
+
+    totals = (
+        db.query(
+            day.label("day"),
+            telemetry.plan_name,
+            telemetry.provider,
+            func.count(telemetry.id).label("generations"),
+            func.sum(case((telemetry.error_class.isnot(None), 1), else_=0)).label("errors"),
+            func.sum(case((telemetry.cache_hit.is_(True), 1), else_=0)).label("cache_hits"),
+            func.coalesce(func.sum(telemetry.prompt_tokens), 0).label("prompt_tokens"),
+            func.coalesce(func.sum(telemetry.completion_tokens), 0).label("completion_tokens"),
+            func.avg(telemetry.prompt_tokens).label("avg_prompt_tokens"),
+            func.avg(telemetry.prompt_chars).label("avg_prompt_chars"),
+        )
+        .filter(*filters)
+        .group_by(day, telemetry.plan_name, telemetry.provider)
+        .order_by(day, telemetry.plan_name, telemetry.provider)
+        .all()
+    )
+
+    partition = (day, telemetry.plan_name, telemetry.provider)
+    ranked = (
+        db.query(
+            day.label("day"),
+            telemetry.plan_name.label("plan_name"),
+            telemetry.provider.label("provider"),
+            telemetry.latency_ms.label("latency_ms"),
+            func.row_number().over(partition_by=partition, order_by=telemetry.latency_ms).label("rn"),
+            func.count(telemetry.id).over(partition_by=partition).label("cnt"),
+        )
+        .filter(
+            *filters,
+            telemetry.provider.isnot(None),
+            telemetry.error_class.is_(None),
+            telemetry.latency_ms.isnot(None),
+        )
+        .subquery()
+    )
+
+    def percentile(p: float, label: str):
+        return func.min(case((ranked.c.rn >= p * ranked.c.cnt, ranked.c.latency_ms))).label(label)
+
+    percentiles = (
+        db.query(
+            ranked.c.day,
+            ranked.c.plan_name,
+            ranked.c.provider,
+            percentile(0.50, "p50_latency_ms"),
+            percentile(0.95, "p95_latency_ms"),
+            percentile(0.99, "p99_latency_ms"),
+        )
+        .group_by(ranked.c.day, ranked.c.plan_name, ranked.c.provider)
+        .all()
+    )
+    return totals, percentiles
+
+
+# --- Rate limiting (backend compartilhado) ---
+
+def take_rate_limit_token(
+    db: Session, key: str, capacity: int, refill_per_second: float, now: float
+) -> tuple[bool, float]:
+    """
+    Retira uma ficha do bucket `key` em rate_limit_buckets, reabastecido até `now` (epoch).
+    Devolve (permitido, fichas restantes). O caso comum (ficha disponível) é um único
+    UPDATE condicional, atômico entre processos.
+    """
+    bucket = models.RateLimitBucket
+    refilled = bucket.tokens + (now - bucket.updated_at) * refill_per_second
+    # O teto nunca fica abaixo das fichas já no bucket: uma capacidade menor (plano trocado ou não
+    # identificado) só limita o reabastecimento, sem descartar a rajada de quem tinha um limite maior
+    refilled = case(
+        (refilled > capacity, case((bucket.tokens > capacity, bucket.tokens), else_=float(capacity))),
+        else_=refilled,
+    )
+    tokens = db.execute(
+        update(bucket)
+        .where(bucket.key == key, refilled >= 1)
+        .values(tokens=refilled - 1, updated_at=now)
+        .returning(bucket.tokens)
+    ).scalar()
+    if tokens is not None:
+        db.commit()
+        return True, tokens
+
+    # Bucket inexistente (nasce cheio, já com esta requisição descontada) ou sem fichas
+    dialect = db.get_bind().dialect.name
+    insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+    created = db.execute(
+        insert(bucket)
+        .values(key=key, tokens=capacity - 1, updated_at=now)
+        .on_conflict_do_nothing(index_elements=[bucket.key])
+        .returning(bucket.tokens)
+    ).scalar()
+    if created is not None:
+        db.commit()
+        return True, created
+    tokens = db.query(refilled).filter(bucket.key == key).scalar()
+    db.commit()
+    return False, tokens or 0.0
+
+
+def delete_idle_rate_limit_buckets(db: Session, idle_before: float) -> int:
+    """Remove buckets sem uso desde `idle_before` (epoch): já estariam cheios, como um bucket novo."""
+    deleted = db.execute(
+        delete(models.RateLimitBucket).where(models.RateLimitBucket.updated_at < idle_before)
+    ).rowcount
+    db.commit()
+    return deleted
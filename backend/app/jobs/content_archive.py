@@ -0,0 +1,50 @@
+# backend/app/jobs/content_archive.py
+#
+# Move conteúdos antigos e não favoritados de generated_contents para a camada fria
+# (generated_contents_archive, textos comprimidos), em blocos de HISTORY_ARCHIVE_BATCH_SIZE
+# linhas por transação. Agendado diariamente em monthly_reset.start_scheduler; também pode
+# ser executado à mão: python -m app.jobs.content_archive
+
+import logging
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def archive_old_generated_contents() -> int:
+    if not settings.HISTORY_ARCHIVE_ENABLED:
+        return 0
+
+    cutoff = crud.history_archive_cutoff()
+    archived = 0
+    db: Session = SessionLocal()
+    try:
+        while True:
+            moved = crud.archive_generated_contents_chunk(
+                db,
+                cutoff=cutoff,
+                batch_size=settings.HISTORY_ARCHIVE_BATCH_SIZE,
+                compression_level=settings.HISTORY_ARCHIVE_COMPRESSION_LEVEL,
+            )
+            archived += moved
+            if moved < settings.HISTORY_ARCHIVE_BATCH_SIZE:
+                break
+    except Exception as e:
+        logger.error(f"Erro ao arquivar conteúdos: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+    if archived:
+        logger.info(f"[ARQUIVO] {archived} conteúdos anteriores a {cutoff:%Y-%m-%d} movidos para a camada fria")
+    return archived
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    archive_old_generated_contents()
@@ -0,0 +1,202 @@
+# backend/app/jobs/generation_worker.py
+#
+# Worker da fila de jobs de geração (tabela generation_jobs).
+# Roda fora da API, em quantos processos/máquinas forem necessários:
+#
+#     python -m app.jobs.generation_worker --processes 2 --concurrency 8
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import uuid
+
+from app import async_crud, schemas
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.services import llm_clients, llm_router
+from app.services.generation_service import generate_property_content
+from app.services.generation_telemetry import record_generation_async
+from app.services.prompt_builder import PromptTemplateError, get_compiled_template
+
+logger = logging.getLogger(__name__)
+
+
+async def _keep_lease(job_id: str, worker_id: str) -> None:
+    """
+    Renova o lease do job enquanto a geração anda, para que gerações mais longas que
+    GENERATION_JOB_LEASE_SECONDS não sejam reservadas de novo por outro worker.
+    """
+    interval = max(settings.GENERATION_JOB_LEASE_SECONDS / 3, 1)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                renewed = await async_crud.renew_generation_job_lease(
+                    db, job_id, worker_id, settings.GENERATION_JOB_LEASE_SECONDS
+                )
+        except Exception as e:
+            logger.error(f"Erro ao renovar o lease do job {job_id}: {e}")
+            continue
+        if not renewed:
+            logger.warning(f"Job {job_id}: lease perdido, outro worker assumiu o job.")
+            return
+
+
+async def process_job(job_id: str, owner_id: int, payload: str, attempts: int, worker_id: str) -> None:
+    heartbeat = asyncio.create_task(_keep_lease(job_id, worker_id))
+    # A AsyncSession devolve a conexão ao pool no commit feito antes da chamada ao LLM
+    async with AsyncSessionLocal() as db:
+        try:
+            property_details = schemas.PropertyDetailsBase.model_validate_json(payload)
+            try:
+                # Acesso ao template foi validado no enfileiramento
+                template = (
+                    await db.run_sync(get_compiled_template, property_details.template_id)
+                    if property_details.template_id
+                    else None
+                )
+                try:
+                    result = await generate_property_content(db, property_details, template)
+                finally:
+                    # A partir daqui o job é concluído ou devolvido; o lease não precisa mais ser renovado
+                    heartbeat.cancel()
+            except PromptTemplateError as e:
+                await async_crud.complete_generation_job(db, job_id, worker_id, owner_id, error=str(e))
+                return
+            except llm_router.LLMProviderError as e:
+                retry = attempts < settings.GENERATION_JOB_MAX_ATTEMPTS
+                logger.warning(f"Job {job_id} falhou (tentativa {attempts}, nova tentativa: {retry}): {e}")
+                await async_crud.complete_generation_job(
+                    db, job_id, worker_id, owner_id, error="Falha do provedor ao gerar o conteúdo.", retry=retry
+                )
+                await record_generation_async(
+                    db, source="job", user_id=owner_id, template_id=property_details.template_id, error=e
+                )
+                return
+
+            saved = await async_crud.complete_generation_job(
+                db, job_id, worker_id, owner_id,
+                content=schemas.GeneratedContentCreate(prompt_used=result.prompt_used, generated_text=result.generated_text),
+            )
+            if not saved:
+                logger.warning(f"Job {job_id}: lease perdido, resultado descartado.")
+                return
+            db_job = await async_crud.get_generation_job(db, job_id=job_id, user_id=owner_id)
+            await record_generation_async(
+                db, source="job", user_id=owner_id, template_id=property_details.template_id, result=result,
+                generated_content_id=db_job.generated_content_id,
+            )
+        except Exception:
+            logger.exception(f"Erro inesperado no job {job_id}")
+            await db.rollback()
+            await async_crud.complete_generation_job(
+                db, job_id, worker_id, owner_id, error="Erro interno ao processar o job.",
+                retry=attempts < settings.GENERATION_JOB_MAX_ATTEMPTS,
+            )
+        finally:
+            heartbeat.cancel()
+
+
+async def _claim_jobs(worker_id: str, limit: int) -> list[tuple]:
+    async with AsyncSessionLocal() as db:
+        jobs = await async_crud.claim_generation_jobs(
+            db, worker_id, limit, settings.GENERATION_JOB_LEASE_SECONDS, settings.GENERATION_JOB_MAX_ATTEMPTS
+        )
+        # Copia os dados antes de fechar a sessão
+        return [(job.id, job.owner_id, job.property_details, job.attempts) for job in jobs]
+
+
+async def run_worker(worker_id: str, concurrency: int, poll_interval: float, stop: asyncio.Event) -> None:
+    """
+    Mantém até `concurrency` jobs em andamento, reservando novos à medida que os anteriores terminam.
+    Ao receber `stop`, para de reservar e espera os jobs em andamento.
+    """
+    await llm_clients.startup()
+    in_flight: set = set()
+    logger.info(f"Worker {worker_id} iniciado (concorrência {concurrency}).")
+    try:
+        while not stop.is_set():
+            free_slots = concurrency - len(in_flight)
+            claimed = await _claim_jobs(worker_id, free_slots) if free_slots > 0 else []
+            for job_id, owner_id, payload, attempts in claimed:
+                in_flight.add(asyncio.create_task(process_job(job_id, owner_id, payload, attempts, worker_id)))
+
+            if claimed and len(in_flight) < concurrency:
+                continue  # Ainda há espaço e a fila pode ter mais jobs
+
+            # Acorda quando um job termina, quando chega o stop ou no próximo ciclo de polling
+            stop_waiter = asyncio.create_task(stop.wait())
+            done, _ = await asyncio.wait(
+                in_flight | {stop_waiter}, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED
+            )
+            stop_waiter.cancel()
+            in_flight -= done
+
+        if in_flight:
+            logger.info(f"Worker {worker_id}: aguardando {len(in_flight)} job(s) em andamento.")
+            await asyncio.gather(*in_flight, return_exceptions=True)
+    finally:
+        await llm_clients.shutdown()
+        await async_engine.dispose()
+        logger.info(f"Worker {worker_id} finalizado.")
+
+
+def _run_process(concurrency: int, poll_interval: float) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    async def main() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # Windows
+                pass
+        await run_worker(worker_id, concurrency, poll_interval, stop)
+
+    asyncio.run(main())
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Worker da fila de jobs de geração de conteúdo.")
+    parser.add_argument("--processes", type=int, default=1, help="Número de processos worker.")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.GENERATION_JOB_CONCURRENCY,
+        help="Jobs simultâneos por processo.",
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=settings.GENERATION_JOB_POLL_INTERVAL_SECONDS,
+        help="Intervalo (s) entre consultas à fila quando ela está vazia.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        _run_process(args.concurrency, args.poll_interval)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=_run_process, args=(args.concurrency, args.poll_interval), name=f"generation-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def _forward_stop(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _forward_stop)
+    signal.signal(signal.SIGINT, _forward_stop)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 from app.core.database import SessionLocal
 from app import crud
+from app.jobs.content_archive import archive_old_generated_contents
+from app.jobs.rate_limit_cleanup import purge_idle_rate_limit_buckets
+from app.services import principal_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,6 +40,7 @@ def reset_content_generations_if_due():
                 logger.info(f"[RESET] {user.email} (plano: {plan.name}, intervalo: {plan.interval})")
 
         db.commit()
+        principal_cache.clear()  # Contadores zerados em massa
     except Exception as e:
         logger.error(f"Erro ao resetar gerações: {e}")
         db.rollback()
@@ -46,4 +50,6 @@ def reset_content_generations_if_due():
 def start_scheduler():
     scheduler = BackgroundScheduler()
     scheduler.add_job(reset_content_generations_if_due, 'cron', hour=2)
+    scheduler.add_job(archive_old_generated_contents, 'cron', hour=3)
+    scheduler.add_job(purge_idle_rate_limit_buckets, 'interval', hours=1)
     scheduler.start()
@@ -0,0 +1,34 @@
+# backend/app/jobs/rate_limit_cleanup.py
+#
+# Remove da tabela rate_limit_buckets (RATE_LIMIT_BACKEND="database") os buckets parados há mais
+# de uma janela: já estariam cheios, exatamente como um bucket recriado na próxima requisição.
+# Agendado de hora em hora em monthly_reset.start_scheduler.
+
+import logging
+import time
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.rate_limiter import WINDOW_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def purge_idle_rate_limit_buckets() -> int:
+    if settings.RATE_LIMIT_BACKEND != "database":
+        return 0
+
+    db: Session = SessionLocal()
+    try:
+        deleted = crud.delete_idle_rate_limit_buckets(db, idle_before=time.time() - WINDOW_SECONDS)
+        logger.info(f"Rate limiting: {deleted} buckets ociosos removidos")
+        return deleted
+    except Exception as e:
+        logger.error(f"Erro ao limpar buckets de rate limiting: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
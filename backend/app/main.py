@@ -1,43 +1,25 @@
 # backend/app/main.py
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import content_generator, auth, history, users, image_generator, subscriptions, prompt_templates, emails
-from app.core.database import Base, engine
+from app.api.endpoints import content_generator, batch_generation, generation_jobs, admin, auth, history, users, image_generator, subscriptions, prompt_templates, emails
+from app.core.database import Base, async_engine, engine
 from app.core.config import settings
+from app.core.security import shutdown_password_hashing
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal # Importe SessionLocal
 from app.crud import get_all_subscription_plans # Importe a função CRUD para ler planos
 from app.jobs.monthly_reset import start_scheduler
+from app.services import batch_generation_service, llm_clients, plan_catalog
+from app.services.rate_limiter import RateLimitMiddleware
 
 start_scheduler()
 
 # Cria as tabelas no banco de dados (para desenvolvimento)
 # Base.metadata.create_all(bind=engine)
 
-app = FastAPI(
-    title="Gerador de Conteúdo para Corretores de Imóveis",
-    description="API para gerar conteúdo de redes sociais automatizado e otimizado para o mercado imobiliário.",
-    version="0.1.0",
-)
-
-origins = [
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
-    "http://localhost:8000",
-]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
 # --- BLOCO DE INICIALIZAÇÃO E DEBUG DO BANCO DE DADOS ---
-@app.on_event("startup")
 def on_startup():
     print(f"\n--- INÍCIO DO PROCESSO DE STARTUP DO FASTAPI ---")
     print(f"DEBUG: DATABASE_URL configurada: {settings.DATABASE_URL}")
@@ -65,7 +47,54 @@ def on_startup():
     print("--- FIM DO PROCESSO DE STARTUP DO FASTAPI ---\n")
 # --------------------------------------------------------
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    on_startup()
+    # Clientes dos provedores de IA (pool HTTP + warm-up) vivem junto com a aplicação
+    await llm_clients.startup()
+    # Catálogo de planos em memória, atualizado em segundo plano a partir do Stripe
+    await plan_catalog.startup()
+    # Retoma lotes de geração interrompidos (restart ou outro processo da API que caiu)
+    await batch_generation_service.startup()
+    yield
+    await batch_generation_service.shutdown()
+    await plan_catalog.shutdown()
+    await llm_clients.shutdown()
+    shutdown_password_hashing()
+    await async_engine.dispose()
+
+
+app = FastAPI(
+    title="Gerador de Conteúdo para Corretores de Imóveis",
+    description="API para gerar conteúdo de redes sociais automatizado e otimizado para o mercado imobiliário.",
+    version="0.1.0",
+    lifespan=lifespan,
+)
+
+origins = [
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://localhost:8000",
+]
+
+# Adicionado antes do CORS para ficar por dentro dele: as respostas 429 também levam os headers de CORS
+app.add_middleware(RateLimitMiddleware)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy"],
+)
+
+
+
 app.include_router(content_generator.router, prefix="/api/v1", tags=["content_generator"])
+app.include_router(batch_generation.router, prefix="/api/v1", tags=["Batch Generation"])
+app.include_router(generation_jobs.router, prefix="/api/v1", tags=["Generation Jobs"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Auth"])
 app.include_router(history.router, prefix="/api/v1/history", tags=["History"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
@@ -77,6 +106,7 @@ app.include_router(subscriptions.router, prefix="/api/v1/subscriptions", tags=["
 # -----------------------------------------------
 
 app.include_router(emails.router, prefix="/api/v1/emails", tags=["Emails"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
 
 
 @app.get("/")
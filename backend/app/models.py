@@ -1,7 +1,8 @@
 # backend/app/models.py
 
+import zlib
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text # Importe 'Text' e 'ForeignKey'
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, ForeignKey, Index, LargeBinary, Text # Importe 'Text' e 'ForeignKey'
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -48,6 +49,8 @@ class User(Base):
     )
     
     content_generations_count = Column(Integer, default=0, nullable=False)
+    # Incrementado quando o plano ou a senha mudam: tokens com claims de versão anterior deixam de valer
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     generated_contents = relationship("GeneratedContent", back_populates="owner")
     last_reset = Column(DateTime, default=datetime.utcnow)
 
@@ -64,10 +67,67 @@ class GeneratedContent(Base):
     generated_text = Column(Text, nullable=False) # Armazena o conteúdo gerado pela IA
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_favorite = Column(Boolean, default=False) 
+    group_id = Column(String(32), index=True, nullable=True) # Conteúdos gerados na mesma chamada (multicanal)
+    channel = Column(String, nullable=True) # instagram, whatsapp, portal, facebook
 
     # Relacionamento de volta para o User
     owner = relationship("User", back_populates="generated_contents")
 
+    # Índices do histórico: filtram pelo dono e já entregam a ordem da listagem
+    # (created_at desc, id desc — a mesma chave do cursor de paginação)
+    __table_args__ = (
+        Index("ix_generated_contents_owner_created", owner_id, created_at.desc(), id.desc()),
+        Index("ix_generated_contents_owner_favorite_created", owner_id, is_favorite, created_at.desc(), id.desc()),
+    )
+
+
+class ArchivedGeneratedContent(Base):
+    """
+    Camada fria do histórico: conteúdos antigos e não favoritados, movidos de generated_contents
+    pelo job de arquivamento (app/jobs/content_archive.py) com os textos comprimidos (zlib).
+    Mantém o id original, então (created_at, id) continua valendo como cursor de paginação.
+    """
+    __tablename__ = "generated_contents_archive"
+
+    id = Column(Integer, primary_key=True) # Mesmo id que o conteúdo tinha em generated_contents
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    group_id = Column(String(32), nullable=True)
+    channel = Column(String, nullable=True)
+    prompt_used_zlib = Column(LargeBinary, nullable=False)
+    generated_text_zlib = Column(LargeBinary, nullable=False)
+
+    # Só conteúdos não favoritados são arquivados
+    is_favorite = False
+
+    __table_args__ = (
+        Index("ix_generated_contents_archive_owner_created", owner_id, created_at.desc(), id.desc()),
+    )
+
+    @property
+    def prompt_used(self) -> str:
+        return zlib.decompress(self.prompt_used_zlib).decode("utf-8")
+
+    @property
+    def generated_text(self) -> str:
+        return zlib.decompress(self.generated_text_zlib).decode("utf-8")
+
+
+class UserDailyUsage(Base):
+    """
+    Rollup diário por usuário, mantido incrementalmente pelo crud (inserção de conteúdo,
+    favoritar/desfavoritar e exclusão). O dia é o de created_at do conteúdo, em UTC.
+    O /users/me/analytics lê só daqui: custo proporcional ao número de dias, não de conteúdos.
+    """
+    __tablename__ = "user_daily_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    generations = Column(Integer, nullable=False, default=0) # Gerações (unidades de cota) feitas no dia; exclusões não descontam
+    contents = Column(Integer, nullable=False, default=0) # Conteúdos do dia que ainda existem (multicanal: um por canal)
+    favorites = Column(Integer, nullable=False, default=0) # Desses conteúdos, quantos estão favoritados
+
 
 class PromptTemplate(Base):
     __tablename__ = "prompt_templates"
@@ -78,4 +138,97 @@ class PromptTemplate(Base):
     description = Column(String, nullable=True)
     is_premium = Column(Boolean, default=False) # True for premium templates
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())    
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())    
+
+class GenerationCacheEntry(Base):
+    __tablename__ = "generation_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False) # sha256 dos detalhes normalizados + provedor/modelo/temperatura
+    provider = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    generated_text = Column(Text, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime, nullable=False)
+
+
+class GenerationBatch(Base):
+    __tablename__ = "generation_batches"
+
+    id = Column(String(32), primary_key=True, index=True) # uuid4 em hex, usado como job id
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    status = Column(String, nullable=False, default="queued", index=True) # queued, running, completed, failed
+    total_items = Column(Integer, nullable=False, default=0)
+    succeeded_items = Column(Integer, nullable=False, default=0)
+    failed_items = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True) # Processo da API que está processando o lote
+    locked_until = Column(DateTime(timezone=True), nullable=True) # Fim do lease; depois disso outro processo retoma o lote
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    items = relationship("GenerationBatchItem", back_populates="batch", order_by="GenerationBatchItem.item_index")
+
+
+class GenerationBatchItem(Base):
+    __tablename__ = "generation_batch_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(32), ForeignKey("generation_batches.id"), index=True, nullable=False)
+    item_index = Column(Integer, nullable=False) # Posição do registro no JSON/CSV enviado
+    property_details = Column(Text, nullable=False) # PropertyDetailsBase serializado em JSON
+    status = Column(String, nullable=False, default="pending") # pending, succeeded, failed
+    generated_content_id = Column(Integer, ForeignKey("generated_contents.id"), nullable=True)
+    error = Column(String, nullable=True)
+
+    batch = relationship("GenerationBatch", back_populates="items")
+    generated_content = relationship("GeneratedContent")
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(32), primary_key=True, index=True) # uuid4 em hex
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    property_details = Column(Text, nullable=False) # PropertyDetailsBase serializado em JSON
+    status = Column(String, nullable=False, default="queued", index=True) # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True) # Worker que reservou o job
+    locked_until = Column(DateTime(timezone=True), nullable=True) # Fim do lease; depois disso outro worker pode assumir
+    generated_content_id = Column(Integer, ForeignKey("generated_contents.id"), nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    generated_content = relationship("GeneratedContent")
+
+
+class GenerationTelemetry(Base):
+    __tablename__ = "generation_telemetry"
+
+    id = Column(Integer, primary_key=True, index=True)
+    generated_content_id = Column(Integer, ForeignKey("generated_contents.id", ondelete="SET NULL"), index=True, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=True)
+    plan_name = Column(String, nullable=True) # Plano do usuário no momento da geração
+    source = Column(String, nullable=False) # sync, stream, batch, job
+    provider = Column(String, nullable=True) # Nulo em cache hit ou quando todos os provedores falharam
+    model = Column(String, nullable=True)
+    template_id = Column(Integer, nullable=True)
+    prompt_chars = Column(Integer, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    latency_ms = Column(Float, nullable=True) # Tempo da chamada ao provedor (ou da leitura do cache)
+    cache_hit = Column(Boolean, nullable=False, default=False)
+    hedged = Column(Boolean, nullable=False, default=False)
+    error_class = Column(String, nullable=True) # Classe da exceção quando a geração falhou
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class RateLimitBucket(Base):
+    # Estado compartilhado dos token buckets do rate limiting (RATE_LIMIT_BACKEND="database")
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True) # Identidade (usuário ou IP) + classe de rota
+    tokens = Column(Float, nullable=False) # Fichas disponíveis em updated_at
+    updated_at = Column(Float, nullable=False) # Epoch (s): comparável entre processos e máquinas
@@ -1,7 +1,7 @@
 # backend/app/schemas.py
 
-from datetime import datetime
-from typing import Optional, List # Removido Literal pois não está sendo usado
+from datetime import date, datetime
+from typing import Optional, List, Literal
 from pydantic import BaseModel, EmailStr # Certifique-se de importar BaseModel e EmailStr
 
 
@@ -129,10 +129,42 @@ class GeneratedContent(GeneratedContentBase):
     id: int
     owner_id: int  # user_id no modelo, owner_id no esquema para o ORM
     created_at: datetime
+    group_id: Optional[str] = None # Mesmo valor para os textos gerados juntos (um por canal)
+    channel: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+# Item de /history/contents/: com busca textual, `snippet` traz o trecho com os termos em <mark>
+class GeneratedContentHistoryItem(GeneratedContentBase):
+    snippet: Optional[str] = None
+
+# Seleção das operações em massa do histórico: `ids` OU `filter` (os mesmos filtros de /history/contents/)
+class HistoryFilter(BaseModel):
+    is_favorite: Optional[bool] = None
+    search_query: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+
+class HistoryBulkSelection(BaseModel):
+    ids: Optional[List[int]] = None
+    filter: Optional[HistoryFilter] = None
+
+
+class HistoryBulkFavoriteUpdate(HistoryBulkSelection):
+    is_favorite: bool
+
+
+class HistoryBulkResult(BaseModel):
+    affected: int # Linhas efetivamente alteradas/excluídas
+
+
+# Resposta de /generate-content quando `channels` é informado
+class GeneratedContentGroup(BaseModel):
+    group_id: str
+    contents: List[GeneratedContent]
+
 
 # =========================================================================
 # 5. Esquemas de Detalhes da Propriedade (Input do Formulário)
@@ -161,6 +193,11 @@ class PropertyDetailsBase(BaseModel):
     property_address: Optional[str] = None
     additional_details: Optional[str] = None
 
+    force_fresh: Optional[bool] = False # Ignora o cache de gerações e sempre chama o provedor
+    template_id: Optional[int] = None # PromptTemplate usado para montar o prompt (opcional)
+    # Gera um texto por canal em uma única chamada ao provedor (ver services/channel_output.py)
+    channels: Optional[List[Literal["instagram", "whatsapp", "portal", "facebook"]]] = None
+
     class Config:
         from_attributes = True
 
@@ -168,6 +205,50 @@ class PropertyDetailsCreate(PropertyDetailsBase):
     pass # Herda de PropertyDetailsBase
 
 
+# =========================================================================
+# 5.1 Esquemas de Geração em Lote
+# =========================================================================
+
+class GenerationBatchStatus(BaseModel):
+    job_id: str
+    status: str
+    total_items: int
+    succeeded_items: int = 0
+    failed_items: int = 0
+    processed_items: int = 0
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class GenerationBatchItemResult(BaseModel):
+    item_index: int
+    status: str
+    error: Optional[str] = None
+    content: Optional[GeneratedContent] = None
+
+    class Config:
+        from_attributes = True
+
+class GenerationBatchResults(BaseModel):
+    job_id: str
+    status: str
+    items: List[GenerationBatchItemResult]
+
+
+# =========================================================================
+# 5.2 Esquemas da Fila de Jobs de Geração
+# =========================================================================
+
+class GenerationJobStatus(BaseModel):
+    job_id: str
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    content: Optional[GeneratedContent] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 # =========================================================================
 # 6. Esquemas de Templates de Prompt
 # =========================================================================
@@ -206,8 +287,30 @@ class PromptTemplate(PromptTemplateBase):
 # 7. Esquemas de Analytics (Corrigido para corresponder à sua versão)
 # =========================================================================
 
+class UsageSeriesPoint(BaseModel):
+    period_start: date # Dia (granularity=day) ou segunda-feira da semana (granularity=week)
+    generations: int
+    contents: int
+    favorites: int
+
+
+class QuotaBurnDownPoint(BaseModel):
+    day: date
+    used: int # Gerações acumuladas no período da cota até este dia
+    remaining: Optional[int] = None # None = plano ilimitado
+
+
 class UserAnalytics(BaseModel):
     total_generated_content: int
+    total_favorites: int = 0
+    favorites_ratio: float = 0.0
+    granularity: Literal["day", "week"] = "day"
+    series: List[UsageSeriesPoint] = []
+    quota_limit: Optional[int] = None # None = plano ilimitado
+    quota_used: int = 0
+    quota_remaining: Optional[int] = None
+    quota_period_start: Optional[date] = None
+    quota_burn_down: List[QuotaBurnDownPoint] = []
 
     class Config:
         from_attributes = True
@@ -231,4 +334,55 @@ class GeneratedContentUpdateFavorite(BaseModel):
 
 class UserUpdateInfo(BaseModel):
     nome: str
-    creci: str
\ No newline at end of file
+    creci: str
+
+# =========================================================================
+# 9. Esquemas de Métricas de Geração (Admin)
+# =========================================================================
+
+class GenerationMetricsRow(BaseModel):
+    day: date
+    plan_name: Optional[str] = None
+    provider: Optional[str] = None # Nulo para cache hits e gerações em que todos os provedores falharam
+    generations: int
+    errors: int
+    cache_hits: int
+    prompt_tokens: int
+    completion_tokens: int
+    avg_prompt_tokens: Optional[float] = None
+    avg_prompt_chars: Optional[float] = None
+    p50_latency_ms: Optional[float] = None
+    p95_latency_ms: Optional[float] = None
+    p99_latency_ms: Optional[float] = None
+
+class GenerationMetricsTotals(BaseModel):
+    generations: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+class GenerationMetrics(BaseModel):
+    since: datetime
+    until: Optional[datetime] = None
+    totals: GenerationMetricsTotals
+    rows: List[GenerationMetricsRow]
+
+
+class DatabasePoolStatus(BaseModel):
+    engine: str # "sync" (scheduler, workers, endpoints def) ou "async" (endpoints async def)
+    pool_class: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout_seconds: Optional[float] = None
+    checkouts: int = 0 # Acumulados desde o início do processo
+    timeouts: int = 0
+    avg_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+class DatabasePoolStats(BaseModel):
+    dialect: str
+    pools: List[DatabasePoolStatus]
@@ -0,0 +1,224 @@
+# backend/app/services/batch_generation_service.py
+#
+# Processamento dos lotes de /generate-content/batch em tasks no event loop da API.
+# Todo acesso ao banco usa AsyncSession (async_crud): um lote grande não trava as demais requisições.
+#
+# Durabilidade: o processo que roda o lote mantém um lease (generation_batches.locked_until),
+# renovado enquanto o lote anda. Se o processo cai ou é reiniciado, o lease vence e a recuperação
+# (no startup e a cada BATCH_GENERATION_RECOVERY_INTERVAL_SECONDS, em qualquer processo da API)
+# retoma os itens ainda pendentes. Cada item com erro estorna a sua unidade de cota ao ser
+# registrado, então nenhuma cota fica reservada sem conteúdo.
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Optional
+
+from app import async_crud, schemas
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services import llm_router
+from app.services.generation_service import generate_property_content
+from app.services.generation_telemetry import record_generation_async
+from app.services.prompt_builder import get_compiled_template
+
+logger = logging.getLogger(__name__)
+
+RECOVERY_MAX_BATCHES = 10  # Lotes abandonados retomados por este processo a cada ciclo
+
+# Identifica este processo no lease dos lotes
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# Mantém referência às tasks em execução para que não sejam coletadas pelo GC
+_running_batches: set = set()
+_recovery_task: Optional[asyncio.Task] = None
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _running_batches.add(task)
+    task.add_done_callback(_running_batches.discard)
+
+
+def start_generation_batch(batch_id: str, user_id: int) -> None:
+    """
+    Dispara o processamento do lote em segundo plano no event loop atual.
+    """
+    _spawn(run_generation_batch(batch_id, user_id))
+
+
+async def _generate_item(item_id: int, payload: str, user_id: int, batch_id: str) -> bool:
+    property_details = schemas.PropertyDetailsBase.model_validate_json(payload)
+
+    async with AsyncSessionLocal() as db:
+        # Acesso ao template foi validado na criação do lote
+        template = (
+            await db.run_sync(get_compiled_template, property_details.template_id)
+            if property_details.template_id
+            else None
+        )
+
+        try:
+            # Em cache miss, cada chamada espera o limite por minuto do provedor chamado
+            result = await generate_property_content(db, property_details, template, rate_limited=True)
+        except llm_router.LLMProviderError as e:
+            logger.warning(f"Item do lote {batch_id} falhou: {e}")
+            await async_crud.complete_generation_batch_item(
+                db, item_id=item_id, batch_id=batch_id, user_id=user_id,
+                error="Falha do provedor ao gerar o conteúdo.",
+            )
+            await record_generation_async(
+                db, source="batch", user_id=user_id, template_id=property_details.template_id, error=e
+            )
+            return False
+
+        content_id = await async_crud.complete_generation_batch_item(
+            db, item_id=item_id, batch_id=batch_id, user_id=user_id,
+            content=schemas.GeneratedContentCreate(prompt_used=result.prompt_used, generated_text=result.generated_text),
+        )
+        await record_generation_async(
+            db, source="batch", user_id=user_id, template_id=property_details.template_id, result=result,
+            generated_content_id=content_id,
+        )
+        return True
+
+
+async def run_generation_batch(batch_id: str, user_id: int) -> None:
+    """
+    Reserva o lote recém-criado para este processo e o processa.
+    """
+    async with AsyncSessionLocal() as db:
+        claimed = await async_crud.claim_generation_batch(
+            db, batch_id, _WORKER_ID, settings.BATCH_GENERATION_LEASE_SECONDS
+        )
+    if claimed:
+        await _process_claimed_batch(batch_id, user_id)
+
+
+async def _keep_lease(batch_id: str, lost: asyncio.Event) -> None:
+    # Renova a cada terço do lease: uma falha isolada de renovação ainda não perde o lote
+    while True:
+        await asyncio.sleep(settings.BATCH_GENERATION_LEASE_SECONDS / 3)
+        try:
+            async with AsyncSessionLocal() as db:
+                renewed = await async_crud.renew_generation_batch_lease(
+                    db, batch_id, _WORKER_ID, settings.BATCH_GENERATION_LEASE_SECONDS
+                )
+        except Exception as e:
+            logger.error(f"Erro ao renovar o lease do lote {batch_id}: {e}")
+            continue
+        if not renewed:
+            logger.warning(f"Lote {batch_id}: lease perdido, outro processo retomou o lote.")
+            lost.set()
+            return
+
+
+async def _process_claimed_batch(batch_id: str, user_id: int) -> None:
+    """
+    Processa os itens pendentes de um lote reservado por este processo, com um pool de workers
+    asyncio limitado por BATCH_GENERATION_CONCURRENCY. A cota já foi reservada na criação do lote.
+    Se a task for cancelada (shutdown), libera o lote para ser retomado pela recuperação.
+    """
+    async with AsyncSessionLocal() as db:
+        # Copia apenas os dados necessários, antes de fechar a sessão
+        pending_items = [
+            (item.id, item.item_index, item.property_details)
+            for item in await async_crud.get_pending_generation_batch_items(db, batch_id)
+        ]
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in pending_items:
+        queue.put_nowait(item)
+    failed = 0
+    lost = asyncio.Event()
+
+    async def worker():
+        nonlocal failed
+        while not lost.is_set():
+            try:
+                item_id, item_index, payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                if not await _generate_item(item_id, payload, user_id, batch_id):
+                    failed += 1
+            except Exception as e:
+                logger.exception(f"Erro ao processar item {item_index} do lote {batch_id}: {e}")
+                failed += 1
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await async_crud.complete_generation_batch_item(
+                            db, item_id=item_id, batch_id=batch_id, user_id=user_id, error=str(e)
+                        )
+                except Exception as record_error:
+                    # O item fica pendente; finish_generation_batch devolve o lote para a recuperação
+                    logger.exception(
+                        f"Erro ao registrar a falha do item {item_index} do lote {batch_id}: {record_error}"
+                    )
+
+    heartbeat = asyncio.create_task(_keep_lease(batch_id, lost))
+    workers: list[asyncio.Task] = []
+    try:
+        concurrency = max(1, min(settings.BATCH_GENERATION_CONCURRENCY, len(pending_items)))
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        await asyncio.gather(*workers)
+    except (asyncio.CancelledError, Exception):
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # Os itens que não terminaram continuam pendentes e com a cota reservada
+        async with AsyncSessionLocal() as db:
+            await async_crud.release_generation_batch(db, batch_id, _WORKER_ID)
+        raise
+    finally:
+        heartbeat.cancel()
+    if lost.is_set():
+        return
+
+    async with AsyncSessionLocal() as db:
+        if not await async_crud.finish_generation_batch(db, batch_id, _WORKER_ID):
+            # Sobrou item pendente (erro ao registrar o resultado): a recuperação tenta de novo
+            await async_crud.release_generation_batch(db, batch_id, _WORKER_ID)
+            return
+    logger.info(f"Lote {batch_id} finalizado: {len(pending_items) - failed} sucesso(s), {failed} falha(s).")
+
+
+async def recover_batches() -> int:
+    """
+    Retoma lotes abandonados (lease vencido) neste processo. Retorna quantos foram retomados.
+    """
+    async with AsyncSessionLocal() as db:
+        claimed = await async_crud.claim_stale_generation_batches(
+            db, _WORKER_ID, RECOVERY_MAX_BATCHES, settings.BATCH_GENERATION_LEASE_SECONDS
+        )
+    for batch_id, user_id in claimed:
+        logger.info(f"Retomando o lote {batch_id}, abandonado por um processo que caiu ou foi reiniciado.")
+        _spawn(_process_claimed_batch(batch_id, user_id))
+    return len(claimed)
+
+
+async def _recovery_loop() -> None:
+    while True:
+        try:
+            await recover_batches()
+        except Exception:
+            logger.exception("Erro ao retomar lotes de geração abandonados")
+        await asyncio.sleep(settings.BATCH_GENERATION_RECOVERY_INTERVAL_SECONDS)
+
+
+async def startup() -> None:
+    """Inicia a recuperação periódica dos lotes abandonados (a primeira roda imediatamente)."""
+    global _recovery_task
+    _recovery_task = asyncio.create_task(_recovery_loop())
+
+
+async def shutdown() -> None:
+    """Para a recuperação e os lotes em andamento; os lotes interrompidos são liberados para retomada."""
+    global _recovery_task
+    tasks = [*_running_batches, *([_recovery_task] if _recovery_task else [])]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _recovery_task = None
@@ -0,0 +1,61 @@
+# backend/app/services/channel_output.py
+
+import json
+from typing import Dict, List
+
+# Instruções por canal; as chaves são os valores aceitos em PropertyDetailsBase.channels
+CHANNEL_INSTRUCTIONS = {
+    "instagram": "legenda para Instagram, com emojis, chamada para ação (CTA) e até 15 hashtags relevantes",
+    "whatsapp": "mensagem curta e direta para WhatsApp, com CTA, poucos emojis e sem hashtags",
+    "portal": "descrição completa e objetiva para portais imobiliários (ZAP, VivaReal, OLX), sem emojis e sem hashtags",
+    "facebook": "post para Facebook, envolvente, com CTA e no máximo 5 hashtags",
+}
+
+
+class ChannelOutputError(ValueError):
+    """A resposta do provedor não é o JSON esperado com um texto por canal."""
+
+
+def normalize_channels(channels: List[str]) -> List[str]:
+    # Ordem estável e sem repetições: a mesma seleção gera o mesmo prompt (e a mesma chave de cache)
+    return sorted(set(channels))
+
+
+def build_channels_prompt(base_prompt: str, channels: List[str]) -> str:
+    """
+    Acrescenta ao prompt do imóvel o pedido de saída em JSON com uma seção por canal.
+    """
+    sections = "; ".join(f'"{channel}": {CHANNEL_INSTRUCTIONS[channel]}' for channel in channels)
+    return (
+        f"{base_prompt}\n\n"
+        f"Gere versões do conteúdo para os canais a seguir. As regras de cada canal prevalecem "
+        f"sobre as instruções gerais acima. Canais: {sections}. "
+        f"Responda apenas com um objeto JSON válido, sem markdown, com exatamente as chaves "
+        f"{', '.join(json.dumps(channel) for channel in channels)} e o texto final de cada canal como valor (string)."
+    )
+
+
+def parse_channels_output(raw_text: str, channels: List[str]) -> Dict[str, str]:
+    """
+    Extrai {canal: texto} da resposta do provedor. Levanta ChannelOutputError se faltar
+    algum canal ou se a resposta não for JSON.
+    """
+    text = raw_text.strip()
+    if text.startswith("```"):
+        # Alguns modelos cercam o JSON com ```json ... ``` mesmo no modo JSON
+        text = text.strip("`")
+        text = text[text.find("{"):]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ChannelOutputError(f"Resposta não é um JSON válido: {e}")
+    if not isinstance(data, dict):
+        raise ChannelOutputError("A resposta JSON não é um objeto.")
+
+    outputs = {}
+    for channel in channels:
+        value = data.get(channel)
+        if not isinstance(value, str) or not value.strip():
+            raise ChannelOutputError(f"Canal '{channel}' ausente ou vazio na resposta.")
+        outputs[channel] = value.strip()
+    return outputs
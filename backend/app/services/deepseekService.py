@@ -1,14 +1,71 @@
-import os
-from openai import AsyncOpenAI
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
+from app.core.config import settings
+from app.services.llm_clients import get_registry
 
 load_dotenv()
 
-client = AsyncOpenAI(
-    api_key=os.getenv("DEEP_SEEK_API_KEY"),
-    base_url="https://api.deepseek.com/v1"  # Endpoint da DeepSeek
+PROVIDER_NAME = "deepseek"
+
+# Mensagem devolvida quando o provedor falha (nunca deve ser cacheada)
+GENERATION_ERROR_MESSAGE = "Desculpe, não foi possível gerar o conteúdo no momento."
+
+SYSTEM_PROMPT = (
+    "Você é um assistente de marketing imobiliário experiente e criativo. "
+    "Seu objetivo é ajudar corretores de imóveis a criar legendas, descrições "
+    "e textos atraentes para redes sociais, sites e anúncios. Adapte o conteúdo "
+    "para a plataforma e público-alvo especificados. Se solicitado, inclua hashtags "
+    "relevantes e eficazes. Seja conciso e direto para plataformas como WhatsApp, "
+    "e mais descritivo para blogs/sites. O foco é sempre atrair potenciais "
+    "compradores e gerar interesse genuíno."
 )
 
+
+def _build_messages(prompt: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _fill_usage(usage: Optional[dict], response_usage) -> None:
+    if usage is None or response_usage is None:
+        return
+    usage["prompt_tokens"] = response_usage.prompt_tokens
+    usage["completion_tokens"] = response_usage.completion_tokens
+
+
+async def complete_content_for_real_estate(
+    prompt: str, usage: Optional[dict] = None, json_output: bool = False, max_tokens: Optional[int] = None
+) -> str:
+    """
+    Chama a DeepSeek e devolve o texto gerado. Diferente de generate_content_for_real_estate,
+    propaga qualquer erro do provedor (usado pelo roteador de provedores).
+    Se `usage` for informado, recebe prompt_tokens/completion_tokens da resposta.
+    Com `json_output`, pede ao modelo um objeto JSON (response_format json_object).
+    """
+    extra_args = {"response_format": {"type": "json_object"}} if json_output else {}
+
+    # Faz a chamada assíncrona para a DeepSeek
+    # O cliente (e seu pool de conexões) vem do registro criado no startup da aplicação
+    response = await get_registry().deepseek.chat.completions.create(
+        model=settings.DEEPSEEK_MODEL,          # Modelo de chat
+        messages=_build_messages(prompt),
+        temperature=settings.LLM_TEMPERATURE,
+        max_tokens=max_tokens or settings.LLM_MAX_TOKENS,
+        timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+        **extra_args,
+    )
+
+    _fill_usage(usage, response.usage)
+
+    # Extrai a resposta gerada
+    content = response.choices[0].message.content
+    if not content or not content.strip():
+        raise ValueError("A DeepSeek retornou uma resposta vazia.")
+    return content.strip()
+
+
 async def generate_content_for_real_estate(prompt: str) -> str:
     """
     Gera conteúdo de texto para corretores de imóveis usando a API DeepSeek.
@@ -17,39 +74,40 @@ async def generate_content_for_real_estate(prompt: str) -> str:
         print("--- Chamando a API DeepSeek para gerar conteúdo ---")
         print(f"Prompt enviado para a DeepSeek: {prompt}")
 
-        # Monta as mensagens no formato chat (system + user)
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "Você é um assistente de marketing imobiliário experiente e criativo. "
-                    "Seu objetivo é ajudar corretores de imóveis a criar legendas, descrições "
-                    "e textos atraentes para redes sociais, sites e anúncios. Adapte o conteúdo "
-                    "para a plataforma e público-alvo especificados. Se solicitado, inclua hashtags "
-                    "relevantes e eficazes. Seja conciso e direto para plataformas como WhatsApp, "
-                    "e mais descritivo para blogs/sites. O foco é sempre atrair potenciais "
-                    "compradores e gerar interesse genuíno."
-                )
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-
-        # Faz a chamada assíncrona para a DeepSeek
-        response = await client.chat.completions.create(
-            model="deepseek-chat",          # Modelo de chat
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
-
-        # Extrai a resposta gerada
-        generated_text = response.choices[0].message.content.strip()
+        generated_text = await complete_content_for_real_estate(prompt)
         print(f"Resposta bruta da DeepSeek: {generated_text[:100]}...")
         return generated_text
 
     except Exception as e:
         print(f"Erro ao gerar conteúdo com DeepSeek: {e}")
-        return "Desculpe, não foi possível gerar o conteúdo no momento."
\ No newline at end of file
+        return GENERATION_ERROR_MESSAGE
+
+
+async def stream_content_for_real_estate(prompt: str, usage: Optional[dict] = None) -> AsyncIterator[str]:
+    """
+    Gera conteúdo usando a API de streaming da DeepSeek, devolvendo os trechos
+    de texto à medida que chegam. Erros do provedor são propagados para o chamador,
+    que decide como encerrar o stream. `usage` recebe a contagem de tokens do último chunk.
+    """
+    print("--- Chamando a API DeepSeek (stream) para gerar conteúdo ---")
+    stream = await get_registry().deepseek.chat.completions.create(
+        model=settings.DEEPSEEK_MODEL,
+        messages=_build_messages(prompt),
+        temperature=settings.LLM_TEMPERATURE,
+        max_tokens=settings.LLM_MAX_TOKENS,
+        timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    try:
+        async for chunk in stream:
+            # O último chunk traz apenas o uso de tokens, sem choices
+            _fill_usage(usage, getattr(chunk, "usage", None))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        # Libera a conexão com a DeepSeek mesmo se o cliente desistir no meio do stream
+        await stream.close()
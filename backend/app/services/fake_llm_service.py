@@ -0,0 +1,153 @@
+# backend/app/services/fake_llm_service.py
+#
+# Provedor de IA falso para testes de carga: mesma interface de deepseekService/gemini_service,
+# sem rede e sem custo. Ative com LLM_PROVIDERS="fake" (ou, por exemplo, "fake,deepseek").
+# O texto é determinístico (derivado do hash do prompt); latência, erros e cadência do
+# stream são configurados pelas variáveis FAKE_LLM_*.
+
+import asyncio
+import hashlib
+import itertools
+import json
+import math
+import random
+import threading
+from typing import AsyncIterator, List, Optional
+
+from app.core.config import settings
+from app.services.channel_output import CHANNEL_INSTRUCTIONS
+
+PROVIDER_NAME = "fake"
+MODEL_NAME = "fake-deterministic-1"
+
+# Mensagem devolvida quando o provedor falha (nunca deve ser cacheada)
+GENERATION_ERROR_MESSAGE = "Desculpe, não foi possível gerar o conteúdo no momento."
+
+_VOCABULARY = (
+    "imóvel casa apartamento sala quartos suíte varanda vista lazer piscina condomínio "
+    "localização bairro tranquilo segurança garagem moderno amplo iluminado reformado "
+    "oportunidade exclusiva agende visita conforto família investimento valorização "
+    "cozinha planejada área gourmet jardim academia próximo comércio escolas metrô"
+).split()
+
+_HASHTAGS = ["#imoveis", "#casapropria", "#corretor", "#apartamento", "#venda", "#aluguel", "#lar"]
+
+
+class FakeProviderError(RuntimeError):
+    """Erro simulado pelo provedor fake (FAKE_LLM_ERROR_RATE)."""
+
+
+# Sorteio de latência/erros; com FAKE_LLM_SEED a sequência é reproduzível
+_rng = random.Random(settings.FAKE_LLM_SEED)
+_rng_lock = threading.Lock()
+_replay_latencies: Optional[itertools.cycle] = None
+
+
+def _load_replay_latencies() -> itertools.cycle:
+    global _replay_latencies
+    if _replay_latencies is None:
+        if not settings.FAKE_LLM_LATENCY_FILE:
+            raise ValueError("FAKE_LLM_LATENCY_MODE=replay exige FAKE_LLM_LATENCY_FILE.")
+        with open(settings.FAKE_LLM_LATENCY_FILE, encoding="utf-8") as latency_file:
+            values = [float(line) for line in latency_file if line.strip() and not line.startswith("#")]
+        if not values:
+            raise ValueError(f"Nenhuma latência em {settings.FAKE_LLM_LATENCY_FILE}.")
+        _replay_latencies = itertools.cycle(values)
+    return _replay_latencies
+
+
+def sample_latency_seconds() -> float:
+    """
+    Latência simulada de uma chamada, conforme FAKE_LLM_LATENCY_MODE.
+    """
+    mode = settings.FAKE_LLM_LATENCY_MODE
+    with _rng_lock:
+        if mode == "lognormal":
+            # Mediana = FAKE_LLM_LATENCY_MS
+            latency_ms = _rng.lognormvariate(math.log(max(settings.FAKE_LLM_LATENCY_MS, 1e-3)), settings.FAKE_LLM_LATENCY_SIGMA)
+        elif mode == "replay":
+            latency_ms = next(_load_replay_latencies())
+        else:
+            latency_ms = settings.FAKE_LLM_LATENCY_MS
+    return max(latency_ms, 0.0) / 1000
+
+
+def _should_fail() -> bool:
+    if settings.FAKE_LLM_ERROR_RATE <= 0:
+        return False
+    with _rng_lock:
+        return _rng.random() < settings.FAKE_LLM_ERROR_RATE
+
+
+def _deterministic_words(prompt: str, salt: str = "", count: Optional[int] = None) -> List[str]:
+    seed = int.from_bytes(hashlib.sha256(f"{salt}:{prompt}".encode("utf-8")).digest()[:8], "big")
+    prompt_rng = random.Random(seed)
+    count = count or prompt_rng.randint(40, 90)
+    words = [prompt_rng.choice(_VOCABULARY) for _ in range(count)]
+    words[0] = words[0].capitalize()
+    return words + prompt_rng.sample(_HASHTAGS, 3)
+
+
+def build_fake_text(prompt: str, json_output: bool = False) -> str:
+    """
+    Texto determinístico para o prompt. Com json_output, devolve um JSON com
+    uma seção para cada canal citado no prompt (mesmo formato pedido aos provedores reais).
+    """
+    if not json_output:
+        return " ".join(_deterministic_words(prompt))
+    channels = [channel for channel in CHANNEL_INSTRUCTIONS if f'"{channel}"' in prompt]
+    return json.dumps(
+        {channel: " ".join(_deterministic_words(prompt, salt=channel)) for channel in channels},
+        ensure_ascii=False,
+    )
+
+
+def _fill_usage(usage: Optional[dict], prompt: str, text: str) -> None:
+    if usage is None:
+        return
+    # Aproximação de ~4 caracteres por token
+    usage["prompt_tokens"] = max(1, len(prompt) // 4)
+    usage["completion_tokens"] = max(1, len(text) // 4)
+
+
+async def complete_content_for_real_estate(
+    prompt: str, usage: Optional[dict] = None, json_output: bool = False, max_tokens: Optional[int] = None
+) -> str:
+    """
+    Simula uma chamada ao provedor: espera a latência sorteada e devolve o texto
+    determinístico, ou levanta FakeProviderError conforme FAKE_LLM_ERROR_RATE.
+    """
+    await asyncio.sleep(sample_latency_seconds())
+    if _should_fail():
+        raise FakeProviderError("Falha simulada pelo provedor fake.")
+    text = build_fake_text(prompt, json_output=json_output)
+    _fill_usage(usage, prompt, text)
+    return text
+
+
+async def generate_content_for_real_estate(prompt: str) -> str:
+    """
+    Mesmo contrato dos provedores reais: devolve a mensagem de erro em vez de levantar.
+    """
+    try:
+        return await complete_content_for_real_estate(prompt)
+    except Exception as e:
+        print(f"Erro ao gerar conteúdo com o provedor fake: {e}")
+        return GENERATION_ERROR_MESSAGE
+
+
+async def stream_content_for_real_estate(prompt: str, usage: Optional[dict] = None) -> AsyncIterator[str]:
+    """
+    Stream do texto determinístico: o primeiro trecho chega após a latência sorteada
+    (tempo até o primeiro token) e os demais a cada FAKE_LLM_STREAM_CHUNK_INTERVAL_MS.
+    """
+    await asyncio.sleep(sample_latency_seconds())
+    if _should_fail():
+        raise FakeProviderError("Falha simulada pelo provedor fake.")
+    words = _deterministic_words(prompt)
+    chunk_words = max(1, settings.FAKE_LLM_STREAM_CHUNK_WORDS)
+    for start in range(0, len(words), chunk_words):
+        if start:
+            await asyncio.sleep(settings.FAKE_LLM_STREAM_CHUNK_INTERVAL_MS / 1000)
+        yield " ".join(words[start:start + chunk_words]) + " "
+    _fill_usage(usage, prompt, " ".join(words))
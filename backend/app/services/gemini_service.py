@@ -1,14 +1,65 @@
 # backend/app/services/gemini_service.py
 
 import os
+from typing import AsyncIterator, Optional
 import google.generativeai as genai
 from google.generativeai import types
 from dotenv import load_dotenv
+from app.core.config import settings
+from app.services.llm_clients import get_registry
 
 load_dotenv()
 
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
+PROVIDER_NAME = "gemini"
+
+# Mensagem devolvida quando o provedor falha (nunca deve ser cacheada)
+GENERATION_ERROR_MESSAGE = "Desculpe, não foi possível gerar o conteúdo no momento."
+
+SYSTEM_PROMPT = "Você é um assistente de marketing imobiliário experiente e criativo. Seu objetivo é ajudar corretores de imóveis a criar legendas, descrições e textos atraentes para redes sociais, sites e anúncios. Adapte o conteúdo para a plataforma e público-alvo especificados. Se solicitado, inclua hashtags relevantes e eficazes. Seja conciso e direto para plataformas como WhatsApp, e mais descritivo para blogs/sites. O foco é sempre atrair potenciais compradores e gerar interesse genuíno."
+
+
+def _build_messages(prompt: str) -> list:
+    return [
+        {"role": "user", "parts": [{"text": SYSTEM_PROMPT}]},
+        {"role": "user", "parts": [{"text": prompt}]}
+    ]
+
+def _fill_usage(usage: Optional[dict], usage_metadata) -> None:
+    if usage is None or not usage_metadata:
+        return
+    usage["prompt_tokens"] = usage_metadata.prompt_token_count
+    usage["completion_tokens"] = usage_metadata.candidates_token_count
+
+
+async def complete_content_for_real_estate(
+    prompt: str, usage: Optional[dict] = None, json_output: bool = False, max_tokens: Optional[int] = None
+) -> str:
+    """
+    Chama a Gemini e devolve o texto gerado. Diferente de generate_content_for_real_estate,
+    propaga qualquer erro do provedor (usado pelo roteador de provedores).
+    Se `usage` for informado, recebe prompt_tokens/completion_tokens da resposta.
+    Com `json_output`, pede a resposta como application/json.
+    """
+    # Instância reutilizada do registro em vez de um GenerativeModel novo por chamada
+    model = get_registry().gemini_model(settings.GEMINI_MODEL)
+
+    generation_config = {"temperature": settings.LLM_TEMPERATURE, "max_output_tokens": max_tokens or settings.LLM_MAX_TOKENS}
+    if json_output:
+        generation_config["response_mime_type"] = "application/json"
+
+    response = await model.generate_content_async(
+        contents=_build_messages(prompt),
+        generation_config=generation_config,
+        request_options={"timeout": settings.LLM_REQUEST_TIMEOUT_SECONDS},
+    )
+    _fill_usage(usage, getattr(response, "usage_metadata", None))
+    if not response.text or not response.text.strip():
+        raise ValueError("A Gemini retornou uma resposta vazia.")
+    return response.text.strip()
+
+
 async def generate_content_for_real_estate(prompt: str) -> str:
     """
     Gera conteúdo de texto para corretores de imóveis usando a API Gemini.
@@ -17,22 +68,30 @@ async def generate_content_for_real_estate(prompt: str) -> str:
         print("--- Chamando a API Gemini para gerar conteúdo ---")
         print(f"Prompt enviado para a Gemini: {prompt}")
 
-        model = genai.GenerativeModel('gemini-2.0-flash')
-
-        # Ajuste a mensagem do sistema para dar mais contexto à IA
-        messages = [
-            {"role": "user", "parts": [
-                {"text": "Você é um assistente de marketing imobiliário experiente e criativo. Seu objetivo é ajudar corretores de imóveis a criar legendas, descrições e textos atraentes para redes sociais, sites e anúncios. Adapte o conteúdo para a plataforma e público-alvo especificados. Se solicitado, inclua hashtags relevantes e eficazes. Seja conciso e direto para plataformas como WhatsApp, e mais descritivo para blogs/sites. O foco é sempre atrair potenciais compradores e gerar interesse genuíno."}
-            ]},
-            {"role": "user", "parts": [{"text": prompt}]}
-        ]
-
-        response = await model.generate_content_async(
-            contents=messages,
-            generation_config={"temperature": 0.7, "max_output_tokens": 500}
-        )
-        print(f"Resposta bruta da Gemini: {response.text[:100]}...")
-        return response.text.strip()
+        generated_text = await complete_content_for_real_estate(prompt)
+        print(f"Resposta bruta da Gemini: {generated_text[:100]}...")
+        return generated_text
     except Exception as e:
         print(f"Erro ao gerar conteúdo com Gemini: {e}")
-        return "Desculpe, não foi possível gerar o conteúdo no momento."
\ No newline at end of file
+        return GENERATION_ERROR_MESSAGE
+
+
+async def stream_content_for_real_estate(prompt: str, usage: Optional[dict] = None) -> AsyncIterator[str]:
+    """
+    Gera conteúdo usando o modo de streaming da API Gemini, devolvendo os trechos
+    de texto à medida que chegam. Erros do provedor são propagados para o chamador.
+    `usage` recebe a contagem de tokens (acumulada no último chunk).
+    """
+    print("--- Chamando a API Gemini (stream) para gerar conteúdo ---")
+    model = get_registry().gemini_model(settings.GEMINI_MODEL)
+    response = await model.generate_content_async(
+        contents=_build_messages(prompt),
+        generation_config={"temperature": settings.LLM_TEMPERATURE, "max_output_tokens": settings.LLM_MAX_TOKENS},
+        request_options={"timeout": settings.LLM_REQUEST_TIMEOUT_SECONDS},
+        stream=True,
+    )
+    async for chunk in response:
+        _fill_usage(usage, getattr(chunk, "usage_metadata", None))
+        # Chunks finais podem vir sem "parts" (ex.: apenas finish_reason)
+        if chunk.parts:
+            yield chunk.text
@@ -0,0 +1,125 @@
+# backend/app/services/generation_cache.py
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.core.config import settings
+from app.services import llm_router
+
+logger = logging.getLogger(__name__)
+
+# Campos que não influenciam o texto gerado e ficam fora da chave do cache
+_EXCLUDED_FIELDS = {"force_fresh"}
+
+# Camada em memória (LRU com TTL). O TTLCache não é thread-safe, por isso o lock.
+_memory_cache: TTLCache = TTLCache(
+    maxsize=settings.GENERATION_CACHE_MAX_ENTRIES,
+    ttl=settings.GENERATION_CACHE_TTL_SECONDS,
+)
+_memory_lock = threading.Lock()
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        # Espaços extras não mudam o imóvel descrito; maiúsculas/minúsculas sim (nomes, contatos, siglas)
+        return " ".join(value.split())
+    if isinstance(value, list):
+        # Ex.: channels — valores de uma lista fixa: a ordem e a caixa da seleção não mudam o resultado
+        return sorted({_normalize_value(item).lower() if isinstance(item, str) else item for item in value})
+    return value
+
+
+def build_cache_key(
+    property_details: schemas.PropertyDetailsBase,
+    provider: str,
+    model: str,
+    temperature: float,
+    template_version: Optional[str] = None,
+) -> str:
+    """
+    Gera um hash canônico dos detalhes do imóvel normalizados + parâmetros do provedor.
+    template_version (hash do texto do PromptTemplate) invalida o cache quando o template é editado.
+    """
+    normalized = {}
+    for field, value in property_details.model_dump(exclude=_EXCLUDED_FIELDS).items():
+        value = _normalize_value(value)
+        if value is None or value == "":
+            continue
+        normalized[field] = value
+
+    payload = {
+        "details": normalized,
+        "provider": provider,
+        "model": model,
+        "temperature": temperature,
+    }
+    if template_version is not None:
+        payload["template_version"] = template_version
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def build_request_cache_key(
+    property_details: schemas.PropertyDetailsBase, template_version: Optional[str] = None
+) -> str:
+    """
+    Chave do cache para a cadeia de provedores/modelos configurada no roteador.
+    """
+    provider, model = llm_router.cache_identity()
+    return build_cache_key(property_details, provider, model, settings.LLM_TEMPERATURE, template_version)
+
+
+def get_cached_generation(db: Session, cache_key: str) -> Optional[str]:
+    """
+    Procura o texto gerado primeiro na memória e depois na tabela generation_cache.
+    """
+    if not settings.GENERATION_CACHE_ENABLED:
+        return None
+
+    with _memory_lock:
+        cached_text = _memory_cache.get(cache_key)
+    if cached_text is not None:
+        logger.debug(f"Cache de geração (memória) HIT: {cache_key}")
+        return cached_text
+
+    db_entry = crud.get_generation_cache_entry(db, cache_key)
+    if not db_entry:
+        return None
+
+    logger.debug(f"Cache de geração (DB) HIT: {cache_key}")
+    crud.increment_generation_cache_hits(db, cache_key)
+    with _memory_lock:
+        _memory_cache[cache_key] = db_entry.generated_text
+    return db_entry.generated_text
+
+
+def store_generation(db: Session, cache_key: str, provider: str, model: str, generated_text: str) -> None:
+    """
+    Grava o texto gerado nas duas camadas do cache.
+    """
+    if not settings.GENERATION_CACHE_ENABLED:
+        return
+
+    with _memory_lock:
+        _memory_cache[cache_key] = generated_text
+    try:
+        crud.upsert_generation_cache_entry(
+            db,
+            cache_key=cache_key,
+            provider=provider,
+            model=model,
+            generated_text=generated_text,
+            expires_at=datetime.utcnow() + timedelta(seconds=settings.GENERATION_CACHE_TTL_SECONDS),
+        )
+    except Exception as e:
+        # Falha no cache persistente não deve derrubar a geração
+        logger.error(f"Erro ao gravar cache de geração: {e}")
+        db.rollback()
@@ -0,0 +1,103 @@
+# backend/app/services/generation_service.py
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.core.config import settings
+from app.services import generation_cache, llm_router
+from app.services.channel_output import (
+    ChannelOutputError,
+    build_channels_prompt,
+    normalize_channels,
+    parse_channels_output,
+)
+from app.services.prompt_builder import CompiledPromptTemplate, build_property_prompt
+
+
+@dataclass
+class GenerationResult:
+    prompt_used: str
+    generated_text: str
+    cache_hit: bool
+    latency_ms: float  # Tempo total da geração (cache ou provedor)
+    completion: Optional[llm_router.LLMCompletion] = None  # None quando veio do cache
+    channel_texts: Optional[Dict[str, str]] = None  # {canal: texto} quando `channels` foi pedido
+
+
+async def _db_call(db: Union[Session, AsyncSession], fn, *args):
+    """
+    Executa uma função síncrona de acesso ao banco (fn(db, *args)). Com AsyncSession
+    roda via run_sync, sem bloquear o event loop; com Session (workers, lotes) chama direto.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return fn(db, *args)
+
+
+def _parse_channels(raw_text: str, channels) -> Optional[Dict[str, str]]:
+    return parse_channels_output(raw_text, channels) if channels else None
+
+
+async def generate_property_content(
+    db: Union[Session, AsyncSession],
+    property_details: schemas.PropertyDetailsBase,
+    template: Optional[CompiledPromptTemplate] = None,
+    rate_limited: bool = False,
+) -> GenerationResult:
+    """
+    Monta o prompt, consulta o cache de gerações e, se preciso, chama o roteador de provedores.
+    Com `channels`, pede ao provedor um JSON com um texto por canal em uma única chamada.
+    `rate_limited` (lotes) aplica o limite por minuto de cada provedor chamado, só em cache miss.
+    Não persiste o conteúdo nem mexe na cota. Levanta llm_router.LLMProviderError se todos os provedores falharem.
+    Aceita Session (workers, lotes) ou AsyncSession (endpoints async).
+    """
+    started = time.monotonic()
+    channels = normalize_channels(property_details.channels) if property_details.channels else None
+    prompt_string = build_property_prompt(property_details, template)
+    if channels:
+        prompt_string = build_channels_prompt(prompt_string, channels)
+    cache_key = generation_cache.build_request_cache_key(
+        property_details, template_version=template.version if template else None
+    )
+
+    if not property_details.force_fresh:
+        cached_text = await _db_call(db, generation_cache.get_cached_generation, cache_key)
+        if cached_text is not None:
+            return GenerationResult(
+                prompt_used=prompt_string,
+                generated_text=cached_text,
+                cache_hit=True,
+                latency_ms=(time.monotonic() - started) * 1000,
+                channel_texts=_parse_channels(cached_text, channels),
+            )
+
+    if isinstance(db, AsyncSession):
+        # Encerra a transação de leitura: a conexão volta ao pool durante a chamada ao provedor
+        await db.commit()
+    completion = await llm_router.generate(
+        prompt_string,
+        json_output=bool(channels),
+        # Cada canal tem o tamanho de uma geração comum
+        max_tokens=settings.LLM_MAX_TOKENS * len(channels) if channels else None,
+        rate_limited=rate_limited,
+    )
+    try:
+        channel_texts = _parse_channels(completion.text, channels)
+    except ChannelOutputError as e:
+        # Resposta fora do formato não é cacheada
+        raise llm_router.LLMProviderError(f"Resposta multicanal inválida de {completion.provider}: {e}") from e
+
+    await _db_call(db, generation_cache.store_generation, cache_key, completion.provider, completion.model, completion.text)
+    return GenerationResult(
+        prompt_used=prompt_string,
+        generated_text=completion.text,
+        cache_hit=False,
+        latency_ms=(time.monotonic() - started) * 1000,
+        completion=completion,
+        channel_texts=channel_texts,
+    )
@@ -0,0 +1,70 @@
+# backend/app/services/generation_telemetry.py
+
+import logging
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.services.generation_service import GenerationResult
+
+logger = logging.getLogger(__name__)
+
+
+def record_generation(
+    db: Session,
+    *,
+    source: str,
+    user_id: Optional[int],
+    template_id: Optional[int] = None,
+    result: Optional[GenerationResult] = None,
+    error: Optional[BaseException] = None,
+    generated_content_id: Optional[int] = None,
+    prompt_chars: Optional[int] = None,
+    latency_ms: Optional[float] = None,
+) -> None:
+    """
+    Grava uma linha em generation_telemetry para uma geração concluída (`result`)
+    ou que falhou (`error`). Falhas ao gravar a telemetria nunca interrompem a geração.
+    """
+    values = {
+        "source": source,
+        "user_id": user_id,
+        "template_id": template_id,
+        "generated_content_id": generated_content_id,
+        "prompt_chars": prompt_chars,
+        "latency_ms": latency_ms,
+        "cache_hit": False,
+        "hedged": False,
+    }
+    if result is not None:
+        values["prompt_chars"] = len(result.prompt_used)
+        values["cache_hit"] = result.cache_hit
+        values["latency_ms"] = result.latency_ms
+        completion = result.completion
+        if completion is not None:
+            values.update(
+                provider=completion.provider,
+                model=completion.model,
+                prompt_tokens=completion.prompt_tokens,
+                completion_tokens=completion.completion_tokens,
+                latency_ms=completion.latency_ms,
+                hedged=completion.hedged,
+            )
+    if error is not None:
+        # LLMProviderError encadeia o erro do último provedor tentado; é ele que interessa
+        values["error_class"] = type(error.__cause__ or error).__name__
+
+    try:
+        crud.create_generation_telemetry(db, **values)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Não foi possível gravar a telemetria da geração: {e!r}")
+
+
+async def record_generation_async(db: AsyncSession, **values) -> None:
+    """
+    record_generation para endpoints async (mesmos argumentos nomeados).
+    """
+    await db.run_sync(lambda session: record_generation(session, **values))
@@ -0,0 +1,107 @@
+# backend/app/services/history_export.py
+#
+# Exportação do histórico de gerações (/history/export) em NDJSON ou CSV.
+# As linhas vêm de crud.iter_user_generated_contents_for_export (cursor do servidor, yield_per)
+# e são codificadas em blocos: a resposta é enviada aos poucos e a memória não cresce com o histórico.
+# O NDJSON usa orjson quando instalado (bem mais rápido que o json da stdlib).
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Sequence
+
+from app import crud
+from app.core.database import SessionLocal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _dumps_line(record: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, ensure_ascii=False, default=_json_default) + "\n").encode("utf-8")
+
+
+def _batches(rows: Iterable[Sequence], batch_size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def ndjson_chunks(rows: Iterable[Sequence], batch_size: int) -> Iterator[bytes]:
+    """Um objeto JSON por linha; um chunk por bloco de linhas."""
+    columns = crud.HISTORY_EXPORT_COLUMNS
+    for batch in _batches(rows, batch_size):
+        yield b"".join(_dumps_line(dict(zip(columns, row))) for row in batch)
+
+
+def csv_chunks(rows: Iterable[Sequence], batch_size: int) -> Iterator[bytes]:
+    """CSV com cabeçalho; um chunk por bloco de linhas."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(crud.HISTORY_EXPORT_COLUMNS)
+    for batch in _batches(rows, batch_size):
+        writer.writerows(
+            (
+                content_id,
+                created_at.isoformat() if created_at else "",
+                "true" if is_favorite else "false",
+                *rest,
+            )
+            for content_id, created_at, is_favorite, *rest in batch
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # Histórico vazio: só o cabeçalho
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    """Comprime o stream em gzip à medida que os chunks são gerados."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: cabeçalho gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_user_history(
+    export_format: str,
+    user_id: int,
+    batch_size: int,
+    gzip_level: int | None = None,
+    **filters,
+) -> Iterator[bytes]:
+    """
+    Gera o corpo da exportação. Usa uma sessão própria, aberta e fechada pelo próprio gerador
+    (o StreamingResponse continua consumindo depois que o endpoint retorna).
+    """
+    db = SessionLocal()
+    try:
+        rows = crud.iter_user_generated_contents_for_export(db, user_id, batch_size=batch_size, **filters)
+        encode = ndjson_chunks if export_format == "ndjson" else csv_chunks
+        chunks = encode(rows, batch_size)
+        if gzip_level is not None:
+            chunks = gzip_chunks(chunks, gzip_level)
+        yield from chunks
+    finally:
+        db.close()
@@ -0,0 +1,150 @@
+# backend/app/services/history_search.py
+#
+# Busca textual no histórico (generated_contents) usando o índice full-text do banco:
+# - SQLite: tabela virtual FTS5 generated_contents_fts (tokenizer unicode61 com remove_diacritics)
+#   mantida por triggers. O FTS5 não tem stemmer de português; plurais são aproximados
+#   removendo o sufixo do termo e buscando por prefixo ("apartamentos" -> apartamento*).
+# - PostgreSQL: coluna gerada search_vector (tsvector, configuração portuguese_unaccent =
+#   unaccent + portuguese_stem) com índice GIN.
+# Os objetos são criados pela migração; sem eles a busca volta para o ILIKE antigo.
+
+import re
+import threading
+import unicodedata
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, or_, select, text
+from sqlalchemy.orm import Query, Session
+
+from app import models
+
+FTS_TABLE = "generated_contents_fts"
+PG_TS_CONFIG = "portuguese_unaccent"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+_backend_cache = {}
+_backend_lock = threading.Lock()
+
+
+def search_backend(db: Session) -> Optional[str]:
+    """
+    Retorna "fts5", "tsvector" ou None (índice ausente), verificando o banco uma vez por processo.
+    """
+    bind = db.get_bind()
+    cache_key = str(bind.url)
+    with _backend_lock:
+        if cache_key in _backend_cache:
+            return _backend_cache[cache_key]
+
+    backend = None
+    dialect = bind.dialect.name
+    if dialect == "sqlite":
+        exists = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        backend = "fts5" if exists else None
+    elif dialect == "postgresql":
+        exists = db.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'generated_contents' AND column_name = 'search_vector'"
+            )
+        ).first()
+        backend = "tsvector" if exists else None
+
+    with _backend_lock:
+        _backend_cache[cache_key] = backend
+    return backend
+
+
+def _fold(term: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", term.lower()) if not unicodedata.combining(c))
+
+
+def _strip_plural(term: str) -> str:
+    # Aproximação leve do stemming de plurais em português (o FTS5 não tem stemmer pt)
+    if len(term) > 5 and term.endswith("oes"):
+        return term[:-3]  # opções -> opc* (casa com "opção")
+    if len(term) > 4 and term.endswith(("res", "zes", "les")):
+        return term[:-2]  # lares -> lar*, luzes -> luz*
+    if len(term) > 3 and term.endswith("s"):
+        return term[:-1]  # apartamentos -> apartamento*
+    return term
+
+
+def build_fts5_query(search_query: str) -> Optional[str]:
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira um termo
+    entre aspas com busca por prefixo, todas obrigatórias (AND).
+    """
+    terms = [_strip_plural(_fold(word)) for word in re.findall(r"\w+", search_query)]
+    terms = [term for term in terms if term]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def apply_search(
+    db: Session, query: Query, search_query: str
+) -> Tuple[Query, Optional[object], Optional[object]]:
+    """
+    Filtra a query de GeneratedContent pelo texto buscado.
+    Retorna (query, coluna de relevância, coluna de snippet); as colunas são None no fallback ILIKE.
+    A relevância é crescente = mais relevante primeiro (bm25 do FTS5 é negativo; no Postgres usamos -ts_rank_cd).
+    """
+    content = models.GeneratedContent
+    backend = search_backend(db)
+
+    if backend == "fts5":
+        fts_query = build_fts5_query(search_query)
+        if fts_query is not None:
+            matches = (
+                select(
+                    literal_column("rowid").label("content_id"),
+                    # Pesos: texto gerado (coluna 0) vale o dobro do prompt (coluna 1)
+                    literal_column(f"bm25({FTS_TABLE}, 2.0, 1.0)").label("rank"),
+                    literal_column(
+                        f"snippet({FTS_TABLE}, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16)"
+                    ).label("snippet"),
+                )
+                .select_from(text(FTS_TABLE))
+                .where(text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=fts_query))
+                .subquery()
+            )
+            query = query.join(matches, matches.c.content_id == content.id)
+            return query, matches.c.rank, matches.c.snippet
+
+    elif backend == "tsvector":
+        ts_config = literal_column(f"'{PG_TS_CONFIG}'::regconfig")
+        ts_query = func.websearch_to_tsquery(ts_config, search_query)
+        search_vector = literal_column("generated_contents.search_vector")
+        query = query.filter(search_vector.op("@@")(ts_query))
+        rank = -func.ts_rank_cd(search_vector, ts_query)
+        snippet = func.ts_headline(
+            ts_config,
+            content.generated_text,
+            ts_query,
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=10, MaxFragments=2, FragmentDelimiter=…",
+        )
+        return query, rank, snippet
+
+    # Sem índice full-text (ou consulta sem palavras): comportamento antigo
+    query = query.filter(
+        or_(
+            content.prompt_used.ilike(f"%{search_query}%"),
+            content.generated_text.ilike(f"%{search_query}%"),
+        )
+    )
+    return query, None, None
+
+
+def attach_snippets(rows: List[tuple]) -> List[models.GeneratedContent]:
+    """
+    Recebe linhas (GeneratedContent, snippet) e devolve os objetos com o atributo `snippet` preenchido.
+    """
+    contents = []
+    for db_content, snippet in rows:
+        db_content.snippet = snippet
+        contents.append(db_content)
+    return contents
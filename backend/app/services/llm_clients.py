@@ -0,0 +1,126 @@
+# backend/app/services/llm_clients.py
+
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+import google.generativeai as genai
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"  # Endpoint da DeepSeek
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LLMClientRegistry:
+    """
+    Clientes dos provedores de IA com escopo da aplicação: um pool HTTP compartilhado
+    (keep-alive, limites de conexão e HTTP/2 opcional) para a DeepSeek e instâncias
+    reutilizadas de GenerativeModel para a Gemini.
+    """
+
+    def __init__(self):
+        http2 = settings.LLM_HTTP2
+        if http2 and not _http2_available():
+            logger.warning("LLM_HTTP2 habilitado, mas o pacote 'h2' não está instalado. Usando HTTP/1.1.")
+            http2 = False
+
+        self.http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                settings.LLM_REQUEST_TIMEOUT_SECONDS,
+                connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            ),
+        )
+        self.deepseek = AsyncOpenAI(
+            api_key=settings.DEEP_SEEK_API_KEY or os.getenv("DEEP_SEEK_API_KEY"),
+            base_url=DEEPSEEK_BASE_URL,
+            http_client=self.http_client,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+        self._gemini_models: Dict[str, genai.GenerativeModel] = {}
+
+    def gemini_model(self, model_name: str) -> genai.GenerativeModel:
+        model = self._gemini_models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            self._gemini_models[model_name] = model
+        return model
+
+    async def warm_up(self) -> None:
+        """
+        Abre as conexões (DNS + TLS) antes da primeira geração. Falhas são apenas logadas.
+        """
+        async def warm_deepseek():
+            await self.deepseek.models.list(timeout=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+
+        async def warm_gemini():
+            await self.gemini_model(settings.GEMINI_MODEL).count_tokens_async(
+                "ping", request_options={"timeout": settings.LLM_CONNECT_TIMEOUT_SECONDS}
+            )
+
+        # Só aquece os provedores reais presentes em LLM_PROVIDERS (o provedor fake não precisa)
+        warmers = {"deepseek": warm_deepseek, "gemini": warm_gemini}
+        providers = [name.strip() for name in settings.LLM_PROVIDERS.split(",") if name.strip() in warmers]
+
+        # O warm-up nunca deve segurar o startup além do timeout de conexão
+        timeout = settings.LLM_CONNECT_TIMEOUT_SECONDS
+        results = await asyncio.gather(
+            *(asyncio.wait_for(warmers[provider](), timeout) for provider in providers),
+            return_exceptions=True,
+        )
+        for provider, result in zip(providers, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Warm-up do provedor {provider} falhou: {result!r}")
+            else:
+                logger.info(f"Warm-up do provedor {provider} concluído.")
+
+    async def close(self) -> None:
+        await self.deepseek.close()
+        await self.http_client.aclose()
+        self._gemini_models.clear()
+
+
+_registry: Optional[LLMClientRegistry] = None
+
+
+def get_registry() -> LLMClientRegistry:
+    """
+    Retorna o registro criado no startup. Fora da aplicação (scripts, workers),
+    cria um sob demanda na primeira chamada.
+    """
+    global _registry
+    if _registry is None:
+        _registry = LLMClientRegistry()
+    return _registry
+
+
+async def startup() -> None:
+    global _registry
+    _registry = LLMClientRegistry()
+    if settings.LLM_WARMUP_ENABLED:
+        await _registry.warm_up()
+
+
+async def shutdown() -> None:
+    global _registry
+    if _registry is not None:
+        await _registry.close()
+        _registry = None
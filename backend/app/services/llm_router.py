@@ -0,0 +1,305 @@
+# backend/app/services/llm_router.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import deepseekService, fake_llm_service, gemini_service
+from app.services.provider_rate_limiter import get_provider_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Mensagem exibida quando nenhum provedor conseguiu gerar o conteúdo
+GENERATION_ERROR_MESSAGE = deepseekService.GENERATION_ERROR_MESSAGE
+
+# Amostras mínimas antes de confiar no p95/taxa de erro da janela
+_MIN_SAMPLES = 20
+
+_PROVIDER_MODULES = {
+    deepseekService.PROVIDER_NAME: deepseekService,
+    gemini_service.PROVIDER_NAME: gemini_service,
+    fake_llm_service.PROVIDER_NAME: fake_llm_service,  # Apenas para testes de carga
+}
+
+
+class LLMProviderError(Exception):
+    """Nenhum provedor conseguiu gerar o conteúdo."""
+
+
+@dataclass
+class LLMCompletion:
+    text: str
+    provider: str
+    model: str
+    latency_ms: float
+    hedged: bool = False
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+def provider_model(provider: str) -> str:
+    if provider == gemini_service.PROVIDER_NAME:
+        return settings.GEMINI_MODEL
+    if provider == fake_llm_service.PROVIDER_NAME:
+        return fake_llm_service.MODEL_NAME
+    return settings.DEEPSEEK_MODEL
+
+
+class ProviderStats:
+    """
+    Janela deslizante das últimas chamadas de um provedor (latência e sucesso)
+    e o circuit breaker correspondente.
+    """
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.samples: deque = deque(maxlen=window)  # (latência em segundos, sucesso)
+        self.consecutive_failures = 0
+        self.state = "closed"  # closed, open, half_open
+        self.opened_at = 0.0
+        self.half_open_in_flight = False
+
+    # --- Métricas ---
+    def record(self, latency: float, ok: bool) -> None:
+        self.samples.append((latency, ok))
+        if ok:
+            self.consecutive_failures = 0
+            if self.state != "closed":
+                logger.info(f"Circuito do provedor {self.name} fechado novamente.")
+            self.state = "closed"
+        else:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self._should_open():
+                self._open()
+        self.half_open_in_flight = False
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if len(latencies) < _MIN_SAMPLES:
+            return None
+        index = min(len(latencies) - 1, int(round(percentile * (len(latencies) - 1))))
+        return latencies[index]
+
+    # --- Circuit breaker ---
+    def _should_open(self) -> bool:
+        if self.consecutive_failures >= settings.LLM_CIRCUIT_FAILURE_THRESHOLD:
+            return True
+        return len(self.samples) >= _MIN_SAMPLES and self.error_rate() >= settings.LLM_CIRCUIT_ERROR_RATE
+
+    def _open(self) -> None:
+        if self.state != "open":
+            logger.warning(f"Circuito do provedor {self.name} aberto (taxa de erro {self.error_rate():.0%}).")
+        self.state = "open"
+        self.opened_at = time.monotonic()
+
+    def is_available(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.monotonic() - self.opened_at >= settings.LLM_CIRCUIT_RESET_SECONDS
+        return not self.half_open_in_flight
+
+    def begin_request(self) -> None:
+        if self.state == "open" and time.monotonic() - self.opened_at >= settings.LLM_CIRCUIT_RESET_SECONDS:
+            self.state = "half_open"
+        if self.state == "half_open":
+            # Deixa passar uma única chamada de teste
+            self.half_open_in_flight = True
+
+    def abort_request(self) -> None:
+        self.half_open_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "provider": self.name,
+            "state": self.state,
+            "samples": len(self.samples),
+            "error_rate": round(self.error_rate(), 4),
+            "p50_ms": _to_ms(self.latency_percentile(0.50)),
+            "p95_ms": _to_ms(self.latency_percentile(0.95)),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+def _to_ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 1) if value is not None else None
+
+
+_stats: Dict[str, ProviderStats] = {}
+
+
+def _get_stats(provider: str) -> ProviderStats:
+    stats = _stats.get(provider)
+    if stats is None:
+        stats = ProviderStats(provider, settings.LLM_STATS_WINDOW)
+        _stats[provider] = stats
+    return stats
+
+
+def configured_providers() -> List[str]:
+    providers = [name.strip() for name in settings.LLM_PROVIDERS.split(",") if name.strip()]
+    unknown = [name for name in providers if name not in _PROVIDER_MODULES]
+    if unknown:
+        raise ValueError(f"Provedor(es) de IA desconhecido(s) em LLM_PROVIDERS: {unknown}")
+    return providers
+
+
+def cache_identity() -> Tuple[str, str]:
+    """
+    Identifica a cadeia de provedores/modelos configurada (compõe a chave do cache de gerações).
+    """
+    providers = configured_providers()
+    return ",".join(providers), ",".join(provider_model(name) for name in providers)
+
+
+def _available_providers() -> List[str]:
+    providers = configured_providers()
+    available = [name for name in providers if _get_stats(name).is_available()]
+    # Com todos os circuitos abertos, ainda tenta o preferido em vez de falhar sem tentar
+    return available or providers[:1]
+
+
+def providers_snapshot() -> List[dict]:
+    return [_get_stats(name).snapshot() for name in configured_providers()]
+
+
+async def _call_provider(provider: str, prompt: str, rate_limited: bool = False, **options) -> LLMCompletion:
+    limiter = get_provider_rate_limiter(provider) if rate_limited else None
+    if limiter is not None:
+        # Limite do provedor efetivamente chamado (também no failover e no hedge); a espera não conta como latência
+        await limiter.acquire()
+    stats = _get_stats(provider)
+    stats.begin_request()
+    started = time.monotonic()
+    usage: dict = {}
+    try:
+        text = await _PROVIDER_MODULES[provider].complete_content_for_real_estate(prompt, usage=usage, **options)
+    except asyncio.CancelledError:
+        # Chamada cancelada pelo hedge não conta como erro do provedor
+        stats.abort_request()
+        raise
+    except Exception as e:
+        stats.record(time.monotonic() - started, ok=False)
+        logger.warning(f"Provedor {provider} falhou: {e}")
+        raise
+    latency = time.monotonic() - started
+    stats.record(latency, ok=True)
+    return LLMCompletion(
+        text=text,
+        provider=provider,
+        model=provider_model(provider),
+        latency_ms=latency * 1000,
+        prompt_tokens=usage.get("prompt_tokens"),
+        completion_tokens=usage.get("completion_tokens"),
+    )
+
+
+def _hedge_delay(provider: str) -> float:
+    p95 = _get_stats(provider).latency_percentile(0.95)
+    return p95 if p95 is not None else settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+
+
+async def _generate_hedged(primary: str, secondary: str, prompt: str, **options) -> LLMCompletion:
+    tasks = {asyncio.create_task(_call_provider(primary, prompt, **options))}
+    try:
+        done, tasks = await asyncio.wait(tasks, timeout=_hedge_delay(primary))
+        last_error: Optional[BaseException] = None
+        for task in done:
+            if task.exception() is None:
+                return task.result()
+            last_error = task.exception()
+
+        logger.info(f"Hedge: {primary} passou do p95, disparando {secondary}.")
+        tasks.add(asyncio.create_task(_call_provider(secondary, prompt, **options)))
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    result = task.result()
+                    result.hedged = result.provider != primary
+                    return result
+                last_error = task.exception()
+    finally:
+        # Cancela a chamada que perdeu a corrida e, se quem chamou foi cancelado
+        # (ex.: cliente desconectou), também as que ainda estavam em andamento
+        for task in tasks:
+            task.cancel()
+    raise LLMProviderError(f"Todos os provedores falharam: {last_error}") from last_error
+
+
+async def generate(
+    prompt: str, json_output: bool = False, max_tokens: Optional[int] = None, rate_limited: bool = False
+) -> LLMCompletion:
+    """
+    Gera o conteúdo no primeiro provedor saudável, com failover para os demais.
+    Com LLM_HEDGE_ENABLED, dispara o segundo provedor quando o primeiro excede seu p95
+    e devolve a primeira resposta válida. Levanta LLMProviderError se todos falharem.
+    `json_output` e `max_tokens` são repassados aos provedores (saída multicanal).
+    Com `rate_limited` (lotes), cada chamada espera o limite por minuto do provedor chamado.
+    """
+    options = {"json_output": json_output, "max_tokens": max_tokens, "rate_limited": rate_limited}
+    providers = _available_providers()
+    if settings.LLM_HEDGE_ENABLED and len(providers) > 1:
+        try:
+            return await _generate_hedged(providers[0], providers[1], prompt, **options)
+        except LLMProviderError:
+            providers = providers[2:]
+            if not providers:
+                raise
+
+    last_error: Optional[Exception] = None
+    for provider in providers:
+        try:
+            return await _call_provider(provider, prompt, **options)
+        except Exception as e:
+            last_error = e
+    raise LLMProviderError(f"Todos os provedores falharam: {last_error}") from last_error
+
+
+async def stream(
+    prompt: str, usage: Optional[dict] = None, rate_limited: bool = False
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Stream de (provedor, trecho). Faz failover para o próximo provedor apenas se
+    o anterior falhar antes de enviar o primeiro trecho. Ao final, `usage` (se informado)
+    traz prompt_tokens/completion_tokens e latency_ms do provedor que respondeu.
+    """
+    last_error: Optional[Exception] = None
+    for provider in _available_providers():
+        limiter = get_provider_rate_limiter(provider) if rate_limited else None
+        if limiter is not None:
+            await limiter.acquire()
+        stats = _get_stats(provider)
+        stats.begin_request()
+        started = time.monotonic()
+        sent_any = False
+        try:
+            async for delta in _PROVIDER_MODULES[provider].stream_content_for_real_estate(prompt, usage=usage):
+                sent_any = True
+                yield provider, delta
+        except (GeneratorExit, asyncio.CancelledError):
+            # Cliente desistiu do stream: não conta como erro do provedor
+            stats.abort_request()
+            raise
+        except Exception as e:
+            stats.record(time.monotonic() - started, ok=False)
+            logger.warning(f"Provedor {provider} falhou durante o stream: {e}")
+            if sent_any:
+                raise
+            last_error = e
+            continue
+        latency = time.monotonic() - started
+        stats.record(latency, ok=True)
+        if usage is not None:
+            usage["latency_ms"] = latency * 1000
+        return
+    raise LLMProviderError(f"Todos os provedores falharam: {last_error}") from last_error
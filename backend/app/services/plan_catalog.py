@@ -0,0 +1,193 @@
+# backend/app/services/plan_catalog.py
+#
+# Catálogo de planos servido por GET /subscriptions/plans: cópia em memória da tabela
+# subscription_plans, já serializada em JSON e com ETag. O GET só lê essa cópia; nunca chama
+# o Stripe nem escreve no banco.
+#
+# - sync_from_stripe: busca produtos/preços no Stripe, faz o upsert em subscription_plans e
+#   recarrega a cópia. Roda na task de segundo plano (a cada PLAN_CATALOG_STRIPE_SYNC_SECONDS)
+#   e nos webhooks product.* / price.* (request_sync).
+# - reload: relê só o banco. A task faz isso a cada PLAN_CATALOG_RELOAD_SECONDS, para que os
+#   workers que não receberam o webhook também vejam a mudança.
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import async_crud, schemas
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services import stripe_service
+
+logger = logging.getLogger(__name__)
+
+# --- ATUALIZAÇÃO CRÍTICA AQUI: Mapeamento de Gerações por Plano E Intervalo ---
+# Use um dicionário aninhado ou chaves compostas para mapear gerações por nome E intervalo
+MAX_GENERATIONS_MAP = {
+    "Basic": {"month": 20, "year": 240},  # 20 * 12
+    "Premium": {"month": 50, "year": 600}, # 50 * 12
+    "Unlimited": {"month": 0, "year": 0},  # Ilimitado (0) para ambos
+}
+# -----------------------------------------------------------------------------
+
+FREE_PLAN_DESCRIPTION = "Plano gratuito com funcionalidades básicas."
+
+
+@dataclass(frozen=True)
+class PlanCatalog:
+    body: bytes  # JSON da lista de schemas.SubscriptionPlan
+    etag: str
+
+
+_catalog: Optional[PlanCatalog] = None
+_plans_adapter = TypeAdapter(List[schemas.SubscriptionPlan])
+_sync_lock = asyncio.Lock()  # Webhook e task não fazem o upsert ao mesmo tempo
+_refresh_task: Optional[asyncio.Task] = None
+_sync_tasks: set[asyncio.Task] = set()  # Referências das syncs disparadas por webhook
+
+
+def get_catalog() -> Optional[PlanCatalog]:
+    """Cópia atual do catálogo, ou None se ainda não foi carregada."""
+    return _catalog
+
+
+async def reload(db: AsyncSession) -> PlanCatalog:
+    """Relê subscription_plans e troca a cópia em memória (o ETag só muda se o conteúdo mudar)."""
+    global _catalog
+    plans = await async_crud.get_all_subscription_plans(db)
+    body = _plans_adapter.dump_json(_plans_adapter.validate_python(plans, from_attributes=True))
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if _catalog is None or _catalog.etag != etag:
+        _catalog = PlanCatalog(body=body, etag=etag)
+        logger.info(f"Catálogo de planos carregado ({len(plans)} planos, ETag {etag})")
+    return _catalog
+
+
+async def load() -> PlanCatalog:
+    async with AsyncSessionLocal() as db:
+        return await reload(db)
+
+
+async def _upsert_plan(db: AsyncSession, plan_data: schemas.SubscriptionPlanCreate) -> None:
+    existing_plan = await async_crud.get_subscription_plan_by_stripe_price_id(db, plan_data.price_id_stripe)
+    if existing_plan is None:
+        await async_crud.create_subscription_plan(db=db, plan=plan_data)
+        logger.debug(f"Novo plano Stripe criado no DB: {plan_data.name} - {plan_data.interval} (price_id: {plan_data.price_id_stripe})")
+        return
+
+    # Só grava quando algo mudou (nome, descrição, preço, gerações, ativo...)
+    if any(getattr(existing_plan, field) != value for field, value in plan_data.model_dump().items()):
+        await async_crud.update_subscription_plan(
+            db, db_obj=existing_plan, obj_in=schemas.SubscriptionPlanUpdate(**plan_data.model_dump())
+        )
+        logger.debug(f"Plano existente atualizado (por price_id): {existing_plan.name} - {existing_plan.interval}")
+
+
+async def sync_from_stripe(db: AsyncSession) -> PlanCatalog:
+    """
+    Sincroniza subscription_plans com os preços configurados no Stripe (e garante o plano Free),
+    depois recarrega a cópia em memória.
+    """
+    async with _sync_lock:
+        stripe_products_and_prices = await stripe_service.get_all_stripe_products_and_prices()
+        for sp_data in stripe_products_and_prices:
+            plan_name = sp_data["name"]
+            # Obtenha o max_generations com base no nome E no intervalo
+            max_generations = MAX_GENERATIONS_MAP.get(plan_name, {}).get(sp_data["interval"], 0)
+            if plan_name == "Free":
+                max_generations = settings.FREE_PLAN_MAX_GENERATIONS # O Free plan tem um limite único
+            await _upsert_plan(
+                db,
+                schemas.SubscriptionPlanCreate(
+                    name=plan_name,
+                    description=sp_data["description"],
+                    price_id_stripe=sp_data["price_id_stripe"],
+                    unit_amount=sp_data["unit_amount"],
+                    currency=sp_data["currency"],
+                    interval=sp_data["interval"],
+                    interval_count=sp_data["interval_count"],
+                    type=sp_data["type"],
+                    max_generations=max_generations,
+                    is_active=True, # Garantir que planos Stripe ativos estejam ativos no DB
+                ),
+            )
+
+        # Garanta que o plano "Free" exista e esteja com as configurações do .env
+        free_plan = schemas.SubscriptionPlanCreate(
+            name="Free",
+            description=FREE_PLAN_DESCRIPTION,
+            price_id_stripe=settings.STRIPE_FREE_PLAN_PRICE_ID,
+            unit_amount=0,
+            currency="BRL",
+            interval="month",
+            interval_count=1,
+            type="recurring",
+            max_generations=settings.FREE_PLAN_MAX_GENERATIONS,
+            is_active=True,
+        )
+        free_plan_db = await async_crud.get_subscription_plan_by_name(db, "Free", interval="month")
+        if free_plan_db is None:
+            await async_crud.create_subscription_plan(db=db, plan=free_plan)
+            logger.info("Plano 'Free' criado no banco de dados.")
+        elif any(getattr(free_plan_db, field) != value for field, value in free_plan.model_dump().items()):
+            await async_crud.update_subscription_plan(
+                db, db_obj=free_plan_db, obj_in=schemas.SubscriptionPlanUpdate(**free_plan.model_dump())
+            )
+            logger.info("Plano 'Free' atualizado no banco de dados.")
+
+        return await reload(db)
+
+
+async def _sync_with_own_session() -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await sync_from_stripe(db)
+    except Exception:
+        logger.exception("Erro ao sincronizar o catálogo de planos com o Stripe")
+
+
+def request_sync() -> None:
+    """Agenda uma sincronização com o Stripe sem segurar quem chamou (ex.: o webhook)."""
+    task = asyncio.create_task(_sync_with_own_session())
+    _sync_tasks.add(task)
+    task.add_done_callback(_sync_tasks.discard)
+
+
+async def _refresh_loop() -> None:
+    last_stripe_sync = None
+    while True:
+        if last_stripe_sync is None or time.monotonic() - last_stripe_sync >= settings.PLAN_CATALOG_STRIPE_SYNC_SECONDS:
+            last_stripe_sync = time.monotonic()  # Marca antes: uma falha não vira nova chamada a cada volta
+            await _sync_with_own_session()
+        else:
+            try:
+                await load()
+            except Exception:
+                logger.exception("Erro ao recarregar o catálogo de planos")
+        await asyncio.sleep(settings.PLAN_CATALOG_RELOAD_SECONDS)
+
+
+async def startup() -> None:
+    """Carrega o catálogo do banco (sem Stripe) e inicia a atualização em segundo plano."""
+    global _refresh_task
+    try:
+        await load()
+    except Exception:
+        logger.exception("Erro ao carregar o catálogo de planos no startup")
+    if settings.PLAN_CATALOG_REFRESH_ENABLED:
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def shutdown() -> None:
+    global _refresh_task
+    tasks = [*_sync_tasks, *([_refresh_task] if _refresh_task else [])]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _refresh_task = None
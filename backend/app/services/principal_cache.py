@@ -0,0 +1,93 @@
+# backend/app/services/principal_cache.py
+#
+# Cache em memória (por processo) do usuário autenticado, com o plano já carregado.
+# get_current_user/get_current_user_async consultam aqui antes de ir ao banco.
+#
+# Os objetos guardados são snapshots destacados (detached) de User + SubscriptionPlan e nunca
+# são alterados: cada requisição recebe uma cópia própria via Session.merge(load=False), que
+# anexa o usuário à sessão da requisição sem SELECT. Escritas no usuário ou no plano chamam
+# invalidate_user/clear; o TTL curto limita a defasagem entre processos.
+#
+# Também guarda a versão de token de cada usuário (users.token_version), usada para validar
+# tokens com claims (security.get_token_principal) sem carregar o usuário inteiro.
+
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import settings
+
+# O TTLCache não é thread-safe, por isso o lock (endpoints síncronos rodam no threadpool)
+_principals: TTLCache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+_emails_by_user_id: dict[int, str] = {}
+_token_versions: TTLCache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+_lock = threading.Lock()
+
+
+def get(email: str) -> Optional[models.User]:
+    """Snapshot destacado do usuário, ou None se ausente/expirado."""
+    if not settings.PRINCIPAL_CACHE_ENABLED:
+        return None
+    with _lock:
+        return _principals.get(email)
+
+
+def put(db: Session, user: models.User) -> None:
+    """
+    Destaca da sessão o usuário recém-carregado (com subscription_plan) e o guarda.
+    Depois disso o chamador deve usar db.merge(user, load=False) para obter a cópia da requisição.
+    """
+    plan = user.subscription_plan  # Já carregado pelo joinedload; garante que o snapshot o inclua
+    if plan is not None:
+        db.expunge(plan)
+    db.expunge(user)
+    with _lock:
+        _principals[user.email] = user
+        _emails_by_user_id[user.id] = user.email
+        _token_versions[user.id] = user.token_version
+        if len(_emails_by_user_id) > 2 * settings.PRINCIPAL_CACHE_MAX_ENTRIES:
+            # Índice reverso sem TTL: descarta entradas cujo e-mail já saiu do cache
+            for user_id, email in list(_emails_by_user_id.items()):
+                if email not in _principals:
+                    del _emails_by_user_id[user_id]
+
+
+def get_token_version(user_id: int) -> Optional[int]:
+    """Versão de token em cache, ou None se ausente/expirada."""
+    if not settings.PRINCIPAL_CACHE_ENABLED:
+        return None
+    with _lock:
+        return _token_versions.get(user_id)
+
+
+def put_token_version(user_id: int, version: int) -> None:
+    if not settings.PRINCIPAL_CACHE_ENABLED:
+        return
+    with _lock:
+        _token_versions[user_id] = version
+
+
+def invalidate_user(user_id: int) -> None:
+    """Remove o usuário do cache (plano, senha, perfil, cota ou status alterados)."""
+    with _lock:
+        _token_versions.pop(user_id, None)
+        email = _emails_by_user_id.pop(user_id, None)
+        if email is not None:
+            _principals.pop(email, None)
+
+
+def clear() -> None:
+    """Esvazia o cache (ex.: alteração de um plano ou reset em massa das cotas)."""
+    with _lock:
+        _principals.clear()
+        _emails_by_user_id.clear()
+        _token_versions.clear()
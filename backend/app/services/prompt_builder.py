@@ -0,0 +1,191 @@
+# backend/app/services/prompt_builder.py
+
+import hashlib
+import logging
+import string
+import threading
+from typing import List, Optional, Tuple
+
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Campos de controle da requisição que não podem ser usados como placeholders
+_CONTROL_FIELDS = {"force_fresh", "template_id", "channels"}
+TEMPLATE_FIELDS = frozenset(set(schemas.PropertyDetailsBase.model_fields) - _CONTROL_FIELDS)
+
+_formatter = string.Formatter()
+
+
+class PromptTemplateError(ValueError):
+    """Template de prompt inválido (placeholder desconhecido ou mal formado)."""
+
+
+class CompiledPromptTemplate:
+    """
+    Forma compilada de PromptTemplate.template_text: uma lista de trechos literais
+    intercalados com placeholders já validados contra PropertyDetailsBase.
+    Renderizar é apenas um join, sem reinterpretar o texto do template.
+    """
+
+    def __init__(
+        self,
+        template_id: Optional[int],
+        version: Optional[str],
+        segments: List[Tuple[str, Optional[str], str]],
+        is_premium: bool = False,
+    ):
+        self.template_id = template_id
+        self.version = version
+        self.is_premium = is_premium
+        self.segments = segments  # (literal, campo ou None, format_spec)
+        self.placeholders = sorted({field for _, field, _ in segments if field})
+        self.static_length = sum(len(literal) for literal, _, _ in segments)
+
+    def render(self, property_details: schemas.PropertyDetailsBase) -> str:
+        parts = []
+        for literal, field, format_spec in self.segments:
+            parts.append(literal)
+            if field is None:
+                continue
+            value = getattr(property_details, field)
+            if value is None:
+                continue  # Campos opcionais não informados somem do texto
+            if format_spec:
+                try:
+                    parts.append(format(value, format_spec))
+                    continue
+                except (TypeError, ValueError):
+                    pass  # Formato incompatível com o valor: usa o texto puro
+            parts.append(str(value))
+        return "".join(parts)
+
+
+def compile_prompt_template(
+    template_text: str, template_id: Optional[int] = None, version: Optional[str] = None, is_premium: bool = False
+) -> CompiledPromptTemplate:
+    """
+    Compila o texto do template. Placeholders usam a sintaxe {campo} (ou {campo:formato})
+    com os nomes dos campos de PropertyDetailsBase; chaves literais são escritas como {{ }}.
+    Levanta PromptTemplateError para placeholders desconhecidos.
+    """
+    segments = []
+    unknown = set()
+    try:
+        for literal, field, format_spec, conversion in _formatter.parse(template_text):
+            if field is not None:
+                if conversion or not field.isidentifier() or field not in TEMPLATE_FIELDS:
+                    unknown.add(field + (f"!{conversion}" if conversion else ""))
+                    continue
+            segments.append((literal, field, format_spec or ""))
+    except ValueError as e:
+        raise PromptTemplateError(f"Template mal formado: {e}")
+
+    if unknown:
+        raise PromptTemplateError(
+            f"Placeholders desconhecidos no template: {', '.join(sorted(unknown))}. "
+            f"Campos disponíveis: {', '.join(sorted(TEMPLATE_FIELDS))}."
+        )
+    return CompiledPromptTemplate(template_id, version, segments, is_premium=is_premium)
+
+
+# Templates compilados por (id, hash do texto): editar o template (inclusive direto no banco)
+# gera uma nova chave; o TTL descarta as versões antigas
+_compiled_cache: TTLCache = TTLCache(maxsize=256, ttl=settings.PROMPT_TEMPLATE_CACHE_TTL_SECONDS)
+_compiled_lock = threading.Lock()
+
+
+def template_version(template_text: str) -> str:
+    """Versão do template: prefixo do SHA-256 do texto (também entra na chave do generation_cache)."""
+    return hashlib.sha256(template_text.encode("utf-8")).hexdigest()[:16]
+
+
+def get_compiled_template(db: Session, template_id: int) -> Optional[CompiledPromptTemplate]:
+    """
+    Retorna o template compilado, recompilando apenas quando o texto do template muda.
+    """
+    source_row = crud.get_prompt_template_source(db, template_id)
+    if source_row is None:
+        return None
+    version = template_version(source_row.template_text)
+    cache_key = (template_id, version)
+
+    with _compiled_lock:
+        compiled = _compiled_cache.get(cache_key)
+    if compiled is not None and compiled.is_premium == bool(source_row.is_premium):
+        return compiled
+
+    compiled = compile_prompt_template(
+        source_row.template_text, template_id=template_id, version=version, is_premium=bool(source_row.is_premium)
+    )
+    with _compiled_lock:
+        _compiled_cache[cache_key] = compiled
+    logger.info(
+        f"Template {template_id} compilado (versão {version}): "
+        f"{compiled.static_length} caracteres fixos, placeholders={compiled.placeholders}"
+    )
+    return compiled
+
+
+def build_property_prompt(
+    property_details: schemas.PropertyDetailsBase, template: Optional[CompiledPromptTemplate] = None
+) -> str:
+    """
+    Monta o prompt enviado ao provedor de IA a partir dos detalhes do imóvel.
+    Com um template compilado, o prompt é a renderização do template.
+    """
+    if template is not None:
+        prompt_string = template.render(property_details)
+        logger.debug(f"Prompt renderizado pelo template {template.template_id}: {len(prompt_string)} caracteres")
+        return prompt_string
+
+    prompt_string = f"Gere conteúdo para redes sociais sobre um imóvel. Tipo de imóvel: {property_details.property_type}."
+    if property_details.bedrooms is not None:
+        prompt_string += f" Quartos: {property_details.bedrooms}."
+    if property_details.bathrooms is not None:
+        prompt_string += f" Banheiros: {property_details.bathrooms}."
+    if property_details.location:
+        prompt_string += f" Localização: {property_details.location}."
+    if property_details.special_features:
+        prompt_string += f" Características especiais: {property_details.special_features}."
+    if property_details.purpose:
+        prompt_string += f" Finalidade: {property_details.purpose}."
+    if property_details.target_audience:
+        prompt_string += f" Público-alvo: {property_details.target_audience}."
+    if property_details.tone:
+        prompt_string += f" Tom: {property_details.tone}."
+    if property_details.length:
+        prompt_string += f" Comprimento: {property_details.length}."
+    if property_details.language:
+        prompt_string += f" Idioma: {property_details.language}."
+    if property_details.property_value is not None:
+        prompt_string += f" Valor do imóvel: R$ {property_details.property_value}."
+    if property_details.condo_fee is not None:
+        prompt_string += f" Condomínio: R$ {property_details.condo_fee}."
+    if property_details.iptu_value is not None:
+        prompt_string += f" IPTU: R$ {property_details.iptu_value}."
+    if property_details.additional_details:
+        prompt_string += f" Outros detalhes: {property_details.additional_details}."
+
+    if property_details.optimize_for_seo_gmb:
+        seo_gmb_details = []
+        if property_details.seo_keywords:
+            seo_gmb_details.append(f"Palavras-chave SEO: {property_details.seo_keywords}")
+        if property_details.contact_phone:
+            seo_gmb_details.append(f"Telefone: {property_details.contact_phone}")
+        if property_details.contact_email:
+            seo_gmb_details.append(f"Email: {property_details.contact_email}")
+        if property_details.contact_website:
+            seo_gmb_details.append(f"Website: {property_details.contact_website}")
+        if property_details.property_address:
+            seo_gmb_details.append(f"Endereço: {property_details.property_address}")
+
+        if seo_gmb_details:
+            prompt_string += f" Detalhes de SEO/GMB: {'; '.join(seo_gmb_details)}."
+
+    prompt_string += " Use emojis relevantes. Inclua uma chamada para ação (CTA). Inclua hashtags relevantes. O objetivo é atrair compradores e despertar interesse."
+    return prompt_string
@@ -0,0 +1,53 @@
+# backend/app/services/provider_rate_limiter.py
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket assíncrono: libera no máximo `rate_per_minute` chamadas por minuto,
+    permitindo rajadas de até `burst` chamadas.
+    """
+
+    def __init__(self, rate_per_minute: int, burst: int | None = None):
+        self.rate = max(rate_per_minute, 1) / 60.0  # tokens por segundo
+        self.capacity = float(burst or max(1, rate_per_minute // 10))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                # Espera exatamente o tempo necessário para o próximo token
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_PROVIDER_LIMITS = {
+    "deepseek": "DEEPSEEK_REQUESTS_PER_MINUTE",
+    "gemini": "GEMINI_REQUESTS_PER_MINUTE",
+    "fake": "FAKE_LLM_REQUESTS_PER_MINUTE",
+}
+
+_limiters: Dict[str, Optional[AsyncRateLimiter]] = {}
+
+
+def get_provider_rate_limiter(provider: str) -> Optional[AsyncRateLimiter]:
+    """
+    Retorna o limitador compartilhado (por processo) de um provedor,
+    ou None quando o limite configurado é 0 (sem limite).
+    """
+    if provider not in _limiters:
+        rate = getattr(settings, _PROVIDER_LIMITS.get(provider, "LLM_DEFAULT_REQUESTS_PER_MINUTE"))
+        _limiters[provider] = AsyncRateLimiter(rate_per_minute=rate) if rate > 0 else None
+    return _limiters[provider]
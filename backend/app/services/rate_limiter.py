@@ -0,0 +1,248 @@
+# backend/app/services/rate_limiter.py
+#
+# Rate limiting por usuário e classe de rota (token bucket), aplicado por RateLimitMiddleware
+# antes do roteamento: uma requisição barrada não chega a abrir sessão no banco nem a chamar o LLM.
+#
+# - Identidade: "sub" do JWT (token decodificado uma vez e memorizado); sem token válido, o IP.
+# - Classe de rota: "generation" (POST /generate-content*) ou "default" (o resto de /api/).
+# - Limites por nome do plano (RATE_LIMIT_PLANS). O plano vem da claim "plan" (JWT_CLAIMS_ENABLED),
+#   do principal_cache ou de uma consulta de uma coluna ao banco, memorizada por
+#   RATE_LIMIT_PLAN_CACHE_SECONDS; sem plano identificado, vale RATE_LIMIT_DEFAULT_PLAN.
+#   Um limite menor nunca descarta as fichas que o bucket já tem.
+# - Estado em memória por processo (padrão) ou na tabela rate_limit_buckets (RATE_LIMIT_BACKEND=
+#   "database", SQLite ou PostgreSQL), para que vários workers dividam o mesmo limite.
+#
+# Respostas levam RateLimit-Limit/-Remaining/-Reset/-Policy; as barradas, 429 com Retry-After.
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from cachetools import TTLCache
+from jose import JWTError, jwt
+
+from app import async_crud
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services import principal_cache
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60  # Limites em requisições por minuto
+API_PATH_PREFIX = "/api/"
+GENERATION_PATH_PREFIX = "/api/v1/generate-content"
+
+# Tokens já decodificados: token -> (identidade, plano da claim, exp). Limitado a RATE_LIMIT_MAX_KEYS
+_identities: dict[str, tuple[str, Optional[str], float]] = {}
+# Plano lido do banco por e-mail ("" = sem usuário ou sem plano). Só acessado no event loop
+_plans: TTLCache = TTLCache(maxsize=settings.RATE_LIMIT_MAX_KEYS, ttl=settings.RATE_LIMIT_PLAN_CACHE_SECONDS)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests: int  # Por minuto; também é a capacidade do bucket (rajada máxima)
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.requests / WINDOW_SECONDS
+
+
+def parse_limits(raw: str) -> dict[str, Optional[RateLimit]]:
+    """ "60/6" -> limites das classes default e generation (0 = sem limite)."""
+    default, _, generation = raw.partition("/")
+    return {
+        route_class: RateLimit(int(value)) if int(value) > 0 else None
+        for route_class, value in (("default", default), ("generation", generation or default))
+    }
+
+
+def parse_plan_limits(raw: str) -> dict[str, dict[str, Optional[RateLimit]]]:
+    """ "Free=60/6,Unlimited=600/120" -> limites por nome de plano (minúsculo)."""
+    plans = {}
+    for entry in raw.split(","):
+        name, _, limits = entry.partition("=")
+        if name.strip() and limits.strip():
+            plans[name.strip().lower()] = parse_limits(limits.strip())
+    return plans
+
+
+class MemoryBucketStore:
+    """
+    Buckets no próprio processo. Só é usado pelo middleware, no event loop: sem concorrência
+    entre threads, então não há lock.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: dict[str, list[float]] = {}  # key -> [fichas, atualizado em (monotonic)]
+
+    async def take(self, key: str, limit: RateLimit) -> tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict_idle(now)
+            bucket = self._buckets[key] = [float(limit.requests), now]
+        # Teto nunca abaixo das fichas atuais: um limite menor só deixa de reabastecer (ver take_rate_limit_token)
+        tokens = min(max(float(limit.requests), bucket[0]), bucket[0] + (now - bucket[1]) * limit.refill_per_second)
+        bucket[1] = now
+        allowed = tokens >= 1
+        bucket[0] = tokens - 1 if allowed else tokens
+        return allowed, bucket[0]
+
+    def _evict_idle(self, now: float) -> None:
+        # Parado há uma janela inteira o bucket já está cheio: descartá-lo equivale a recriá-lo
+        for key, (_, updated_at) in list(self._buckets.items()):
+            if now - updated_at >= WINDOW_SECONDS:
+                del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+class DatabaseBucketStore:
+    """Buckets na tabela rate_limit_buckets, compartilhados entre processos (um UPDATE por requisição)."""
+
+    async def take(self, key: str, limit: RateLimit) -> tuple[bool, float]:
+        async with AsyncSessionLocal() as db:
+            return await async_crud.take_rate_limit_token(
+                db, key, limit.requests, limit.refill_per_second, time.time()
+            )
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def _token_identity(token: str) -> Optional[tuple[str, Optional[str], float]]:
+    identity = _identities.get(token)
+    if identity is not None and identity[2] > time.time():
+        return identity
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None  # O endpoint responde 401; aqui a requisição conta como anônima
+    if not payload.get("sub") or "exp" not in payload:
+        return None
+    if len(_identities) >= settings.RATE_LIMIT_MAX_KEYS:
+        _identities.clear()
+    identity = _identities[token] = (payload["sub"], payload.get("plan"), float(payload["exp"]))
+    return identity
+
+
+async def _plan_name(email: str, claimed_plan: Optional[str]) -> Optional[str]:
+    if claimed_plan:
+        return claimed_plan
+    cached = principal_cache.get(email)
+    if cached is not None and cached.subscription_plan is not None:
+        return cached.subscription_plan.name
+    plan = _plans.get(email)
+    if plan is None:
+        try:
+            async with AsyncSessionLocal() as db:
+                plan = await async_crud.get_user_plan_name(db, email) or ""
+        except Exception as e:
+            logger.error(f"Erro ao ler o plano para o rate limiting ({type(e).__name__}): {e}")
+            return None  # Não memoriza: a próxima requisição tenta de novo
+        _plans[email] = plan
+    return plan or None
+
+
+def _limit_headers(limit: RateLimit, tokens: float) -> list[tuple[bytes, bytes]]:
+    remaining = max(0, math.floor(tokens))
+    reset = max(0, math.ceil((limit.requests - tokens) / limit.refill_per_second))
+    return [
+        (b"ratelimit-limit", str(limit.requests).encode()),
+        (b"ratelimit-remaining", str(remaining).encode()),
+        (b"ratelimit-reset", str(reset).encode()),
+        (b"ratelimit-policy", f"{limit.requests};w={WINDOW_SECONDS}".encode()),
+    ]
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware, que custaria uma task e filas por requisição)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = settings.RATE_LIMIT_ENABLED
+        self.store = (
+            DatabaseBucketStore()
+            if settings.RATE_LIMIT_BACKEND == "database"
+            else MemoryBucketStore(settings.RATE_LIMIT_MAX_KEYS)
+        )
+        self.anonymous_limits = parse_limits(settings.RATE_LIMIT_ANONYMOUS)
+        self.plan_limits = parse_plan_limits(settings.RATE_LIMIT_PLANS)
+        self.default_limits = self.plan_limits.get(settings.RATE_LIMIT_DEFAULT_PLAN.lower(), self.anonymous_limits)
+        self.exempt_paths = {path.strip() for path in settings.RATE_LIMIT_EXEMPT_PATHS.split(",") if path.strip()}
+
+    async def _identify(self, scope) -> tuple[str, dict[str, Optional[RateLimit]]]:
+        authorization = _header(scope, b"authorization")
+        if authorization and authorization[:7].lower() == b"bearer ":
+            identity = _token_identity(authorization[7:].decode("latin-1"))
+            if identity is not None:
+                email, claimed_plan, _ = identity
+                plan = await _plan_name(email, claimed_plan)
+                limits = self.plan_limits.get(plan.lower()) if plan else None
+                return f"user:{email}", limits or self.default_limits
+        client = scope.get("client")
+        return f"ip:{client[0] if client else '-'}", self.anonymous_limits
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.enabled
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"  # Preflight do CORS
+            or not scope["path"].startswith(API_PATH_PREFIX)
+            or scope["path"] in self.exempt_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        route_class = (
+            "generation"
+            if scope["method"] == "POST" and scope["path"].startswith(GENERATION_PATH_PREFIX)
+            else "default"
+        )
+        identity, limits = await self._identify(scope)
+        limit = limits[route_class]
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            allowed, tokens = await self.store.take(f"{identity}:{route_class}", limit)
+        except Exception as e:
+            # Falha no backend compartilhado não deve derrubar a API: deixa passar
+            logger.error(f"Erro no rate limiting ({type(e).__name__}): {e}")
+            await self.app(scope, receive, send)
+            return
+
+        headers = _limit_headers(limit, tokens)
+        if not allowed:
+            retry_after = max(1, math.ceil((1 - tokens) / limit.refill_per_second))
+            body = (
+                '{"detail":"Muitas requisições. Tente novamente em %d s."}' % retry_after
+            ).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode()),
+                    *headers,
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -1,5 +1,6 @@
 # backend/app/services/stripe_service.py
 
+import asyncio
 import stripe
 from app.core.config import settings
 from app.models import User, SubscriptionPlan # Importe os modelos User e SubscriptionPlan
@@ -121,11 +122,12 @@ async def get_all_stripe_products_and_prices() -> List[Dict[str, Any]]:
     try:
         # Fetch all active prices from Stripe, automatically handling pagination
         # Use limit parameter if you have many prices (default is 10)
-        prices = stripe.Price.list(active=True, limit=100) # Aumentei o limite para ter certeza de pegar todos, se houver muitos
+        # As chamadas do SDK são bloqueantes: rodam em thread para não travar o event loop
+        prices = await asyncio.to_thread(stripe.Price.list, active=True, limit=100) # Aumentei o limite para ter certeza de pegar todos, se houver muitos
         
 
         # Fetch all active products
-        products = stripe.Product.list(active=True, limit=100) # Aumentei o limite aqui também
+        products = await asyncio.to_thread(stripe.Product.list, active=True, limit=100) # Aumentei o limite aqui também
 
 
         product_map = {p.id: p for p in products.data}
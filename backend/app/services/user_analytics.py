@@ -0,0 +1,84 @@
+# backend/app/services/user_analytics.py
+#
+# Monta a resposta de /users/me/analytics a partir dos rollups diários (user_daily_usage):
+# nenhuma consulta passa por generated_contents, então o custo depende do número de dias.
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+
+# Sem last_reset, a burn-down cobre os últimos 30 dias (mesmo ciclo do reset mensal)
+DEFAULT_QUOTA_PERIOD_DAYS = 30
+
+
+def _period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # Semana começando na segunda-feira
+    return day
+
+
+def _usage_series(rows, start_day: date, today: date, granularity: str) -> list[schemas.UsageSeriesPoint]:
+    # Preenche os períodos sem uso com zero, para o gráfico não ter buracos
+    step = timedelta(days=7 if granularity == "week" else 1)
+    points = {}
+    period = _period_start(start_day, granularity)
+    while period <= today:
+        points[period] = schemas.UsageSeriesPoint(period_start=period, generations=0, contents=0, favorites=0)
+        period += step
+    for row in rows:
+        point = points.get(_period_start(row.day, granularity))
+        if point is None:
+            continue
+        point.generations += row.generations
+        point.contents += row.contents
+        point.favorites += row.favorites
+    return list(points.values())
+
+
+def _quota_burn_down(rows, period_start: date, today: date, limit: int | None) -> list[schemas.QuotaBurnDownPoint]:
+    generations_by_day = {row.day: row.generations for row in rows if row.day >= period_start}
+    points = []
+    used = 0
+    day = period_start
+    while day <= today:
+        used += generations_by_day.get(day, 0)
+        points.append(
+            schemas.QuotaBurnDownPoint(day=day, used=used, remaining=max(limit - used, 0) if limit else None)
+        )
+        day += timedelta(days=1)
+    return points
+
+
+def build_user_analytics(
+    db: Session, user: models.User, days: int, granularity: str = "day"
+) -> schemas.UserAnalytics:
+    """
+    Totais, série temporal dos últimos `days` dias (por dia ou semana) e burn-down da cota
+    no período atual (desde o último reset), tudo lido dos rollups diários.
+    """
+    today = datetime.utcnow().date()
+    series_start = today - timedelta(days=days - 1)
+    plan = user.subscription_plan
+    # max_generations <= 0 = ilimitado (mesma regra de reserve_generation_quota)
+    limit = plan.max_generations if plan and plan.max_generations and plan.max_generations > 0 else None
+    quota_start = user.last_reset.date() if user.last_reset else today - timedelta(days=DEFAULT_QUOTA_PERIOD_DAYS - 1)
+    quota_start = min(quota_start, today)
+
+    # Uma única leitura cobre a série e a burn-down
+    rows = crud.get_user_daily_usage(db, user.id, start_day=min(_period_start(series_start, granularity), quota_start))
+    total_contents, total_favorites = crud.get_user_usage_totals(db, user.id)
+
+    return schemas.UserAnalytics(
+        total_generated_content=total_contents,
+        total_favorites=total_favorites,
+        favorites_ratio=round(total_favorites / total_contents, 4) if total_contents else 0.0,
+        granularity=granularity,
+        series=_usage_series(rows, series_start, today, granularity),
+        quota_limit=limit,
+        quota_used=user.content_generations_count,
+        quota_remaining=max(limit - user.content_generations_count, 0) if limit else None,
+        quota_period_start=quota_start,
+        quota_burn_down=_quota_burn_down(rows, quota_start, today, limit),
+    )
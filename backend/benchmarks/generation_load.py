@@ -0,0 +1,218 @@
+# backend/benchmarks/generation_load.py
+#
+# Teste de carga de /generate-content (ou /generate-content/stream) usando o provedor fake,
+# para medir o overhead da própria aplicação separado da latência dos provedores.
+#
+# Em processo (sobe o app FastAPI real com um SQLite temporário, sem rede):
+#     python benchmarks/generation_load.py --requests 500 --concurrency 50 --latency-ms 300
+#
+# Contra um servidor já rodando (ex.: uvicorn com LLM_PROVIDERS=fake e vários workers):
+#     python benchmarks/generation_load.py --base-url http://localhost:8000 --token <JWT> --requests 2000
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def build_payload(index: int, distinct: int) -> dict:
+    # Payloads distintos evitam o cache de gerações; repetir índices mede cache hits
+    key = index % distinct
+    return {
+        "property_type": "apartamento",
+        "bedrooms": 2 + key % 3,
+        "location": f"Bairro {key}, São Paulo",
+        "purpose": "venda",
+        "tone": "profissional",
+    }
+
+
+@asynccontextmanager
+async def in_process_client(args):
+    """
+    Configura o ambiente (provedor fake + SQLite temporário), sobe o app com seu lifespan
+    e cria um usuário com plano ilimitado.
+    """
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["LLM_PROVIDERS"] = "fake"
+    os.environ["LLM_WARMUP_ENABLED"] = "false"
+    os.environ["FAKE_LLM_LATENCY_MODE"] = args.latency_mode
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.error_rate)
+    if args.latency_file:
+        os.environ["FAKE_LLM_LATENCY_FILE"] = args.latency_file
+    os.environ.setdefault("FAKE_LLM_SEED", "42")
+    # O teste dispara muitas requisições de um único usuário: o rate limiting distorceria a medição
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    # Importa o app só depois de configurar o ambiente (settings é lido na importação)
+    from app import models
+    from app.core.database import Base, SessionLocal, engine
+    from app.core.security import create_access_token
+    from app.main import app
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        plan = models.SubscriptionPlan(
+            name="Benchmark", unit_amount=0, currency="BRL", interval="month",
+            interval_count=1, type="recurring", max_generations=0,  # 0 = ilimitado
+        )
+        db.add(plan)
+        db.commit()
+        db.add(models.User(email="bench@example.com", hashed_password="-", subscription_plan_id=plan.id, content_generations_count=0))
+        db.commit()
+    finally:
+        db.close()
+    token = create_access_token({"sub": "bench@example.com"})
+
+    async with app.router.lifespan_context(app):
+        # Exceções do app viram respostas 500 e entram no relatório em vez de abortar o teste
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+            yield client, token
+
+
+@asynccontextmanager
+async def remote_client(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        yield client, args.token
+
+
+async def run_request(client, headers, path, payload, stream):
+    started = time.perf_counter()
+    first_token = None
+    if stream:
+        async with client.stream("POST", path, json=payload, headers=headers) as response:
+            ok = response.status_code == 200
+            async for line in response.aiter_lines():
+                if first_token is None and line.startswith("event: token"):
+                    first_token = time.perf_counter() - started
+                if line.startswith("event: error"):
+                    ok = False
+            status = response.status_code if ok else f"{response.status_code}/sse-error"
+    else:
+        response = await client.post(path, json=payload, headers=headers)
+        status = response.status_code
+    return status, time.perf_counter() - started, first_token
+
+
+async def run_benchmark(args) -> dict:
+    factory = remote_client if args.base_url else in_process_client
+    path = "/api/v1/generate-content/stream" if args.stream else "/api/v1/generate-content"
+
+    async with factory(args) as (client, token):
+        headers = {"Authorization": f"Bearer {token}"}
+        distinct = args.distinct or args.requests + args.warmup
+
+        for index in range(args.warmup):
+            await run_request(client, headers, path, build_payload(index, distinct), args.stream)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for index in range(args.warmup, args.warmup + args.requests):
+            queue.put_nowait(index)
+        results = []
+
+        async def worker():
+            while True:
+                try:
+                    index = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    results.append(await run_request(client, headers, path, build_payload(index, distinct), args.stream))
+                except httpx.HTTPError as e:
+                    results.append((type(e).__name__, None, None))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    statuses = Counter(str(status) for status, _, _ in results)
+    latencies = sorted(latency for status, latency, _ in results if status == 200)
+    ttft = sorted(first for status, _, first in results if status == 200 and first is not None)
+    to_ms = lambda value: round(value * 1000, 1) if value is not None else None
+
+    report = {
+        "endpoint": path,
+        "mode": "remote" if args.base_url else "in-process",
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "statuses": dict(statuses),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": to_ms(percentile(latencies, 0.50)),
+            "p95": to_ms(percentile(latencies, 0.95)),
+            "p99": to_ms(percentile(latencies, 0.99)),
+            "max": to_ms(latencies[-1] if latencies else None),
+        },
+    }
+    if args.stream:
+        report["time_to_first_token_ms"] = {
+            "p50": to_ms(percentile(ttft, 0.50)),
+            "p95": to_ms(percentile(ttft, 0.95)),
+            "p99": to_ms(percentile(ttft, 0.99)),
+        }
+    if not args.base_url and args.latency_mode == "fixed" and not args.distinct and not args.stream and latencies:
+        # Com latência fixa do provedor, o restante do p50 é custo da aplicação (auth, DB, cache, serialização)
+        report["app_overhead_p50_ms"] = round(report["latency_ms"]["p50"] - args.latency_ms, 1)
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga de /generate-content com o provedor fake.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5, help="Requisições descartadas antes da medição.")
+    parser.add_argument("--distinct", type=int, default=0, help="Nº de payloads distintos (0 = todos distintos, sem cache hit).")
+    parser.add_argument("--stream", action="store_true", help="Usa /generate-content/stream e mede o tempo até o primeiro token.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório em JSON.")
+    # Servidor remoto
+    parser.add_argument("--base-url", help="URL de um servidor já rodando (senão o app sobe em processo).")
+    parser.add_argument("--token", help="JWT de um usuário com cota suficiente (obrigatório com --base-url).")
+    # Provedor fake (apenas em processo; num servidor remoto use as variáveis FAKE_LLM_*)
+    parser.add_argument("--latency-mode", choices=("fixed", "lognormal", "replay"), default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--latency-file", help="Arquivo com uma latência (ms) por linha para o modo replay.")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    if args.base_url and not args.token:
+        parser.error("--token é obrigatório com --base-url")
+
+    report = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['mode']} {report['endpoint']}: {report['requests']} requisições, concorrência {report['concurrency']}")
+    print(f"  status: {report['statuses']}")
+    print(f"  duração: {report['elapsed_s']}s  throughput: {report['throughput_rps']} req/s")
+    latency = report["latency_ms"]
+    print(f"  latência (ms): p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+    if "time_to_first_token_ms" in report:
+        ttft = report["time_to_first_token_ms"]
+        print(f"  primeiro token (ms): p50={ttft['p50']} p95={ttft['p95']} p99={ttft['p99']}")
+    if "app_overhead_p50_ms" in report:
+        print(f"  overhead da aplicação no p50: {report['app_overhead_p50_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
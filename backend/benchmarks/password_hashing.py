@@ -0,0 +1,122 @@
+# backend/benchmarks/password_hashing.py
+#
+# Micro-benchmark do hash de senhas (bcrypt via passlib):
+#   1. custo de hash/verificação para cada valor de rounds (ajuda a escolher PASSWORD_BCRYPT_ROUNDS);
+#   2. travamento do event loop durante uma rajada de cadastros, com o hash chamado direto no
+#      loop ("inline") e no pool dedicado de app.core.security ("pool").
+# Um heartbeat a cada --tick-ms mede o atraso do loop: é o que as outras requisições sentiriam.
+#
+#     python benchmarks/password_hashing.py --rounds 10 11 12 --burst 20
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def measure_cost(rounds: int, samples: int) -> dict:
+    from passlib.context import CryptContext
+
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    hashed = context.hash("senha-de-teste")
+    hash_times, verify_times = [], []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash("senha-de-teste")
+        hash_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        context.verify("senha-de-teste", hashed)
+        verify_times.append(time.perf_counter() - started)
+    return {
+        "rounds": rounds,
+        "hash_ms_p50": round(percentile(sorted(hash_times), 0.50) * 1000, 1),
+        "verify_ms_p50": round(percentile(sorted(verify_times), 0.50) * 1000, 1),
+    }
+
+
+async def measure_burst(mode: str, burst: int, tick_ms: float) -> dict:
+    from app.core import security
+
+    lags = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        interval = tick_ms / 1000
+        while not stop.is_set():
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    async def register(index: int):
+        password = f"senha-{index}"
+        if mode == "inline":
+            security.get_password_hash(password)  # Como era antes: bcrypt direto no event loop
+        else:
+            await security.get_password_hash_async(password)
+
+    ticker = asyncio.create_task(heartbeat())
+    await asyncio.sleep(tick_ms / 1000 * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(register(index) for index in range(burst)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    lags.sort()
+    return {
+        "mode": mode,
+        "burst": burst,
+        "elapsed_s": round(elapsed, 3),
+        "loop_lag_ms": {
+            "p50": round(percentile(lags, 0.50) * 1000, 1),
+            "p99": round(percentile(lags, 0.99) * 1000, 1),
+            "max": round(lags[-1] * 1000, 1),
+        },
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark do hash de senhas (bcrypt).")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13], help="Custos a medir.")
+    parser.add_argument("--samples", type=int, default=5, help="Hashes/verificações por custo.")
+    parser.add_argument("--burst", type=int, default=20, help="Cadastros simultâneos na rajada.")
+    parser.add_argument("--burst-rounds", type=int, default=12, help="PASSWORD_BCRYPT_ROUNDS usado na rajada.")
+    parser.add_argument("--workers", type=int, default=4, help="PASSWORD_HASH_WORKERS usado na rajada.")
+    parser.add_argument("--tick-ms", type=float, default=5.0)
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório em JSON.")
+    args = parser.parse_args(argv)
+
+    # settings é lido na importação de app.core.security
+    os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(args.burst_rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+
+    report = {
+        "cost": [measure_cost(rounds, args.samples) for rounds in args.rounds],
+        "burst": [asyncio.run(measure_burst(mode, args.burst, args.tick_ms)) for mode in ("inline", "pool")],
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for row in report["cost"]:
+        print(f"rounds={row['rounds']:>2}  hash p50={row['hash_ms_p50']:>7} ms  verify p50={row['verify_ms_p50']:>7} ms")
+    for row in report["burst"]:
+        lag = row["loop_lag_ms"]
+        print(
+            f"{row['mode']:>6}: {row['burst']} hashes em {row['elapsed_s']} s | "
+            f"atraso do event loop p50={lag['p50']} ms p99={lag['p99']} ms max={lag['max']} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/benchmarks/rate_limit_overhead.py
+#
+# Custo por requisição do RateLimitMiddleware, medido em microssegundos em volta de um app ASGI
+# vazio (sem FastAPI, sem rede): mostra só o que o middleware acrescenta.
+#
+#     python benchmarks/rate_limit_overhead.py --requests 100000
+#     python benchmarks/rate_limit_overhead.py --backend database   # tabela rate_limit_buckets num SQLite temporário
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+async def empty_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def build_scope(path: str, method: str, token: str | None) -> dict:
+    headers = [(b"host", b"bench")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": method, "path": path, "headers": headers, "client": ("127.0.0.1", 5000)}
+
+
+async def time_calls(app, scope, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def run(args) -> dict:
+    from app.core.security import create_access_token
+    from app.services.rate_limiter import RateLimitMiddleware
+
+    if args.backend == "database":
+        from app.core.database import Base, engine
+
+        Base.metadata.create_all(bind=engine)
+
+    middleware = RateLimitMiddleware(empty_app)
+    token = create_access_token({"sub": "bench@example.com", "plan": "Unlimited"})
+    cases = {
+        "sem middleware": (empty_app, build_scope("/api/v1/history/contents/", "GET", token)),
+        "anônimo (IP)": (middleware, build_scope("/api/v1/templates/", "GET", None)),
+        "usuário (JWT)": (middleware, build_scope("/api/v1/history/contents/", "GET", token)),
+        "usuário, geração": (middleware, build_scope("/api/v1/generate-content", "POST", token)),
+    }
+    report = {}
+    for name, (app, scope) in cases.items():
+        await time_calls(app, scope, min(1000, args.requests))  # Aquecimento (decodifica o JWT, cria o bucket)
+        report[name] = round(await time_calls(app, scope, args.requests), 2)
+
+    from app.core.database import async_engine
+
+    await async_engine.dispose()  # Fecha as conexões aiosqlite (senão o processo não termina)
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Overhead por requisição do rate limiting.")
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--backend", choices=("memory", "database"), default="memory")
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório em JSON.")
+    args = parser.parse_args(argv)
+
+    # Configura o ambiente antes de importar o app (settings é lido na importação)
+    os.environ["RATE_LIMIT_ENABLED"] = "true"
+    os.environ["RATE_LIMIT_BACKEND"] = args.backend
+    # Limites altos: o teste mede o custo de uma requisição permitida, não o 429
+    os.environ["RATE_LIMIT_PLANS"] = "Unlimited=100000000/100000000"
+    os.environ["RATE_LIMIT_ANONYMOUS"] = "100000000/100000000"
+    if args.backend == "database":
+        db_path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    for name, micros in report.items():
+        print(f"{name:>18}: {micros:>8} µs/requisição")
+
+
+if __name__ == "__main__":
+    main()